@@ -1,5 +1,18 @@
 from .setup import setup
-from .envs import InteractiveGridEnv, LargeGridEnv, ExtendedGridEnv
-from .qlearning import q_learning
+from .envs import InteractiveGridEnv, LargeGridEnv, ExtendedGridEnv, EnvSnapshot
+from .vec_env import VecExtendedGridEnv
+from .model import compile_model, compile_models, TransitionModel
+from .qlearning import q_learning, q_learning_batched, q_learning_multi, decay_epsilon
+from .planning import value_iteration, policy_iteration, fitted_q_iteration
+from .checkpoint import load_checkpoint
+from .recording import TransitionRecorder, load_transitions, EpisodeLog, replay_episode
+from .rng import BlockRNG
+from .qstore import StateEncoder, DenseQStore, LazyQTable, make_q_store, q_memory_usage, position_q_table
+from .analysis import analyze_layout, LayoutAnalysis
+from .mapgen import generate_maps, MapBatch, load_maps, reachable_cells
+from ._render import sprite_cache_info, warm_up_rendering
+from .replay import FrameLayout, render_frames, render_episodes
+from .sweep import LayoutSpec, parameter_grid, run_sweep, sweep_table, format_sweep_table
+from .sweep import sample_candidates, successive_halving, hyperband
 from .ui import *
 from .vis import plot_q_learning_progress, show_q_heatmap, show_training_videos, show_test_video
\ No newline at end of file
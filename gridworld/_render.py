@@ -1,9 +1,14 @@
 import os
 import sys
+from collections import OrderedDict
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple, Optional
+from typing import Dict, NamedTuple, Tuple, Optional
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
+from ._tiles import (TILE_WALL, TILE_PIT, TILE_ICE, TILE_BUMPER, TILE_STICKY, TILE_CONVEYOR, TILE_TRAMPOLINE,
+                     TILE_WIND, TILE_PORTAL, TILE_COLLAPSE, TILE_TOLL, TILE_BATTERY, TILE_GEM, TILE_COLLAPSED,
+                     DIR_NAMES)
 
 # =========================
 # Emoji + Symbols
@@ -50,13 +55,19 @@ def _parse_resolution(res):
 # Font helpers
 # =========================
 
-def _resolve_font(px: int) -> Tuple[ImageFont.FreeTypeFont, bool]:
-    """
-    Try fonts in a sensible order and return (font, is_color_font).
-    Avoids 'invalid pixel size' by probing safe sizes for bitmap/color fonts.
-    """
+# resolved (font, is_color) per requested pixel size, valid for _font_env
+_font_cache: Dict[int, Tuple[ImageFont.FreeTypeFont, bool]] = {}
+# sizes FreeType refused per font file (bitmap/color fonts only load a few sizes)
+_bad_font_sizes: Dict[str, set] = {}
+_font_env: Optional[str] = None
+
+def _font_candidates():
     home = Path.home()
-    candidates = [
+    env_font = os.environ.get("GRIDWORLD_EMOJI_FONT")
+    return [
+        # Font chosen by setup() (or the user)
+        Path(env_font) if env_font else None,
+
         # Prefer color emoji first (if system supports it)
         home / ".local/share/fonts/NotoColorEmoji.ttf",
         Path("/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf"),
@@ -70,17 +81,42 @@ def _resolve_font(px: int) -> Tuple[ImageFont.FreeTypeFont, bool]:
         Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"),
     ]
 
+def _resolve_font(px: int) -> Tuple[ImageFont.FreeTypeFont, bool]:
+    """
+    Try fonts in a sensible order and return (font, is_color_font).
+    Results are memoized per pixel size; the cache is dropped when GRIDWORLD_EMOJI_FONT changes.
+    """
+    global _font_env
+    env_font = os.environ.get("GRIDWORLD_EMOJI_FONT")
+    if env_font != _font_env:
+        _font_cache.clear()
+        _bad_font_sizes.clear()
+        _font_env = env_font
+
+    cached = _font_cache.get(px)
+    if cached is None:
+        cached = _font_cache[px] = _load_font(px)
+    return cached
+
+def _load_font(px: int) -> Tuple[ImageFont.FreeTypeFont, bool]:
+    """
+    Avoids 'invalid pixel size' by probing safe sizes for bitmap/color fonts.
+    """
     def _try_sizes(path: Path, base_px: int):
         safe = [base_px, 128, 96, 72, 64, 56, 48, 44, 40, 36, 32, 28, 26, 24, 22, 20, 18, 16]
+        bad = _bad_font_sizes.setdefault(str(path), set())
         last = None
         for s in safe:
+            if s in bad:
+                continue
             try:
                 return ImageFont.truetype(str(path), s), s
             except OSError as e:
+                bad.add(s)
                 last = e
-        raise last
+        raise last or OSError(f"no usable size in {path}")
 
-    for fp in candidates:
+    for fp in _font_candidates():
         if not fp:
             continue
         if not fp.exists():
@@ -119,54 +155,162 @@ def _load_sprite_for_glyph(glyph: str) -> Optional[Image.Image]:
 def get_sprite_for_glyph(glyph: str) -> Optional[Image.Image]:
     return _load_sprite_for_glyph(glyph)
 
+class Sprite(NamedTuple):
+    image: Image.Image      # RGBA, already resized to the target size
+    premultiplied: np.ndarray  # float32 (size, size, 4): RGB * alpha in 0..255, alpha in 0..1
+
+class SpriteCache:
+    """
+    LRU cache of ready-to-composite sprites keyed on (glyph, size).
+    Glyphs without a sprite file are cached as None, so the text fallback does not hit the disk again.
+    """
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, int], Optional[Sprite]]" = OrderedDict()
+
+    def get(self, glyph: str, size: int) -> Optional[Sprite]:
+        key = (glyph, size)
+        try:
+            sprite = self._entries[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return sprite
+
+        sprite = _scale_sprite(glyph, size)
+        self._entries[key] = sprite
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return sprite
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def info(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+def _scale_sprite(glyph: str, size: int) -> Optional[Sprite]:
+    spr = get_sprite_for_glyph(glyph)
+    if spr is None:
+        return None
+    if spr.width != size:
+        spr = spr.resize((size, size), Image.LANCZOS)
+    rgba = np.asarray(spr, dtype=np.float32)
+    alpha = rgba[:, :, 3:] / 255.0
+    premultiplied = np.concatenate([rgba[:, :, :3] * alpha, alpha], axis=2)
+    return Sprite(spr, premultiplied)
+
+SPRITE_CACHE = SpriteCache()
+
+def get_scaled_sprite(glyph: str, size: int) -> Optional[Sprite]:
+    """
+    Sprite for `glyph` resized to size x size (None if there is no sprite file).
+    """
+    return SPRITE_CACHE.get(glyph, size)
+
+def sprite_cache_info() -> Dict[str, int]:
+    """
+    Hit/miss counters and fill level of the sprite cache.
+    """
+    return SPRITE_CACHE.info()
+
+def warm_up_rendering(*cell_sizes: int) -> None:
+    """
+    Resolve the fonts and pre-scale the sprites of all symbols for the given cell sizes (e.g. env.cell_size)
+    once, so the first frame or keypress does not pay for it.
+    """
+    for cell_size in cell_sizes:
+        _resolve_font(int(cell_size * 0.8))
+        for glyph in SYMBOLS.values():
+            if glyph:
+                get_scaled_sprite(glyph, int(cell_size * 0.9))
+
 # =========================
 # Symbol resolution
 # =========================
 
-def _symbol_for(env, r, c):
+# symbol keys in drawing priority; the first matching tile flag wins
+_SYMBOL_PRIORITY = (
+    (TILE_WALL, "wall"),
+    (TILE_PIT, "pit"),
+    (TILE_ICE, "ice"),
+    (TILE_BUMPER, "bumper"),
+    (TILE_STICKY, "sticky"),
+    (TILE_WIND, "wind"),
+    (TILE_TRAMPOLINE, "trampoline"),
+    (TILE_PORTAL, "portal"),
+    (TILE_COLLAPSE, "collapse"),
+    (TILE_COLLAPSED, "pit"),
+    (TILE_TOLL, "toll"),
+    (TILE_BATTERY, "battery"),
+    (TILE_GEM, "gem"),
+)
+
+def _symbol_for(env, r, c, state=None):
     pos = (r, c)
     if pos == env.start_pos: return "start"
     if pos == env.goal_pos: return "goal"
-    if pos in getattr(env, "wall_positions",       set()): return "wall"
-    if pos in getattr(env, "pit_positions",        set()): return "pit"
-    if pos in getattr(env, "ice_positions",        set()): return "ice"
-    if pos in getattr(env, "bumper_positions",     set()): return "bumper"
-    if pos in getattr(env, "sticky_positions",     set()): return "sticky"
-    if pos in getattr(env, "wind_positions",       set()): return "wind"
-    if pos in getattr(env, "trampoline_positions", set()): return "trampoline"
-    if pos in getattr(env, "portal_lookup",       dict()): return "portal"
-    if pos in getattr(env, "collapse_positions",   set()):  return "collapse"
-    if pos in getattr(env, "already_collapsed",    set()): return "pit"
-    if pos in getattr(env, "toll_positions",       set()):  return "toll"
-    if pos in getattr(env, "battery_positions",    set()):  return "battery"
-    if pos in getattr(env, "gem_positions",        set()):  return "gem"
-
-    conv_dir = getattr(env, "conveyor_map", {}).get(pos)
-    if conv_dir:
-        return f"conveyor_{conv_dir}"
-
-    for a, b in getattr(env, "portal_pairs", []):
-        if pos in (a, b): return "portal"
+
+    index = r * env.cols + c
+    flags = env._cell_flags(index) if state is None else env._cell_flags(index, state)
+    for bit, key in _SYMBOL_PRIORITY:
+        if flags & bit:
+            return key
+
+    if flags & TILE_CONVEYOR:
+        return f"conveyor_{DIR_NAMES[env._conveyor_dir[index]]}"
 
     return "empty"
 
-def _glyph_for(env, r, c) -> Optional[str]:
-    key = _symbol_for(env, r, c)
+def _glyph_for(env, r, c, state=None) -> Optional[str]:
+    key = _symbol_for(env, r, c, state)
     return SYMBOLS.get(key)
 
 # =========================
 # Frame rendering
 # =========================
 
-def _emoji_frame(rows: int,
+def _draw_centered_glyph(im: Image.Image,
+                         draw: ImageDraw.ImageDraw,
+                         font: ImageFont.FreeTypeFont,
+                         is_color: bool,
+                         glyph: str,
+                         rc: Tuple[int, int],
+                         cell_size: int,
+                         padding: int) -> None:
+    r, c = rc
+    if not glyph:
+        return
+    x0 = padding + c * cell_size
+    y0 = padding + r * cell_size
+    cx = x0 + cell_size / 2
+    cy = y0 + cell_size / 2
+
+    # Try sprite first (fit into ~90% of cell)
+    sprite = get_scaled_sprite(glyph, int(cell_size * 0.9))
+    if sprite is not None:
+        spr = sprite.image
+        im.alpha_composite(spr, (int(cx - spr.width/2), int(cy - spr.height/2)))
+        return
+
+    # Fallback to font-rendered emoji/text
+    g = glyph  # keep VS-16; color fonts benefit from it
+    l, t, rbb, bbb = draw.textbbox((0, 0), g, font=font, embedded_color=is_color)
+    w, h = rbb - l, bbb - t
+    draw.text((cx - w / 2 - l, cy - h / 2 - t), g, font=font, embedded_color=is_color)
+
+def _board_frame(rows: int,
                  cols: int,
                  cell_size: int,
                  padding: int,
-                 symbols: Dict[Tuple[int, int], str],
-                 agent: Optional[Tuple[int, int]] = None,
-                 agent_glyph: str = "🤖") -> Image.Image:
+                 symbols: Dict[Tuple[int, int], str]) -> Image.Image:
     """
-    Create a PIL.Image of a board, drawing emojis centered in each cell.
+    Static layer of a board: grid lines and tile glyphs, without the agent.
     symbols: dict mapping (r,c)->emoji glyph.
     """
     W = cols * cell_size + 2 * padding
@@ -185,37 +329,129 @@ def _emoji_frame(rows: int,
     # choose text font once
     font, is_color = _resolve_font(int(cell_size * 0.8))
 
-    def draw_centered_glyph(glyph: str, rc: Tuple[int, int]):
-        r, c = rc
-        if not glyph:
-            return
-        x0 = padding + c * cell_size
-        y0 = padding + r * cell_size
-        cx = x0 + cell_size / 2
-        cy = y0 + cell_size / 2
-
-        # Try sprite first
-        spr = get_sprite_for_glyph(glyph)
-        if spr is not None:
-            # keep aspect, fit into ~90% of cell
-            target = int(cell_size * 0.9)
-            if spr.width != target:
-                spr = spr.resize((target, target), Image.LANCZOS)
-            im.alpha_composite(spr, (int(cx - spr.width/2), int(cy - spr.height/2)))
-            return
-
-        # Fallback to font-rendered emoji/text
-        g = glyph  # keep VS-16; color fonts benefit from it
-        l, t, rbb, bbb = draw.textbbox((0, 0), g, font=font, embedded_color=is_color)
-        w, h = rbb - l, bbb - t
-        draw.text((cx - w / 2 - l, cy - h / 2 - t), g, font=font, embedded_color=is_color)
-
     # draw tiles
     for (r, c), glyph in symbols.items():
-        draw_centered_glyph(glyph, (r, c))
+        _draw_centered_glyph(im, draw, font, is_color, glyph, (r, c), cell_size, padding)
 
-    # draw agent last
-    if agent is not None:
-        draw_centered_glyph(agent_glyph, agent)
+    return im
 
+def _add_agent(board: Image.Image,
+               cell_size: int,
+               padding: int,
+               agent: Tuple[int, int],
+               agent_glyph: str = "🤖") -> Image.Image:
+    """
+    Copy of a board layer with the agent drawn on top; the board itself stays untouched.
+    """
+    im = board.copy()
+    font, is_color = _resolve_font(int(cell_size * 0.8))
+    _draw_centered_glyph(im, ImageDraw.Draw(im), font, is_color, agent_glyph, agent, cell_size, padding)
     return im
+
+def _emoji_frame(rows: int,
+                 cols: int,
+                 cell_size: int,
+                 padding: int,
+                 symbols: Dict[Tuple[int, int], str],
+                 agent: Optional[Tuple[int, int]] = None,
+                 agent_glyph: str = "🤖") -> Image.Image:
+    """
+    Create a PIL.Image of a board, drawing emojis centered in each cell.
+    symbols: dict mapping (r,c)->emoji glyph.
+    """
+    im = _board_frame(rows, cols, cell_size, padding, symbols)
+    if agent is None:
+        return im
+    # draw agent last
+    return _add_agent(im, cell_size, padding, agent, agent_glyph)
+
+# =========================
+# Trajectory compositing
+# =========================
+
+class _Stamp(NamedTuple):
+    dy: int                 # offset of the stamp relative to the cell's top-left corner
+    dx: int
+    premultiplied: np.ndarray  # float32 (h, w, 4) like Sprite.premultiplied
+    over_alpha: bool        # sprite: composite "over" the board's alpha (like Image.alpha_composite);
+                            # font glyph: blend by coverage only (like ImageDraw.text)
+
+def _glyph_stamp(glyph: str, cell_size: int) -> _Stamp:
+    """
+    Premultiplied stamp of `glyph` as drawn into one cell. Sprites come from the sprite cache,
+    font glyphs are rasterized once per call.
+    """
+    sprite = get_scaled_sprite(glyph, int(cell_size * 0.9))
+    if sprite is not None:
+        h, w = sprite.premultiplied.shape[:2]
+        dy, dx, rgba, over_alpha = int(cell_size / 2 - h / 2), int(cell_size / 2 - w / 2), sprite.premultiplied, True
+    else:
+        # text on a transparent black tile comes out premultiplied (ink * coverage, coverage)
+        tile = Image.new("RGBA", (cell_size, cell_size), (0, 0, 0, 0))
+        font, is_color = _resolve_font(int(cell_size * 0.8))
+        _draw_centered_glyph(tile, ImageDraw.Draw(tile), font, is_color, glyph, (0, 0), cell_size, 0)
+        rgba = np.asarray(tile, dtype=np.float32)
+        rgba[:, :, 3] /= 255.0
+        dy, dx, over_alpha = 0, 0, False
+
+    # crop to the covered pixels; fully transparent pixels leave the board unchanged
+    ys, xs = np.nonzero(rgba[:, :, 3] > 0)
+    if ys.size == 0:
+        return _Stamp(dy, dx, rgba[:0, :0], over_alpha)
+    y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+    return _Stamp(dy + int(y0), dx + int(x0), rgba[y0:y1, x0:x1], over_alpha)
+
+def composite_frames(boards,
+                     board_ids,
+                     rows,
+                     cols,
+                     cell_size: int,
+                     padding: int,
+                     agent_glyph: str = "🤖",
+                     out: Optional[np.ndarray] = None,
+                     chunk: int = 256) -> np.ndarray:
+    """
+    Render T frames into one uint8 (T, H, W, 3) buffer without a PIL round trip per frame.
+    Frame t is the RGB part of the RGBA board boards[board_ids[t]] with the agent glyph alpha-blended into cell
+    (rows[t], cols[t]); the blending is vectorized over `chunk` frames at a time. `out` may be a preallocated buffer.
+    """
+    board_ids = np.asarray(board_ids, dtype=np.int64)
+    T = len(board_ids)
+    H, W = boards[0].shape[:2]
+    if out is None:
+        out = np.empty((T, H, W, 3), dtype=np.uint8)
+    elif out.shape != (T, H, W, 3) or out.dtype != np.uint8:
+        raise ValueError(f"out must be a uint8 array of shape {(T, H, W, 3)}")
+    if T == 0:
+        return out
+
+    # backgrounds, copied per run of frames with the same board (boards change only on pickups etc.)
+    rgb_boards = [np.ascontiguousarray(board[:, :, :3]) for board in boards]
+    runs = np.flatnonzero(np.diff(board_ids)) + 1
+    for start, stop in zip(np.r_[0, runs], np.r_[runs, T]):
+        out[start:stop] = rgb_boards[board_ids[start]]
+    stamp = _glyph_stamp(agent_glyph, cell_size) if agent_glyph else None
+    if stamp is None or stamp.premultiplied.size == 0:
+        return out
+
+    # agent, gathered/scattered as (frames, h, w) blocks:
+    # out = (rgb·a + board·a_board·(1 - a)) / (a + a_board·(1 - a)), with a_board = 1 for font glyphs
+    rgb, alpha = stamp.premultiplied[:, :, :3], stamp.premultiplied[:, :, 3:]
+    h, w = alpha.shape[:2]
+    ys = padding + np.asarray(rows, dtype=np.int64) * cell_size + stamp.dy
+    xs = padding + np.asarray(cols, dtype=np.int64) * cell_size + stamp.dx
+    ry, rx = np.arange(h)[:, None], np.arange(w)[None, :]
+    if stamp.over_alpha:
+        board_alpha = np.stack([board[:, :, 3] for board in boards])
+    for start in range(0, T, chunk):
+        t = np.arange(start, min(T, start + chunk))[:, None, None]
+        yi, xi = ys[t] + ry, xs[t] + rx
+        dst = out[t, yi, xi].astype(np.float32)
+        if stamp.over_alpha:
+            da = board_alpha[board_ids[t], yi, xi][..., None] * ((1.0 - alpha) / 255.0)
+            total = alpha + da
+            blended = np.where(total > 0, (rgb + dst * da) / np.maximum(total, 1e-6), dst)
+        else:
+            blended = rgb + dst * (1.0 - alpha)
+        out[t, yi, xi] = np.minimum(blended + 0.5, 255).astype(np.uint8)
+    return out
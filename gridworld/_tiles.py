@@ -0,0 +1,52 @@
+import numpy as np
+
+# =========================
+# Tile flags
+# =========================
+# One uint16 per cell; every tile type owns one bit so overlapping tiles keep working.
+
+TILE_WALL = 1 << 0
+TILE_PIT = 1 << 1
+TILE_ICE = 1 << 2
+TILE_BUMPER = 1 << 3
+TILE_STICKY = 1 << 4
+TILE_CONVEYOR = 1 << 5
+TILE_TRAMPOLINE = 1 << 6
+TILE_WIND = 1 << 7
+TILE_PORTAL = 1 << 8
+TILE_COLLAPSE = 1 << 9
+TILE_TOLL = 1 << 10
+TILE_BATTERY = 1 << 11
+TILE_GEM = 1 << 12
+TILE_COLLAPSED = 1 << 13  # only appears in the dynamic view (floor has already collapsed)
+
+# tiles that force a further move in check_proposed_pos
+TILE_FORCING = TILE_ICE | TILE_BUMPER | TILE_CONVEYOR | TILE_TRAMPOLINE | TILE_WIND
+
+# direction index == action index (0=up, 1=down, 2=left, 3=right), same order as ExtendedGridEnv.DIRS
+DIR_NAMES = "UDLR"
+DIR_DR = (-1, 1, 0, 0)
+DIR_DC = (0, 0, -1, 1)
+
+
+def build_tile_grid(rows: int, cols: int, tiles) -> np.ndarray:
+    """
+    Build the flat uint16 flag grid from a mapping flag -> iterable of (r, c).
+    """
+    flags = np.zeros(rows * cols, dtype=np.uint16)
+    for bit, positions in tiles.items():
+        for r, c in positions:
+            flags[r * cols + c] |= bit
+    return flags
+
+
+def build_slots(rows: int, cols: int, positions):
+    """
+    Number the given cells 0..k-1 (sorted) and return (slot array, list of cells).
+    Cells without an object get slot -1.
+    """
+    cells = sorted(tuple(p) for p in positions)
+    slots = np.full(rows * cols, -1, dtype=np.int32)
+    for k, (r, c) in enumerate(cells):
+        slots[r * cols + c] = k
+    return slots, cells
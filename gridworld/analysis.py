@@ -0,0 +1,286 @@
+import numpy as np
+from .envs import ExtendedGridEnv
+from ._tiles import (TILE_WALL, TILE_PIT, TILE_ICE, TILE_BUMPER, TILE_CONVEYOR, TILE_TRAMPOLINE, TILE_WIND,
+                     TILE_PORTAL, TILE_BATTERY, TILE_FORCING, DIR_DR, DIR_DC)
+
+
+class LayoutAnalysis:
+    """
+    Ergebnis von analyze_layout: Distanzen (Schritte) zum Ziel pro Feld, Erreichbarkeit vom Start und eine Liste
+    von Problemen der Karte (leer, wenn das Ziel erreichbar ist).
+    - distance: Schritte bis zum Ziel mit Batterie bzw. ohne Batteriepflicht (inf = unerreichbar)
+    - distance_without_battery: Schritte bis zum Ziel über eine Batterie (nur bei battery_required, sonst = distance)
+    - reachable: vom Start aus erreichbare Felder
+    """
+    def __init__(self, env, distance, distance_without_battery, reachable, problems):
+        self.rows, self.cols = env.rows, env.cols
+        self.start = env.to_index(*env.start_pos)
+        self.goal = env.to_index(*env.goal_pos)
+        self.battery_required = env.battery_required
+        self.reward_step = env.reward_step
+        self.distance = distance
+        self.distance_without_battery = distance_without_battery
+        self.reachable = reachable
+        self.problems = problems
+
+    @property
+    def goal_reachable(self):
+        return not self.problems
+
+    @property
+    def start_distance(self):
+        """
+        Mindestanzahl Schritte vom Start bis zum Ziel (inf, wenn unerreichbar).
+        """
+        return float(self.distance_without_battery[self.start])
+
+    def distance_grid(self, with_battery=False):
+        """
+        Distanzen als (rows, cols)-Raster, z. B. für plt.imshow.
+        """
+        d = self.distance if with_battery else self.distance_without_battery
+        return d.reshape(self.rows, self.cols)
+
+    def potential(self, scale=None):
+        """
+        Potential Φ = -scale · Distanz für Potential-basiertes Reward Shaping (q_learning(shaping=...)).
+        Form (2, rows*cols): Zeile 0 ohne, Zeile 1 mit Batterie. Unerreichbare Felder erhalten das Potential
+        einer Distanz, die um eins größer ist als die größte erreichbare. Standard-scale ist |reward_step|;
+        deutlich größere Werte machen Gruben fern vom Ziel attraktiv (Φ = 0 am Episodenende).
+        """
+        if scale is None:
+            scale = abs(self.reward_step) or 1.0
+        d = np.stack([self.distance_without_battery, self.distance]).astype(np.float64)
+        finite = np.isfinite(d)
+        d[~finite] = (d[finite].max() + 1.0) if finite.any() else 0.0
+        return (-scale * d).astype(np.float32)
+
+
+def analyze_layout(env):
+    """
+    Analysiert eine ExtendedGridEnv-Karte vor dem Training: Breitensuche über die deterministischen Feldregeln
+    (Mauern, Förderbänder, Portale, Trampoline, Abpraller, Wind in jeder Richtung; Eis ohne Ausrutschen) vom Ziel
+    rückwärts und vom Start vorwärts. Gruben und Ziel beenden Wege. Edelsteine, Maut und Schlamm ändern nur die
+    Belohnung bzw. kosten einen Schritt und werden ignoriert; die Distanzen sind daher optimistisch.
+    """
+    if not isinstance(env, ExtendedGridEnv):
+        raise ValueError("analyze_layout unterstützt nur ExtendedGridEnv.")
+
+    n = env.rows * env.cols
+    src, dst = _edges(env)
+    start = env.to_index(*env.start_pos)
+    goal = env.to_index(*env.goal_pos)
+    flags = env._tile_flags
+
+    # Gruben (und das Ziel, sobald es erreicht zählt) beenden die Episode: keine ausgehenden Kanten
+    pits = (flags & TILE_PIT) != 0
+    terminal = pits.copy()
+    terminal[goal] = True
+    forward, backward = _graphs(src, dst, terminal, n)
+
+    init = np.full(n, np.inf)
+    init[goal] = 0.0
+    distance = _bfs(backward, init)
+
+    # ohne Batterie beendet das Ziel die Episode nicht
+    if env.battery_required:
+        forward, backward = _graphs(src, dst, pits, n)
+    init = np.full(n, np.inf)
+    init[start] = 0.0
+    reachable = np.isfinite(_bfs(forward, init))
+
+    problems = []
+    distance_without_battery = distance
+    if env.battery_required:
+        batteries = np.flatnonzero(flags & TILE_BATTERY)
+        init = np.full(n, np.inf)
+        init[batteries] = distance[batteries]
+        distance_without_battery = _bfs(backward, init)
+        if not reachable[batteries].any():
+            problems.append("Batterie erforderlich, aber vom Start aus ist keine Batterie erreichbar.")
+        elif not np.isfinite(distance_without_battery[start]):
+            problems.append("Von keiner erreichbaren Batterie führt ein Weg zum Ziel.")
+    elif not np.isfinite(distance[start]):
+        problems.append("Das Ziel ist vom Start aus nicht erreichbar.")
+
+    # Mauern werden nie betreten
+    walls = (flags & TILE_WALL) != 0
+    distance[walls] = distance_without_battery[walls] = np.inf
+    return LayoutAnalysis(env, distance.astype(np.float32), distance_without_battery.astype(np.float32),
+                          reachable, problems)
+
+
+# ──────────────────────────────────────────────────────────────── #
+# Graph aus den Übergangstabellen
+
+def _edges(env):
+    """
+    Alle Kanten (Feld → Endfeld) über Aktionen und Windrichtungen; Ketten über Eis enden auf dem Eisfeld.
+    """
+    origin, ends, chain, _ = _chain_table(env)
+    src, dst = [origin], [ends[0]]
+    for wind in range(1, len(ends)):
+        # nur Ketten hängen von der Windrichtung ab
+        src.append(origin[chain])
+        dst.append(ends[wind][chain])
+    return np.concatenate(src), np.concatenate(dst)  # doppelte Kanten stören die Breitensuche nicht
+
+
+def _chain_table(env):
+    """
+    Vektorisierte Fassung von env._transition_table(): Endfeld jedes Zugs (flach s * 4 + a) pro Windrichtung.
+    Gibt (origin, ends, chain, slippery) zurück: `ends` hat eine Zeile pro Windrichtung (nur eine ohne Wind-Felder),
+    Mauern führen zurück aufs Ausgangsfeld `origin`; `chain` markiert Züge auf Felder mit erzwungener Bewegung und
+    `slippery` (Form wie `ends`) Ketten, die auf Eis enden und zur Laufzeit ausgewürfelt werden müssen.
+    Nur die Ketten werden einzeln abgelaufen, alle anderen Züge vektorisiert bestimmt.
+    """
+    rows, cols = env.rows, env.cols
+    n = rows * cols
+    flags = env._tile_flags
+    r, c = np.divmod(np.arange(n, dtype=np.int64), cols)
+    origin = np.repeat(np.arange(n, dtype=np.int64), 4)
+    proposed = np.stack([np.clip(r + dr, 0, rows - 1) * cols + np.clip(c + dc, 0, cols - 1)
+                         for dr, dc in (env.action_map[a] for a in range(4))], axis=1).ravel()
+
+    pflags = flags[proposed]
+    end = proposed.copy()
+    end[(pflags & TILE_WALL) != 0] = origin[(pflags & TILE_WALL) != 0]
+    portal = (pflags & (TILE_WALL | TILE_PORTAL)) == TILE_PORTAL
+    end[portal] = env._portal_dest[proposed[portal]]
+
+    chain = ((pflags & (TILE_WALL | TILE_PORTAL)) == 0) & ((pflags & TILE_FORCING) != 0)
+    chains = np.flatnonzero(chain)
+    moves = np.array([env.action_map[a] for a in range(4)], dtype=np.int64)
+    num_winds = 4 if (flags & TILE_WIND).any() else 1
+    ends = np.tile(end, (num_winds, 1))
+    slippery = np.zeros((num_winds, 4 * n), dtype=bool)
+    for wind in range(num_winds):
+        chain_end, slip = _walk_chains(env, proposed[chains], moves[chains % 4], wind)
+        ends[wind, chains] = np.where(chain_end < 0, origin[chains], chain_end)
+        slippery[wind, chains] = slip
+    return origin, ends, chain, slippery
+
+
+def _walk_chains(env, idx, moves, wind, max_len=16):
+    """
+    Vektorisierte Fassung von env._walk_chain(probe=True) für viele Ketten gleichzeitig bei Windrichtung `wind`.
+    Gibt die Endfelder (-1 = Mauer) und eine Maske der am Eis abgebrochenen Ketten zurück; Ketten, die nach
+    max_len Feldern noch laufen, löst die Umgebung auf.
+    """
+    flags = env._tile_flags
+    rows, cols = env.rows, env.cols
+    start, dr, dc = idx, moves[:, 0].copy(), moves[:, 1].copy()
+    idx = idx.copy()
+    end = np.full(len(idx), -2, dtype=np.int64)
+    slippery = np.zeros(len(idx), dtype=bool)
+    active = np.arange(len(idx))
+    history = np.full((len(idx), max_len), -1, dtype=np.int64)
+    wind_dr, wind_dc = DIR_DR[wind], DIR_DC[wind]
+
+    for step in range(max_len):
+        if active.size == 0:
+            return end, slippery
+        i = idx[active]
+        f = flags[i]
+
+        # Kettenende: Mauer, Portal, Feld ohne Bewegungswirkung, Schleife oder Eis (ohne Ausrutschen)
+        wall = (f & TILE_WALL) != 0
+        portal = ~wall & ((f & TILE_PORTAL) != 0)
+        seen = (history[active] == i[:, None]).any(axis=1)
+        ice = ~wall & ~portal & ~seen & ((f & TILE_ICE) != 0)
+        stop = ~wall & ~portal & (((f & TILE_FORCING) == 0) | seen | ice)
+        end[active[wall]] = -1
+        end[active[portal]] = env._portal_dest[i[portal]]
+        end[active[stop]] = i[stop]
+        slippery[active[ice]] = True
+
+        go = ~(wall | portal | stop)
+        active, i, f = active[go], i[go], f[go]
+        history[active, step] = i
+
+        # genau eine Bewegungsregel anwenden (Reihenfolge wie in _walk_chain)
+        bumper = (f & TILE_BUMPER) != 0
+        conveyor = ~bumper & ((f & TILE_CONVEYOR) != 0)
+        trampoline = ~bumper & ~conveyor & ((f & TILE_TRAMPOLINE) != 0)
+        windy = ~bumper & ~conveyor & ~trampoline
+        a_dr, a_dc = dr[active], dc[active]
+        d = env._conveyor_dir[i[conveyor]]
+        a_dr = np.where(bumper, -3 * a_dr, np.where(trampoline, 2 * a_dr, a_dr))
+        a_dc = np.where(bumper, -3 * a_dc, np.where(trampoline, 2 * a_dc, a_dc))
+        a_dr[conveyor], a_dc[conveyor] = np.take(DIR_DR, d), np.take(DIR_DC, d)
+        a_dr[windy], a_dc[windy] = wind_dr, wind_dc
+        dr[active], dc[active] = a_dr, a_dc
+
+        r = np.clip(i // cols + a_dr, 0, rows - 1)
+        c = np.clip(i % cols + a_dc, 0, cols - 1)
+        idx[active] = r * cols + c
+
+    # lange Ketten (z. B. Förderband-Kreisläufe) mit der Umgebung auflösen
+    saved_wind = env.wind_dir_idx
+    env.wind_dir_idx = wind
+    for k in active.tolist():
+        end[k], deterministic = env._walk_chain(int(start[k]), int(moves[k, 0]), int(moves[k, 1]), probe=True)
+        slippery[k] = not deterministic
+    env.wind_dir_idx = saved_wind
+    return end, slippery
+
+
+def _graphs(src, dst, terminal, n):
+    """
+    Vorwärts- und Rückwärtsgraph (CSR) ohne die ausgehenden Kanten der Felder in `terminal`.
+    """
+    keep = ~terminal[src]
+    src, dst = src[keep], dst[keep]
+    return _csr(src, dst, n), _csr(dst, src, n)
+
+
+def _csr(src, dst, n):
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order]
+
+
+def _bfs(graph, init):
+    """
+    Breitensuche mit Startdistanzen `init` (inf = kein Startfeld): Quellen werden erst aufgenommen, wenn die Suche
+    ihre Startdistanz erreicht. Gibt die Distanz jedes Feldes zurück (inf = unerreichbar).
+    """
+    indptr, indices = graph
+    dist = np.full(len(init), np.inf)
+    sources = np.flatnonzero(np.isfinite(init))
+    sources = sources[np.argsort(init[sources], kind="stable")]
+    levels = init[sources]
+    if sources.size == 0:
+        return dist
+
+    level = levels[0]
+    pos = 0
+    frontier = np.zeros(0, dtype=np.int64)
+    mark = np.zeros(len(init), dtype=np.int64)  # Duplikate ohne Sortieren entfernen
+    while True:
+        # Quellen dieser Stufe hinzunehmen
+        take = np.searchsorted(levels, level, side="right")
+        new = sources[pos:take]
+        pos = take
+        new = new[~np.isfinite(dist[new])]
+        if new.size:
+            dist[new] = level
+            frontier = np.concatenate((frontier, new))
+        if frontier.size == 0:
+            if pos == len(sources):
+                return dist
+            level = levels[pos]
+            continue
+
+        # Nachbarn der Stufe expandieren
+        counts = indptr[frontier + 1] - indptr[frontier]
+        offsets = np.repeat(indptr[frontier] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        cand = indices[offsets]
+        cand = cand[~np.isfinite(dist[cand])]
+        order = np.arange(cand.size)
+        mark[cand] = order
+        cand = cand[mark[cand] == order]
+        level += 1
+        dist[cand] = level
+        frontier = cand
@@ -0,0 +1,73 @@
+import os
+import pickle
+
+import numpy as np
+
+# Dateinamen innerhalb eines Checkpoint-Verzeichnisses
+Q_FILE = "q.npy"                    # laufende Q-Tabelle (memmap), enthält auch Updates nach dem letzten Checkpoint
+Q_CHECKPOINT_FILE = "q_{}.npy"      # Q-Stand eines Checkpoints, {} = Episodennummer
+STATE_FILE = "state.pkl"
+
+
+def open_checkpoint(path, shape, resume=False):
+    """
+    Öffnet bzw. erstellt die memory-mapped Q-Tabelle (float32, .npy-Format) im Verzeichnis `path`.
+    Gibt (Q, state) zurück; state ist der zuletzt gespeicherte Trainingszustand (bei resume=True und vorhandenem
+    Checkpoint), sonst None und Q ist eine neue, mit Nullen gefüllte Tabelle.
+    """
+    os.makedirs(path, exist_ok=True)
+    q_path = os.path.join(path, Q_FILE)
+    state_path = os.path.join(path, STATE_FILE)
+
+    if resume and os.path.exists(state_path):
+        Q = np.lib.format.open_memmap(q_path, mode="r+")
+        if Q.shape != tuple(shape) or Q.dtype != np.float32:
+            raise ValueError(f"Checkpoint-Q hat Form {Q.shape}/{Q.dtype}, erwartet wird {tuple(shape)}/float32.")
+        with open(state_path, "rb") as f:
+            state = pickle.load(f)
+        # die laufende Tabelle kann schon Updates nach dem Checkpoint enthalten → dessen Q-Stand zurückholen
+        Q[:] = np.load(os.path.join(path, state['q_file']))
+        Q.flush()
+        return Q, state
+
+    Q = np.lib.format.open_memmap(q_path, mode="w+", dtype=np.float32, shape=tuple(shape))
+    return Q, None
+
+
+def save_checkpoint(path, Q, state):
+    """
+    Schreibt einen Checkpoint: erst eine Kopie der Q-Tabelle in eine eigene Datei, dann den Trainingszustand, der auf
+    diese Datei verweist (`state['episode']` ist Pflicht), beides atomar. Ältere Q-Stände werden erst danach
+    gelöscht, sodass nach einem Absturz immer ein zusammenpassendes Paar aus Q und Zustand auf der Platte liegt.
+    """
+    Q.flush()
+    q_file = Q_CHECKPOINT_FILE.format(state['episode'])
+    _atomic_write(os.path.join(path, q_file), lambda f: np.save(f, np.asarray(Q)))
+    state = dict(state, q_file=q_file)
+    _atomic_write(os.path.join(path, STATE_FILE), lambda f: pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+    prefix, suffix = Q_CHECKPOINT_FILE.split("{}")
+    for name in os.listdir(path):
+        if name.startswith(prefix) and name.endswith(suffix) and name != q_file:
+            os.remove(os.path.join(path, name))
+
+
+def _atomic_write(file_path, write):
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, file_path)
+
+
+def load_checkpoint(path, mmap_mode="r"):
+    """
+    Liest einen Checkpoint ohne Kopie der Q-Tabelle (z. B. aus einem anderen Prozess während des Trainings).
+    Gibt (Q, state) zurück: den Q-Stand, der zum gespeicherten Zustand gehört; solange noch kein Zustand gespeichert
+    wurde, die laufende Tabelle und None.
+    """
+    state_path = os.path.join(path, STATE_FILE)
+    if not os.path.exists(state_path):
+        return np.load(os.path.join(path, Q_FILE), mmap_mode=mmap_mode), None
+    with open(state_path, "rb") as f:
+        state = pickle.load(f)
+    return np.load(os.path.join(path, state['q_file']), mmap_mode=mmap_mode), state
@@ -1,8 +1,13 @@
-from ._render import SYMBOLS, _emoji_frame, _parse_resolution, _resolve_font, get_sprite_for_glyph
-import ipywidgets as widgets, numpy as np, sys, io, random
+from ._render import (SYMBOLS, _board_frame, _add_agent, _parse_resolution, _resolve_font, get_scaled_sprite,
+                      composite_frames)
+import ipywidgets as widgets, numpy as np, sys, io
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 from ._render import _glyph_for
+from .rng import BlockRNG
+from ._tiles import (TILE_WALL, TILE_PIT, TILE_ICE, TILE_BUMPER, TILE_STICKY, TILE_CONVEYOR, TILE_TRAMPOLINE,
+                     TILE_WIND, TILE_PORTAL, TILE_COLLAPSE, TILE_TOLL, TILE_BATTERY, TILE_GEM, TILE_COLLAPSED,
+                     TILE_FORCING, DIR_NAMES, DIR_DR, DIR_DC, build_tile_grid, build_slots)
 
 
 class InteractiveGridEnv:
@@ -11,8 +16,8 @@ class InteractiveGridEnv:
     """
     def __init__(self, rows=6, cols=6, pit_frac=0.10, ice_frac=0.15, bumper_frac=0.10, reveal_full=False,
                  init_new_canvas=True, seed=None):
-        if seed is not None:
-            random.seed(seed)
+        # eigener Zufallsstrom der Umgebung (Karte und Eis)
+        self.rng = BlockRNG(seed)
 
         self.rows = rows
         self.cols = cols
@@ -20,7 +25,7 @@ class InteractiveGridEnv:
         self.start_pos = (0, 0)
         # Zielposition zufällig wählen
         cells = [(r, c) for r in range(self.rows) for c in range(self.cols) if (r, c) != self.start_pos]
-        self.goal_pos = random.choice(cells)
+        self.goal_pos = self.rng.choice(cells)
 
         self.agent_pos = self.start_pos
         self.visited = set([self.start_pos])
@@ -41,7 +46,7 @@ class InteractiveGridEnv:
         # ----- verteile Feldervariationen -------------------------------------------------
         self.tile_map = {}  # (r,c) -> {"ice","bumper","pit"}
         pool = [p for p in cells if p != self.goal_pos]
-        random.shuffle(pool)
+        self.rng.shuffle(pool)
 
         def take(frac):
             n = int(frac * len(pool))
@@ -90,8 +95,8 @@ class InteractiveGridEnv:
                 self.last_event = "pit"
                 return
 
-            if tile == "ice" and random.random() < 0.5:
-                slip_dir = random.choice(["Oben", "Unten", "Links", "Rechts"])
+            if tile == "ice" and self.rng.random() < 0.5:
+                slip_dir = self.rng.choice(["Oben", "Unten", "Links", "Rechts"])
                 self._move(slip_dir)
                 # self.visited.add(self.agent_pos)
                 incoming_dir = slip_dir
@@ -176,11 +181,9 @@ class InteractiveGridEnv:
         def _draw_centered(glyph, cx, cy):
             if not glyph:
                 return
-            spr = get_sprite_for_glyph(glyph)
-            if spr is not None:
-                target = int(cs * 0.9)
-                if spr.width != target:
-                    spr = spr.resize((target, target), Image.LANCZOS)
+            sprite = get_scaled_sprite(glyph, int(cs * 0.9))
+            if sprite is not None:
+                spr = sprite.image
                 img.alpha_composite(spr, (int(cx - spr.width/2), int(cy - spr.height/2)))
                 return
             # text fallback
@@ -224,9 +227,13 @@ class LargeGridEnv:
     - Grube 🕳️: Die Episode endet sofort mit einer Strafe.
     - Ziel 🚩: Die Episode endet mit einer Belohnung.
     """
+    # maximale Anzahl zwischengespeicherter Hintergründe (danach wird der Cache geleert)
+    BOARD_CACHE_SIZE = 8
+    FRAME_PADDING = 2  # for padding at borders
+
     def __init__(self, rows=6, cols=6, ice_positions=[(2, 2), (3, 4)], bumper_positions=[(1, 4)],
                  pit_positions=[(4, 1)], goal_position=(5, 5),
-                 reward_goal=10.0, reward_pit=-10.0, reward_step=-0.1, resolution="720p"):
+                 reward_goal=10.0, reward_pit=-10.0, reward_step=-0.1, resolution="720p", rng_seed=None):
         self.rows = rows
         self.cols = cols
         self.ice_positions = set(ice_positions)
@@ -253,7 +260,8 @@ class LargeGridEnv:
             3: "right"
         }
 
-        self.rng = np.random.default_rng()
+        # eigener Zufallsstrom (Eis), damit Episoden aus dem Generator-Zustand reproduzierbar sind
+        self.rng = BlockRNG(rng_seed)
 
         self.agent_pos = (0, 0)
         self.visited = set([self.agent_pos])
@@ -264,6 +272,13 @@ class LargeGridEnv:
         self.tile_map.update({p: "ice" for p in ice_positions})
         self.tile_map.update({p: "bumper" for p in bumper_positions})
 
+        # flaches Feldraster (ein Bit pro Feldtyp), wird z.B. von _symbol_for gelesen
+        self._tile_flags = build_tile_grid(rows, cols, {
+            TILE_PIT: self.pit_positions,
+            TILE_ICE: self.ice_positions,
+            TILE_BUMPER: self.bumper_positions,
+        })
+
         self.cell_size = 25
         # ───────── Fenster‑, Zellen‑ und Randgrößen bestimmen ───────────────
         target = _parse_resolution(resolution)
@@ -283,6 +298,9 @@ class LargeGridEnv:
         self.offset_x = (self.frame_w - grid_w) // 2  # ≥ 0 (letter-box)
         self.offset_y = (self.frame_h - grid_h) // 2
 
+        # gerenderte Hintergründe (Gitter + Feldsymbole), Schlüssel siehe _board_key
+        self._board_cache = {}
+
     # ---------------------------------------------------------------------------
     # Hilfsfunktionen
     # ---------------------------------------------------------------------------
@@ -298,6 +316,12 @@ class LargeGridEnv:
         """
         return (index // self.cols, index % self.cols)
 
+    def _cell_flags(self, index):
+        """
+        Feld-Bits (TILE_*) des Feldes mit dem gegebenen Index.
+        """
+        return int(self._tile_flags[index])
+
     def _move(self, direction):
         r, c = self.agent_pos
         if direction == "up":
@@ -329,8 +353,8 @@ class LargeGridEnv:
                 # self.last_event = "pit"
                 return
 
-            if tile == "ice" and random.random() < 0.5:
-                slip_dir = random.choice(["up", "down", "left", "right"])
+            if tile == "ice" and self.rng.random() < 0.5:
+                slip_dir = self.rng.choice(("up", "down", "left", "right"))
                 self._move(slip_dir)
                 # self.visited.add(self.agent_pos)
                 incoming_dir = slip_dir
@@ -397,38 +421,100 @@ class LargeGridEnv:
     # ---------------------------------------------------------------------------
     # Render-Funktionen
     # ---------------------------------------------------------------------------
+    def _board_key(self):
+        """
+        Alles, wovon der Hintergrund eines Frames abhängt (außer den unveränderlichen Feldern).
+        """
+        return self.start_pos, self.goal_pos, self.cell_size
+
+    def _board(self):
+        """
+        Statischer Hintergrund (Gitter und Feldsymbole ohne Agent), wird pro _board_key nur einmal gezeichnet.
+        """
+        key = self._board_key()
+        board = self._board_cache.get(key)
+        if board is None:
+            symbols = {}
+            for r in range(self.rows):
+                for c in range(self.cols):
+                    glyph = _glyph_for(self, r, c)
+                    if glyph:
+                        symbols[(r, c)] = glyph
+            board = _board_frame(self.rows, self.cols, self.cell_size, self.FRAME_PADDING, symbols)
+            if len(self._board_cache) >= self.BOARD_CACHE_SIZE:
+                self._board_cache.clear()
+            self._board_cache[key] = board
+        return board
+
     def _make_frame(self, *, with_agent=True):
         """
         Pillow image of the current board.
         `with_agent=False` lets you render a background-only frame.
         """
-        padding_size = 2  # for padding at borders
-        symbols = {
-            (r, c): _glyph_for(self, r, c)
-            for r in range(self.rows)
-            for c in range(self.cols)
-            if _glyph_for(self, r, c) is not None
-        }
-        agent = self.agent_pos if with_agent else None
-        return _emoji_frame(self.rows,
-                            self.cols,
-                            self.cell_size,
-                            padding_size,
-                            symbols,
-                            agent)
+        board = self._board()
+        if not with_agent:
+            return board.copy()
+        return _add_agent(board, self.cell_size, self.FRAME_PADDING, self.agent_pos)
+
+    def _visit(self, index):
+        """
+        Änderungen der Anzeige, wenn der Agent beim Rendern das Feld `index` betritt (hier keine).
+        """
 
     def render(self, pos):
         """
         Rendern der aktuellen Position des Agenten in der Umgebung.
         """
         self.agent_pos = pos
+        self._visit(self.to_index(*pos))
         return np.asarray(self._make_frame())[:, :, :3]
 
+    def render_trajectory(self, trajectory, out=None):
+        """
+        Rendert eine ganze Laufbahn (Liste von (r, c) oder Array von Feldindizes) in einen uint8-Puffer
+        (T, H, W, 3), z. B. für make_video_from_frames. Entspricht [render(pos) for pos in trajectory], aber ohne
+        PIL-Bild pro Frame: die Hintergründe kommen aus dem Cache, der Agent wird per NumPy eingeblendet.
+        `out` kann ein vorab allokierter Puffer sein.
+        """
+        cells = np.asarray(trajectory, dtype=np.int64)
+        if cells.ndim == 2:
+            cells = cells[:, 0] * self.cols + cells[:, 1]
+
+        # Hintergrund pro Frame (ändert sich nur beim Aufsammeln von Objekten u. ä.)
+        boards, board_ids, index_of = [], np.empty(len(cells), dtype=np.int64), {}
+        for t, index in enumerate(cells.tolist()):
+            self._visit(index)
+            key = self._board_key()
+            b = index_of.get(key)
+            if b is None:
+                b = index_of[key] = len(boards)
+                boards.append(np.asarray(self._board()))
+            board_ids[t] = b
+        if len(cells):
+            self.agent_pos = self.from_index(int(cells[-1]))
+        else:
+            boards.append(np.asarray(self._board()))
+
+        return composite_frames(boards, board_ids, cells // self.cols, cells % self.cols, self.cell_size,
+                                self.FRAME_PADDING, SYMBOLS["agent"], out)
+
+
+class EnvSnapshot:
+    """
+    Dynamischer Zustand einer ExtendedGridEnv (siehe ExtendedGridEnv.snapshot / restore).
+    Batterien, Edelsteine und eingestürzte Felder sind Bitmasken über die Slot-Nummern der Umgebung.
+    """
+    __slots__ = ("agent_pos", "has_battery", "battery_mask", "gem_mask", "collapsed_mask",
+                 "skip_turns", "step_count", "wind_dir_idx", "done", "rng_state")
+
 
 class ExtendedGridEnv(LargeGridEnv):
     """
     Erweiterung des bestehenden LargeGridEnv, die zusätzliche Feldervarianten hinzufügt.
     """
+    # maximale Anzahl zwischengespeicherter Ketten (danach wird der Cache geleert)
+    CHAIN_CACHE_SIZE = 1 << 16
+
     # Richtungs‑Hilfsfunktion
     DIRS = {
         "U": (-1, 0),
@@ -467,6 +553,7 @@ class ExtendedGridEnv(LargeGridEnv):
                  jewel_steps=5,
                  battery_required=False,
                  goal_position=None,
+                 resolution="720p",  # None: 25 px pro Feld, z. B. für sehr große Karten ohne Rendering
                  rng_seed=None):
 
         # Elternklasse mit entsprechenden Argumenten aufrufen
@@ -478,7 +565,9 @@ class ExtendedGridEnv(LargeGridEnv):
             goal_position=goal_position or (rows - 1, cols - 1),
             reward_goal=reward_goal,
             reward_pit=reward_pit,
-            reward_step=reward_step
+            reward_step=reward_step,
+            resolution=resolution,
+            rng_seed=rng_seed
         )
 
         self.action_map = {
@@ -499,11 +588,12 @@ class ExtendedGridEnv(LargeGridEnv):
             for a, b in portal_pairs:
                 self.portal_lookup[tuple(a)] = tuple(b)
                 self.portal_lookup[tuple(b)] = tuple(a)
-        self.collapse_positions = set(collapse_positions or [])
-        self.already_collapsed = set()
         self.toll_positions = set(toll_positions or [])
-        self.battery_positions = set(battery_positions or [])
-        self.gem_positions = set(gem_positions or [])
+
+        # Originalpositionen von Batterien, Edelsteinen und Einsturzfeldern für den Reset speichern
+        self.battery_positions_original = set(battery_positions or [])
+        self.gem_positions_original = set(gem_positions or [])
+        self.collapse_positions_original = set(collapse_positions or [])
 
         self.reward_wall = reward_wall
         self.reward_sticky = reward_sticky
@@ -517,91 +607,260 @@ class ExtendedGridEnv(LargeGridEnv):
         self.battery_required = battery_required
         self.has_battery = False
 
+        # ───────── kompaktes Feldraster ─────────
+        # Ein uint16 pro Feld mit einem Bit pro Feldtyp, flache Indizes statt (r, c)-Tupeln.
+        self._tile_flags = build_tile_grid(rows, cols, {
+            TILE_WALL: self.wall_positions,
+            TILE_PIT: self.pit_positions,
+            TILE_ICE: self.ice_positions,
+            TILE_BUMPER: self.bumper_positions,
+            TILE_STICKY: self.sticky_positions,
+            TILE_CONVEYOR: self.conveyor_map,
+            TILE_TRAMPOLINE: self.trampoline_positions,
+            TILE_WIND: self.wind_positions,
+            TILE_PORTAL: self.portal_lookup,
+            TILE_COLLAPSE: self.collapse_positions_original,
+            TILE_TOLL: self.toll_positions,
+            TILE_BATTERY: self.battery_positions_original,
+            TILE_GEM: self.gem_positions_original,
+        })
+        self._forcing = (self._tile_flags & TILE_FORCING) != 0
+        self._conveyor_dir = np.full(rows * cols, -1, dtype=np.int8)
+        for (r, c), d in self.conveyor_map.items():
+            self._conveyor_dir[r * cols + c] = DIR_NAMES.index(d)
+        self._portal_dest = np.full(rows * cols, -1, dtype=np.int32)
+        for (r, c), (r2, c2) in self.portal_lookup.items():
+            self._portal_dest[r * cols + c] = r2 * cols + c2
+
+        # Batterien, Edelsteine und Einsturzfelder werden durchnummeriert; ihr Zustand ist je eine Bitmaske
+        self._battery_slot, self._battery_cells = build_slots(rows, cols, self.battery_positions_original)
+        self._gem_slot, self._gem_cells = build_slots(rows, cols, self.gem_positions_original)
+        self._collapse_slot, self._collapse_cells = build_slots(rows, cols, self.collapse_positions_original)
+        self._battery_full = (1 << len(self._battery_cells)) - 1
+        self._gem_full = (1 << len(self._gem_cells)) - 1
+        self._battery_mask = self._battery_full  # Bit gesetzt = Batterie liegt noch
+        self._gem_mask = self._gem_full          # Bit gesetzt = Edelstein liegt noch
+        self._collapsed_mask = 0                 # Bit gesetzt = Boden ist eingestürzt
+
+        # Python-Listen als Spiegel der Arrays: skalarer Zugriff im Hot-Path von step() ist damit deutlich billiger
+        self._flag_list = self._tile_flags.tolist()
+        self._conveyor_list = self._conveyor_dir.tolist()
+        self._portal_list = self._portal_dest.tolist()
+        self._battery_slot_list = self._battery_slot.tolist()
+        self._gem_slot_list = self._gem_slot.tolist()
+        self._collapse_slot_list = self._collapse_slot.tolist()
+
+        # Cache aufgelöster deterministischer Ketten: (Feld, dr, dc, Windrichtung) -> Endfeld.
+        # Hängt nur vom statischen Feldraster ab; Einsturz, Batterien und Juwelen wirken erst nach der Kette.
+        self._chain_cache = {}
+
         # Windrichtung wird pro Episode neu bestimmt
-        self.rng = np.random.default_rng(rng_seed)
         self.wind_dir_idx = self.rng.integers(0, 4)
         self.skip_turns = 0
         self.step_count = 0
 
-        # Originalpositionen von Batterien, Edelsteinen und Einsturzfeldern für den Reset speichern
-        self.battery_positions_original = self.battery_positions.copy()
-        self.gem_positions_original = self.gem_positions.copy()
-        self.collapse_positions_original = self.collapse_positions.copy()
+    # ──────────────────────────────────────────────────────────────── #
+    # Dynamische Felder als Mengen (Sicht auf die Bitmasken)
+    @property
+    def battery_positions(self):
+        return {p for k, p in enumerate(self._battery_cells) if self._battery_mask >> k & 1}
+
+    @property
+    def gem_positions(self):
+        return {p for k, p in enumerate(self._gem_cells) if self._gem_mask >> k & 1}
+
+    @property
+    def collapse_positions(self):
+        return {p for k, p in enumerate(self._collapse_cells) if not self._collapsed_mask >> k & 1}
+
+    @property
+    def already_collapsed(self):
+        return {p for k, p in enumerate(self._collapse_cells) if self._collapsed_mask >> k & 1}
 
     # ──────────────────────────────────────────────────────────────── #
     # Hilfsfunkion
     def _in_bounds(self, r, c):
         return 0 <= r < self.rows and 0 <= c < self.cols
 
+    def _board_key(self):
+        # aufgesammelte Batterien/Edelsteine und eingestürzter Boden ändern die Symbole
+        return super()._board_key() + (self._collapsed_mask, self._battery_mask, self._gem_mask)
+
+    def _cell_flags(self, index, state=None):
+        """
+        Feld-Bits des Feldes inkl. dynamischem Zustand (aufgesammelte Objekte fehlen, eingestürzter Boden -> TILE_COLLAPSED).
+        `state` = (collapsed_mask, battery_mask, gem_mask) statt des aktuellen Zustands der Umgebung.
+        """
+        collapsed_mask, battery_mask, gem_mask = state or (self._collapsed_mask, self._battery_mask, self._gem_mask)
+        flags = self._flag_list[index]
+        if flags & TILE_COLLAPSE and collapsed_mask >> self._collapse_slot_list[index] & 1:
+            flags = (flags & ~TILE_COLLAPSE) | TILE_COLLAPSED
+        if flags & TILE_BATTERY and not battery_mask >> self._battery_slot_list[index] & 1:
+            flags &= ~TILE_BATTERY
+        if flags & TILE_GEM and not gem_mask >> self._gem_slot_list[index] & 1:
+            flags &= ~TILE_GEM
+        return flags
+
     # ──────────────────────────────────────────────────────────────── #
     def reset(self, display_canvas=False):
         # Reset der Elternklasse verwenden und Batterien, Edelsteine, Einsturzfelder aktualisieren
         self.has_battery = False
-        self.battery_positions = self.battery_positions_original.copy()
-        self.gem_positions = self.gem_positions_original.copy()
-        self.already_collapsed.clear()
-        self.collapse_positions = self.collapse_positions_original.copy()
+        self._battery_mask = self._battery_full
+        self._gem_mask = self._gem_full
+        self._collapsed_mask = 0
         self.skip_turns = 0
         self.step_count = 0
         self.wind_dir_idx = self.rng.integers(0, 4)
         return super().reset()
 
+    def snapshot(self):
+        """
+        Momentaufnahme des dynamischen Zustands (ohne das nur für die Darstellung genutzte `visited`).
+        """
+        snap = EnvSnapshot()
+        snap.agent_pos = self.agent_pos
+        snap.has_battery = self.has_battery
+        snap.battery_mask = self._battery_mask
+        snap.gem_mask = self._gem_mask
+        snap.collapsed_mask = self._collapsed_mask
+        snap.skip_turns = self.skip_turns
+        snap.step_count = self.step_count
+        snap.wind_dir_idx = self.wind_dir_idx
+        snap.done = self.done
+        snap.rng_state = self.rng.get_state()
+        return snap
+
+    def restore(self, snap):
+        """
+        Setzt die Umgebung auf eine mit snapshot() erstellte Momentaufnahme zurück und gibt den Zustandsindex zurück.
+        """
+        self.agent_pos = snap.agent_pos
+        self.has_battery = snap.has_battery
+        self._battery_mask = snap.battery_mask
+        self._gem_mask = snap.gem_mask
+        self._collapsed_mask = snap.collapsed_mask
+        self.skip_turns = snap.skip_turns
+        self.step_count = snap.step_count
+        self.wind_dir_idx = snap.wind_dir_idx
+        self.done = snap.done
+        self.rng.set_state(snap.rng_state)
+        return self.agent_pos[0] * self.cols + self.agent_pos[1]
+
     # ──────────────────────────────────────────────────────────────── #
     def check_proposed_pos(self, pos, dr=None, dc=None):
         """
         Lösen von Ketten von erzwungenen Bewegungen auf (Förderbänder, Wind, Trampoline, ...) und zurückgeben des letzten Feldes.
         Die Schleife endet, wenn eine Regel den Agenten auf demselben Feld hält, oder wenn er auf einem Feld landet, das keine neue Bewegungswirkung erzwingt.
         """
-        cur_r, cur_c = pos
-        cur_dr, cur_dc = dr, dc  # letzte Bewegungsrichtung - benötigt von Abpraller / Trampolin
-        visited = set()  # Schleifenerkennung von Förderbändern, die einen Kreislauf bilden
+        origin = self.to_index(*self.agent_pos)
+        final = self._resolve_chain(self.to_index(*pos), dr, dc, origin)
+        return self.from_index(final)
+
+    def _resolve_chain(self, idx, dr, dc, origin):
+        """
+        Wie check_proposed_pos, aber auf flachen Feldindizes. `origin` ist das Feld vor dem Zug (Ziel bei einer Mauer).
+        Deterministische Ketten werden pro (Feld, Richtung, Windrichtung) zwischengespeichert.
+        """
+        flags = self._flag_list[idx]
+        if flags & (TILE_WALL | TILE_PORTAL) or not flags & TILE_FORCING:
+            # keine Kette: direkt auflösen, ein Cache-Zugriff wäre teurer
+            end, _ = self._walk_chain(idx, dr, dc)
+            return origin if end < 0 else end
+
+        key = (idx, dr, dc, self.wind_dir_idx)
+        end = self._chain_cache.get(key)
+        if end is None:
+            end, deterministic = self._walk_chain(idx, dr, dc)
+            if deterministic:
+                if len(self._chain_cache) >= self.CHAIN_CACHE_SIZE:
+                    self._chain_cache.clear()
+                self._chain_cache[key] = end
+        return origin if end < 0 else end
+
+    def _walk_chain(self, idx, dr, dc, probe=False):
+        """
+        Läuft die Kette erzwungener Bewegungen ab `idx` ab. Gibt (Endfeld, deterministisch) zurück;
+        Endfeld -1 bedeutet "Mauer, zurück zum Ausgangsfeld". Sobald Eis beteiligt ist, ist das Ergebnis zufällig.
+        Mit `probe=True` bricht die Kette am Eis ab, ohne Zufallszahlen zu ziehen.
+        """
+        flag_list = self._flag_list
+        cols = self.cols
+        visited = None  # Schleifenerkennung von Förderbändern, die einen Kreislauf bilden (erst bei Bedarf angelegt)
+        deterministic = True
 
         while True:
-            cur_pos = (cur_r, cur_c)
+            flags = flag_list[idx]
 
             # 1. Felder, die die Bewegung sofort abbrechen
-            if cur_pos in self.wall_positions:
-                return self.agent_pos  # die ursprüngliche Bewegung rückgängig machen
-            if cur_pos in self.portal_lookup:
-                return self.portal_lookup[cur_pos]
-            if cur_pos not in (
-                    self.ice_positions
-                    | self.bumper_positions
-                    | set(self.conveyor_map)
-                    | self.trampoline_positions
-                    | self.wind_positions
-            ):
-                return cur_pos  # kein anderes Feld ändert die Position
+            if flags & TILE_WALL:
+                return -1, deterministic  # die ursprüngliche Bewegung rückgängig machen
+            if flags & TILE_PORTAL:
+                return self._portal_list[idx], deterministic
+            if not flags & TILE_FORCING:
+                return idx, deterministic  # kein anderes Feld ändert die Position
 
             # 2. Schleifen erkennen (Wind am Umgebungsrand Richtung Wand, Förderband Richtung Wand, Zyklen, ...)
-            if cur_pos in visited:
-                return cur_pos  # bereits besucht → Stop
-            visited.add(cur_pos)
+            if visited is None:
+                visited = {idx}
+            elif idx in visited:
+                return idx, deterministic  # bereits besucht → Stop
+            else:
+                visited.add(idx)
 
             # 3. genau *eine* Bewegungsregel anwenden
-            if cur_pos in self.ice_positions:
+            if flags & TILE_ICE:
+                deterministic = False
+                if probe:
+                    return idx, deterministic
                 if self.rng.random() < 0.5:
                     slip_action = self.rng.integers(0, 4)
-                    cur_dr, cur_dc = self.action_map[slip_action]
+                    dr, dc = self.action_map[slip_action]
                 else:
-                    return cur_pos  # kein Rutschen
-            elif cur_pos in self.bumper_positions and cur_dr is not None:
-                cur_dr, cur_dc = -cur_dr, -cur_dc
-                cur_dr *= 3
-                cur_dc *= 3
-            elif cur_pos in self.conveyor_map:
-                cur_dr, cur_dc = self.DIRS[self.conveyor_map[cur_pos]]
-            elif cur_pos in self.trampoline_positions and cur_dr is not None:
-                cur_dr *= 2
-                cur_dc *= 2
-            elif cur_pos in self.wind_positions:
-                cur_dr, cur_dc = list(self.DIRS.values())[self.wind_dir_idx]
+                    return idx, deterministic  # kein Rutschen
+            elif flags & TILE_BUMPER and dr is not None:
+                dr, dc = -3 * dr, -3 * dc
+            elif flags & TILE_CONVEYOR:
+                d = self._conveyor_list[idx]
+                dr, dc = DIR_DR[d], DIR_DC[d]
+            elif flags & TILE_TRAMPOLINE and dr is not None:
+                dr, dc = 2 * dr, 2 * dc
+            elif flags & TILE_WIND:
+                dr, dc = DIR_DR[self.wind_dir_idx], DIR_DC[self.wind_dir_idx]
             else:
-                return cur_pos  # Fall zur Absicherung
+                return idx, deterministic  # Fall zur Absicherung
 
             # 4. Bewegung (mit Randbegrenzung)
-            cur_r = np.clip(cur_r + cur_dr, 0, self.rows - 1)
-            cur_c = np.clip(cur_c + cur_dc, 0, self.cols - 1)
+            r = min(max(idx // cols + dr, 0), self.rows - 1)
+            c = min(max(idx % cols + dc, 0), cols - 1)
+            idx = r * cols + c
+
+    def _transition_table(self):
+        """
+        Vorberechnete Übergänge für jede (Zustand, Aktion), flach indiziert mit s * 4 + a.
+        Gibt (proposed, tables) zurück: `proposed` ist das Feld nach dem Hauptbewegungsschritt,
+        `tables[wind]` das Endfeld der Kette für jede Windrichtung. Einträge sind None, wenn die Kette
+        über Eis führt und daher zur Laufzeit aufgelöst werden muss.
+        """
+        rows, cols = self.rows, self.cols
+        proposed = []
+        for s in range(rows * cols):
+            r, c = divmod(s, cols)
+            for a in range(4):
+                dr, dc = self.action_map[a]
+                proposed.append(min(max(r + dr, 0), rows - 1) * cols + min(max(c + dc, 0), cols - 1))
+
+        tables = []
+        saved_wind = self.wind_dir_idx
+        for wind in range(4):
+            self.wind_dir_idx = wind
+            table = []
+            for i, idx in enumerate(proposed):
+                dr, dc = self.action_map[i % 4]
+                end, deterministic = self._walk_chain(idx, dr, dc, probe=True)
+                table.append((i // 4 if end < 0 else end) if deterministic else None)
+            tables.append(table)
+        self.wind_dir_idx = saved_wind
+        return proposed, tables
 
     # ──────────────────────────────────────────────────────────────── #
     def step(self, action):
@@ -618,50 +877,61 @@ class ExtendedGridEnv(LargeGridEnv):
         if self.done:
             return self.to_index(*self.agent_pos), 0.0, True
 
+        cols = self.cols
+        r, c = self.agent_pos
         dr, dc = self.action_map[action]
-        next_r = np.clip(self.agent_pos[0] + dr, 0, self.rows - 1)
-        next_c = np.clip(self.agent_pos[1] + dc, 0, self.cols - 1)
-        proposed_pos = (next_r, next_c)
-        final_pos = self.check_proposed_pos(proposed_pos, dr=dr, dc=dc)
+        next_r = min(max(r + dr, 0), self.rows - 1)
+        next_c = min(max(c + dc, 0), cols - 1)
+        proposed = next_r * cols + next_c
+        final = self._resolve_chain(proposed, dr, dc, r * cols + c)
+        flags = self._flag_list[final]
 
         # Falls Agent auf Klebrigem Schlamm landet
-        if final_pos in self.sticky_positions:
+        if flags & TILE_STICKY:
             self.skip_turns = 1
 
         # Update Agentenposition
-        self.agent_pos = final_pos
-        self.visited.add(final_pos)
+        self.agent_pos = (final // cols, final % cols)
+        self.visited.add(self.agent_pos)
 
         # Belohnung / Terminierungsflag
         reward = self.reward_step
         done = False
 
         # Grube / Einstürzender Boden
-        if self.agent_pos in self.pit_positions or self.agent_pos in self.already_collapsed:
+        if flags & TILE_COLLAPSE:
+            bit = 1 << self._collapse_slot_list[final]
+            collapsed = self._collapsed_mask & bit
+        else:
+            bit = collapsed = 0
+        if flags & TILE_PIT or collapsed:
             reward = self.reward_pit
             done = True
-        elif self.agent_pos in self.collapse_positions:
-            self.already_collapsed.add(self.agent_pos)
-            self.collapse_positions.remove(self.agent_pos)
+        elif bit:
+            self._collapsed_mask |= bit
 
         # Maut-Tor
-        if self.agent_pos in self.toll_positions:
+        if flags & TILE_TOLL:
             reward += self.reward_toll
 
         # Trampolin-Belohnungsbonus
-        if proposed_pos in self.trampoline_positions:
+        if self._flag_list[proposed] & TILE_TRAMPOLINE:
             reward += self.reward_trampoline
 
         # Batterie wird aufgesammelt
-        if self.agent_pos in self.battery_positions:
-            self.has_battery = True
-            self.battery_positions.remove(self.agent_pos)
+        if flags & TILE_BATTERY:
+            bit = 1 << self._battery_slot_list[final]
+            if self._battery_mask & bit:
+                self.has_battery = True
+                self._battery_mask &= ~bit
 
         # Zeit-abhängiges Juwel
-        if self.agent_pos in self.gem_positions:
-            bonus = self.reward_jewel_pos if self.step_count < self.jewel_steps else self.reward_jewel_neg
-            reward += bonus
-            self.gem_positions.remove(self.agent_pos)
+        if flags & TILE_GEM:
+            bit = 1 << self._gem_slot_list[final]
+            if self._gem_mask & bit:
+                bonus = self.reward_jewel_pos if self.step_count < self.jewel_steps else self.reward_jewel_neg
+                reward += bonus
+                self._gem_mask &= ~bit
 
         # Ziel
         if self.agent_pos == self.goal_pos:
@@ -670,21 +940,18 @@ class ExtendedGridEnv(LargeGridEnv):
                 done = True
 
         self.done = done
-        return self.to_index(*self.agent_pos), reward, done
+        return final, reward, done
 
     # ──────────────────────────────────────────────────────────────── #
-    def render(self, pos):
-        self.agent_pos = pos
+    def _visit(self, index):
+        flags = self._flag_list[index]
 
         # Einstürzender Boden -> Symbol muss geändert werden
-        if self.agent_pos in self.collapse_positions:
-            self.already_collapsed.add(self.agent_pos)
-            self.collapse_positions.remove(self.agent_pos)
+        if flags & TILE_COLLAPSE:
+            self._collapsed_mask |= 1 << self._collapse_slot_list[index]
         # Batterie aufgehoben -> Batterie nicht mehr anzeigen
-        if self.agent_pos in self.battery_positions:
-            self.battery_positions.remove(self.agent_pos)
+        if flags & TILE_BATTERY:
+            self._battery_mask &= ~(1 << self._battery_slot_list[index])
         # Zeit-Juwel aufgehoben -> nicht mehr anzeigen
-        if self.agent_pos in self.gem_positions:
-            self.gem_positions.remove(self.agent_pos)
-
-        return np.asarray(self._make_frame())[:, :, :3]
\ No newline at end of file
+        if flags & TILE_GEM:
+            self._gem_mask &= ~(1 << self._gem_slot_list[index])
@@ -0,0 +1,256 @@
+import numpy as np
+from .envs import ExtendedGridEnv
+from .model import _load_npz_memmap
+from ._tiles import (TILE_WALL, TILE_PIT, TILE_ICE, TILE_BUMPER, TILE_STICKY, TILE_CONVEYOR, TILE_TRAMPOLINE,
+                     TILE_WIND, TILE_PORTAL, TILE_COLLAPSE, TILE_TOLL, TILE_BATTERY, TILE_GEM, TILE_FORCING,
+                     DIR_NAMES)
+
+# Feldtypen des Generators: Name → (Feld-Bit, Konstruktor-Argument von ExtendedGridEnv)
+MAP_TILES = {
+    "wall": (TILE_WALL, "wall_positions"),
+    "pit": (TILE_PIT, "pit_positions"),
+    "ice": (TILE_ICE, "ice_positions"),
+    "bumper": (TILE_BUMPER, "bumper_positions"),
+    "sticky": (TILE_STICKY, "sticky_positions"),
+    "conveyor": (TILE_CONVEYOR, "conveyor_map"),
+    "trampoline": (TILE_TRAMPOLINE, "trampoline_positions"),
+    "wind": (TILE_WIND, "wind_positions"),
+    "portal": (TILE_PORTAL, "portal_pairs"),
+    "collapse": (TILE_COLLAPSE, "collapse_positions"),
+    "toll": (TILE_TOLL, "toll_positions"),
+    "battery": (TILE_BATTERY, "battery_positions"),
+    "gem": (TILE_GEM, "gem_positions"),
+}
+
+# Anteil der Felder pro Feldtyp (jedes Feld bekommt höchstens einen Typ)
+DEFAULT_DENSITIES = {
+    "wall": 0.12, "pit": 0.04, "ice": 0.05, "bumper": 0.02, "sticky": 0.02, "conveyor": 0.03,
+    "trampoline": 0.02, "wind": 0.02, "portal": 0.01, "collapse": 0.02, "toll": 0.01, "battery": 0.005,
+    "gem": 0.005,
+}
+
+# Felder, über die der Lösbarkeits-Check läuft: weder blockiert/tödlich noch mit erzwungener Bewegung
+_UNSAFE = TILE_WALL | TILE_PIT | TILE_PORTAL | TILE_FORCING
+
+
+class MapBatch:
+    """
+    Stapel generierter ExtendedGridEnv-Karten als kompakte Arrays (eine Zeile pro Karte, flache Feldindizes):
+    flags (uint16-Feld-Bits), conveyor (Richtungsindex oder -1), portal (Zielfeld oder -1), start und goal.
+    env_kwargs (z. B. Belohnungen, battery_required) werden beim Bauen an jede Umgebung weitergegeben.
+    """
+    _ARRAYS = ("flags", "conveyor", "portal", "start", "goal")
+
+    def __init__(self, rows, cols, flags, conveyor, portal, start, goal, env_kwargs=None):
+        self.rows = int(rows)
+        self.cols = int(cols)
+        self.flags = flags
+        self.conveyor = conveyor
+        self.portal = portal
+        self.start = start
+        self.goal = goal
+        self.env_kwargs = dict(env_kwargs or {})
+
+    def __len__(self):
+        return len(self.flags)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return MapBatch(self.rows, self.cols, *(getattr(self, name)[i] for name in self._ARRAYS),
+                            env_kwargs=self.env_kwargs)
+        return self.build(i)
+
+    # ──────────────────────────────────────────────────────────────── #
+    def layout_kwargs(self, i):
+        """
+        Konstruktor-Argumente von ExtendedGridEnv für Karte i (ohne start_pos, siehe start_position).
+        """
+        cols = self.cols
+        flags = np.asarray(self.flags[i])
+        kwargs = dict(self.env_kwargs, rows=self.rows, cols=cols, goal_position=divmod(int(self.goal[i]), cols))
+        kwargs.setdefault('resolution', None if max(self.rows, cols) > 128 else "720p")
+        for name, (bit, key) in MAP_TILES.items():
+            cells = np.flatnonzero(flags & bit).tolist()
+            if name == "conveyor":
+                dirs = np.asarray(self.conveyor[i])
+                kwargs[key] = {divmod(s, cols): DIR_NAMES[dirs[s]] for s in cells}
+            elif name == "portal":
+                dest = np.asarray(self.portal[i])
+                kwargs[key] = [(divmod(s, cols), divmod(int(dest[s]), cols)) for s in cells if s < dest[s]]
+            else:
+                kwargs[key] = [divmod(s, cols) for s in cells]
+        return kwargs
+
+    def start_position(self, i):
+        return divmod(int(self.start[i]), self.cols)
+
+    def spec(self, i):
+        """
+        LayoutSpec der Karte i (z. B. für run_sweep oder successive_halving).
+        """
+        from .sweep import LayoutSpec
+        return LayoutSpec(self.layout_kwargs(i), self.start_position(i))
+
+    def build(self, i, rng_seed=None, **overrides):
+        """
+        Baut eine ExtendedGridEnv aus Karte i; `overrides` ersetzen einzelne Konstruktor-Argumente.
+        """
+        kwargs = self.layout_kwargs(i)
+        kwargs.update(overrides)
+        env = ExtendedGridEnv(**kwargs, rng_seed=rng_seed)
+        env.start_pos = env.agent_pos = self.start_position(i)
+        env.visited = {env.start_pos}
+        return env
+
+    # ──────────────────────────────────────────────────────────────── #
+    def save(self, path):
+        """
+        Speichert den Stapel unkomprimiert als .npz (load_maps kann ihn wieder per Memory-Mapping einblenden).
+        Nur Zahlen und Zeichenketten aus env_kwargs werden mitgespeichert.
+        """
+        extra = {f"kw_{k}": v for k, v in self.env_kwargs.items() if isinstance(v, (bool, int, float, str))}
+        np.savez(path, rows=self.rows, cols=self.cols, **{name: getattr(self, name) for name in self._ARRAYS},
+                 **extra)
+
+
+def load_maps(path, mmap=True):
+    """
+    Lädt einen mit MapBatch.save gespeicherten Stapel; mit `mmap=True` ohne Kopie der Arrays.
+    """
+    arrays = _load_npz_memmap(path) if mmap else dict(np.load(path))
+    env_kwargs = {k[3:]: v.item() for k, v in arrays.items() if k.startswith("kw_")}
+    return MapBatch(int(arrays["rows"]), int(arrays["cols"]), *(arrays[name] for name in MapBatch._ARRAYS),
+                    env_kwargs=env_kwargs)
+
+
+# ──────────────────────────────────────────────────────────────── #
+# Erzeugung
+
+def generate_maps(num_maps, rows, cols, densities=None, seed=None, start=(0, 0), goal=None, solvable=True,
+                  battery_required=False, max_attempts=100, **env_kwargs):
+    """
+    Erzeugt `num_maps` zufällige Karten (rows × cols) vektorisiert als MapBatch.
+    `densities` überschreibt einzelne Anteile aus DEFAULT_DENSITIES (Summe höchstens 1); Start- und Zielfeld
+    bleiben frei, goal=None wählt pro Karte ein zufälliges Ziel. Mit solvable=True werden Karten ohne sicheren Weg
+    vom Start zum Ziel (bei battery_required über eine Batterie) so lange neu gezogen, bis alle lösbar sind.
+    """
+    dens = dict(DEFAULT_DENSITIES)
+    dens.update(densities or {})
+    unknown = set(dens) - set(MAP_TILES)
+    if unknown:
+        raise ValueError(f"Unbekannte Feldtypen: {sorted(unknown)}.")
+    if sum(dens.values()) > 1.0:
+        raise ValueError("Die Summe der Feld-Anteile darf höchstens 1 sein.")
+
+    rng = np.random.default_rng(seed)
+    start_idx = start[0] * cols + start[1]
+    goal_idx = None if goal is None else goal[0] * cols + goal[1]
+    if goal_idx == start_idx:
+        raise ValueError("Start und Ziel müssen verschieden sein.")
+
+    batch = _draw_maps(rng, num_maps, rows, cols, dens, start_idx, goal_idx)
+    if solvable:
+        # max_attempts Neuziehungen, jede (auch die letzte) wird noch einmal geprüft
+        for attempt in range(max_attempts + 1):
+            bad = np.flatnonzero(~_solvable(batch, battery_required))
+            if bad.size == 0:
+                break
+            if attempt == max_attempts:
+                raise RuntimeError(f"Nach {max_attempts} Versuchen sind noch Karten unlösbar; Dichten verringern.")
+            redraw = _draw_maps(rng, bad.size, rows, cols, dens, start_idx, goal_idx)
+            for name in MapBatch._ARRAYS:
+                getattr(batch, name)[bad] = getattr(redraw, name)
+
+    batch.env_kwargs = dict(env_kwargs, battery_required=battery_required)
+    return batch
+
+
+def _draw_maps(rng, n, rows, cols, dens, start_idx, goal_idx):
+    num_cells = rows * cols
+    names = [name for name in MAP_TILES if dens.get(name, 0) > 0]
+    bits = np.array([MAP_TILES[name][0] for name in names] + [0], dtype=np.uint16)
+    thresholds = np.cumsum([dens[name] for name in names])
+
+    # Feldtyp per Schwellwert auf einer Gleichverteilung; Index len(names) = freies Feld
+    kinds = np.searchsorted(thresholds, rng.random((n, num_cells)), side="right")
+    flags = bits[kinds]
+
+    start = np.full(n, start_idx, dtype=np.int32)
+    if goal_idx is None:
+        goal = rng.integers(0, num_cells - 1, size=n).astype(np.int32)
+        goal += goal >= start_idx  # Startfeld überspringen
+    else:
+        goal = np.full(n, goal_idx, dtype=np.int32)
+    rows_ix = np.arange(n)
+    flags[rows_ix, start] = 0
+    flags[rows_ix, goal] = 0
+
+    conveyor = np.where(flags & TILE_CONVEYOR, rng.integers(0, 4, size=(n, num_cells)), -1).astype(np.int8)
+    portal = _pair_portals(rng, flags)
+    return MapBatch(rows, cols, flags, conveyor, portal, start, goal)
+
+
+def _pair_portals(rng, flags):
+    """
+    Verbindet die Portalfelder jeder Karte in zufälliger Reihenfolge paarweise; ein übriges Portal wird zu Boden.
+    """
+    n, num_cells = flags.shape
+    portal = np.full((n, num_cells), -1, dtype=np.int32)
+    map_ids, cells = np.nonzero(flags & TILE_PORTAL)
+    if cells.size == 0:
+        return portal
+
+    order = np.lexsort((rng.random(cells.size), map_ids))
+    map_ids, cells = map_ids[order], cells[order]
+    first = np.searchsorted(map_ids, map_ids)  # erster Eintrag derselben Karte
+    rank = np.arange(cells.size) - first
+    counts = np.bincount(map_ids, minlength=n)
+    paired = rank < counts[map_ids] - counts[map_ids] % 2
+
+    a = np.flatnonzero(paired & (rank % 2 == 0))
+    portal[map_ids[a], cells[a]] = cells[a + 1]
+    portal[map_ids[a + 1], cells[a + 1]] = cells[a]
+    lone = ~paired
+    flags[map_ids[lone], cells[lone]] &= ~np.uint16(TILE_PORTAL)
+    return portal
+
+
+# ──────────────────────────────────────────────────────────────── #
+# Erreichbarkeit
+
+def reachable_cells(passable, start, rows, cols):
+    """
+    Vektorisierte Breitensuche über einen ganzen Stapel: `passable` (n, rows*cols) bool, `start` (n,) Feldindizes.
+    Gibt die Maske (n, rows*cols) der vom Start über 4er-Nachbarschaft erreichbaren befahrbaren Felder zurück.
+    """
+    passable = np.asarray(passable, dtype=bool)
+    n, num_cells = passable.shape
+    flat = passable.ravel()
+    seen = np.zeros(n * num_cells, dtype=bool)
+    frontier = np.arange(n, dtype=np.int64) * num_cells + np.asarray(start, dtype=np.int64)
+    seen[frontier] = True
+
+    while frontier.size:
+        cell = frontier % num_cells
+        r, c = cell // cols, cell % cols
+        cand = np.concatenate((frontier[r > 0] - cols, frontier[r < rows - 1] + cols,
+                               frontier[c > 0] - 1, frontier[c < cols - 1] + 1))
+        cand = cand[flat[cand] & ~seen[cand]]
+        frontier = np.unique(cand)
+        seen[frontier] = True
+    return seen.reshape(n, num_cells)
+
+
+def _solvable(batch, battery_required):
+    """
+    Konservativer Check: das Ziel muss über Felder ohne erzwungene Bewegung, Portale, Gruben und Mauern erreichbar
+    sein (dort wirken die Aktionen deterministisch und umkehrbar). Einstürzender Boden wird auf einem kürzesten Weg
+    nur einmal betreten und zählt daher als sicher, außer der Weg muss über eine Batterie führen.
+    """
+    unsafe = _UNSAFE | TILE_COLLAPSE if battery_required else _UNSAFE
+    safe = (batch.flags & unsafe) == 0
+    reach = reachable_cells(safe, batch.start, batch.rows, batch.cols)
+    ok = reach[np.arange(len(batch)), batch.goal]
+    if battery_required:
+        ok &= (reach & ((batch.flags & TILE_BATTERY) != 0)).any(axis=1)
+    return ok
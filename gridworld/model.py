@@ -0,0 +1,441 @@
+import zipfile
+import numpy as np
+from .envs import ExtendedGridEnv
+from ._tiles import (TILE_WALL, TILE_PIT, TILE_ICE, TILE_BUMPER, TILE_STICKY, TILE_CONVEYOR, TILE_TRAMPOLINE,
+                     TILE_WIND, TILE_PORTAL, TILE_TOLL, TILE_BATTERY, TILE_FORCING, DIR_DR, DIR_DC)
+
+
+class TransitionModel:
+    """
+    Explizites, dünn besetztes Übergangsmodell einer Umgebung im CSR-Format.
+    Zeile `s * num_actions + a` enthält die Folgezustände s' mit Wahrscheinlichkeit, Belohnung und done-Flag.
+    Daraus abgeleitet: R[s, a] (erwartete Belohnung) und done[s, a] (Wahrscheinlichkeit, dass die Episode endet).
+    """
+    _ARRAYS = ("indptr", "indices", "probs", "rewards", "dones", "R", "done")
+
+    def __init__(self, num_states, num_actions, indptr, indices, probs, rewards, dones, R=None, done=None):
+        self.num_states = int(num_states)
+        self.num_actions = int(num_actions)
+        self.indptr = indptr
+        self.indices = indices
+        self.probs = probs
+        self.rewards = rewards
+        self.dones = dones
+
+        # Zeilenindex pro Eintrag, für vektorisierte Summen über die Folgezustände
+        self._row_ids = np.repeat(np.arange(self.num_states * self.num_actions), np.diff(indptr))
+        if R is None:
+            R = self._row_sum(probs * rewards).astype(np.float32)
+        if done is None:
+            done = self._row_sum(probs * dones).astype(np.float32)
+        self.R = R
+        self.done = done
+
+    # ──────────────────────────────────────────────────────────────── #
+    def _row_sum(self, values):
+        sums = np.bincount(self._row_ids, weights=values, minlength=self.num_states * self.num_actions)
+        return sums.reshape(self.num_states, self.num_actions)
+
+    def row(self, state, action):
+        """
+        Folgezustände, Wahrscheinlichkeiten, Belohnungen und done-Flags für (state, action).
+        """
+        k = state * self.num_actions + action
+        lo, hi = self.indptr[k], self.indptr[k + 1]
+        return self.indices[lo:hi], self.probs[lo:hi], self.rewards[lo:hi], self.dones[lo:hi]
+
+    def backup(self, V, gamma):
+        """
+        Bellman-Backup für alle (s, a) auf einmal: Q[s, a] = Σ_s' P[s, a, s'] · (r + γ · (1 - done) · V[s']).
+        """
+        cont = self.probs * (self.rewards + gamma * (1.0 - self.dones) * V[self.indices])
+        return self._row_sum(cont)
+
+    # ──────────────────────────────────────────────────────────────── #
+    def save(self, path):
+        """
+        Speichert alle Arrays unkomprimiert als .npz, damit load() sie per Memory-Mapping zurücklesen kann.
+        """
+        np.savez(path, num_states=self.num_states, num_actions=self.num_actions,
+                 **{name: getattr(self, name) for name in self._ARRAYS})
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Lädt ein mit save() gespeichertes Modell. Mit `mmap=True` werden die Arrays nur eingeblendet, nicht kopiert.
+        """
+        arrays = _load_npz_memmap(path) if mmap else dict(np.load(path))
+        return cls(int(arrays["num_states"]), int(arrays["num_actions"]),
+                   **{name: arrays[name] for name in cls._ARRAYS})
+
+
+def _load_npz_memmap(path):
+    """
+    Blendet die Arrays einer unkomprimierten .npz-Datei schreibgeschützt per np.memmap ein.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"'{info.filename}' ist komprimiert und kann nicht eingeblendet werden.")
+            # lokalen Zip-Header überspringen (30 Bytes + Dateiname + Extra-Feld)
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject or not shape:
+                f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+                arrays[name] = np.lib.format.read_array(f)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                         order="F" if fortran else "C")
+    return arrays
+
+
+# ──────────────────────────────────────────────────────────────── #
+# Modell-Compiler
+# ──────────────────────────────────────────────────────────────── #
+def _solve_absorbing(start, expand, solved, min_prob=1e-10):
+    """
+    Löst die absorbierende Markow-Kette aller von `start` aus erreichbaren, noch nicht gelösten Zwischenzustände
+    (z. B. Eisfelder) mit einem einzigen linearen Gleichungssystem und trägt ihre Endverteilungen (dict Endfeld ->
+    Wahrscheinlichkeit, Einträge unter `min_prob` entfallen) in `solved` ein. `expand(state)` liefert eine Liste
+    (Wahrscheinlichkeit, Zwischenzustand, Endfeld), in der pro Eintrag genau eines von beiden nicht None ist.
+    """
+    order, index, succ = [start], {start: 0}, []
+    while len(succ) < len(order):
+        branches = expand(order[len(succ)])
+        succ.append(branches)
+        for _, state, _ in branches:
+            if state is not None and state not in solved and state not in index:
+                index[state] = len(order)
+                order.append(state)
+
+    columns = {}
+    for branches in succ:
+        for _, state, final in branches:
+            for f in (solved[state] if state in solved else ()) if final is None else (final,):
+                columns.setdefault(f, len(columns))
+    m = len(index)
+    T = np.zeros((m, m))
+    B = np.zeros((m, len(columns)))
+    for row, branches in enumerate(succ):
+        for p, state, final in branches:
+            if final is not None:
+                B[row, columns[final]] += p
+            elif state in index:
+                T[row, index[state]] += p
+            else:
+                for f, q in solved[state].items():
+                    B[row, columns[f]] += p * q
+
+    X = np.linalg.solve(np.eye(m) - T, B)
+    # verschwindend kleine Ausläufer (Rutschpartien über viele Felder) weglassen und die Zeile neu normieren
+    X[X < min_prob] = 0.0
+    X /= X.sum(axis=1, keepdims=True)
+    finals = list(columns)
+    for state, row in index.items():
+        solved[state] = {finals[k]: float(X[row, k]) for k in np.flatnonzero(X[row])}
+    return solved[start]
+
+
+def _chain_segment(env, idx, dr, dc, wind, visited, prob, out):
+    """
+    Läuft den deterministischen Teil einer Kette ab `idx` ab (wie ExtendedGridEnv._walk_chain) und hängt die Ergebnisse
+    als (Wahrscheinlichkeit, Eisfeld, Windrichtung, besuchte Felder, Endfeld) an `out` an: entweder ein noch nicht
+    besuchtes Eisfeld (Endfeld None) oder ein Endfeld (-1 = Mauer). Ist `wind` None, wird beim ersten Windfeld über
+    alle vier Richtungen verzweigt (je 25 %) und die Richtung für den Rest der Kette festgehalten.
+    """
+    flag_list, rows, cols = env._flag_list, env.rows, env.cols
+    while True:
+        flags = flag_list[idx]
+        if flags & TILE_WALL:
+            out.append((prob, None, wind, visited, -1))
+            return out
+        if flags & TILE_PORTAL:
+            out.append((prob, None, wind, visited, env._portal_list[idx]))
+            return out
+        if not flags & TILE_FORCING or idx in visited:
+            out.append((prob, None, wind, visited, idx))
+            return out
+        if flags & TILE_ICE:
+            out.append((prob, idx, wind, visited, None))
+            return out
+        visited = visited | {idx}
+
+        if flags & TILE_BUMPER and dr is not None:
+            dr, dc = -3 * dr, -3 * dc
+        elif flags & TILE_CONVEYOR:
+            d = env._conveyor_list[idx]
+            dr, dc = DIR_DR[d], DIR_DC[d]
+        elif flags & TILE_TRAMPOLINE and dr is not None:
+            dr, dc = 2 * dr, 2 * dc
+        elif flags & TILE_WIND:
+            if wind is None:
+                for w in range(4):
+                    _chain_segment(env, idx, dr, dc, w, visited - {idx}, prob * 0.25, out)
+                return out
+            dr, dc = DIR_DR[wind], DIR_DC[wind]
+        else:
+            out.append((prob, None, wind, visited, idx))
+            return out
+
+        idx = min(max(idx // cols + dr, 0), rows - 1) * cols + min(max(idx % cols + dc, 0), cols - 1)
+
+
+def _slips(env, idx, wind, visited, prob):
+    """
+    Ergebnisse von _chain_segment für die vier Rutschrichtungen (je 12,5 %) ab dem Eisfeld `idx`.
+    """
+    rows, cols = env.rows, env.cols
+    out = []
+    for d in range(4):
+        nxt = min(max(idx // cols + DIR_DR[d], 0), rows - 1) * cols + min(max(idx % cols + DIR_DC[d], 0), cols - 1)
+        _chain_segment(env, nxt, DIR_DR[d], DIR_DC[d], wind, visited | {idx}, prob * 0.125, out)
+    return out
+
+
+def _ice_outcomes(env, idx, wind, solved):
+    """
+    Endverteilung ab dem Eisfeld `idx` bei Windrichtung `wind`, in der sich jedes Eisfeld nur an sich selbst erinnert
+    (besuchte Felder früherer Kettenglieder sind vergessen). Wird pro Karte einmal als absorbierende Kette gelöst.
+    """
+    if (idx, wind) in solved:
+        return solved[(idx, wind)]
+
+    def expand(state):
+        i, w = state
+        return [(0.5, None, i)] + [(p, (j, w2) if final is None else None, final)
+                                   for p, j, w2, _, final in _slips(env, i, w, frozenset(), 1.0)]
+
+    return _solve_absorbing((idx, wind), expand, solved)
+
+
+def chain_outcomes(env, idx, dr, dc, origin, wind=None, solved=None, exact_slips=4):
+    """
+    Alle möglichen Endfelder der Kette erzwungener Bewegungen ab Feld `idx` (wie ExtendedGridEnv.check_proposed_pos).
+    Gibt ein dict Endfeld -> Wahrscheinlichkeit zurück. Eis verzweigt (50 % stehen bleiben, sonst je 12,5 % pro Richtung).
+    Ist `wind` None, wird beim ersten Windfeld über alle vier Richtungen verzweigt (je 25 %) und die Richtung
+    für den Rest der Kette festgehalten. Das ist nur eine Mischung pro Schritt; die Dynamik von reset(), das die
+    Richtung einmal pro Episode zieht, bildet erst ein festes `wind` ab (siehe compile_models).
+
+    Die ersten `exact_slips` Rutscher werden samt Schleifenerkennung (Stopp auf bereits besuchten Feldern) exakt
+    aufgezählt; danach (Restwahrscheinlichkeit höchstens 0.5^exact_slips) übernimmt die pro Eisfeld gelöste
+    absorbierende Kette aus `solved` (ein dict, das compile_model für alle Züge einer Karte teilt).
+    """
+    solved = {} if solved is None else solved
+    outcomes, tails = {}, {}
+
+    def resolve(segments, depth):
+        for prob, ice, w, visited, final in segments:
+            if final is not None:
+                outcomes[final] = outcomes.get(final, 0.0) + prob
+            elif depth >= exact_slips:
+                tails[(ice, w)] = tails.get((ice, w), 0.0) + prob
+            else:
+                outcomes[ice] = outcomes.get(ice, 0.0) + 0.5 * prob
+                resolve(_slips(env, ice, w, visited, prob), depth + 1)
+
+    resolve(_chain_segment(env, idx, dr, dc, wind, frozenset(), 1.0, []), 0)
+    for (ice, w), prob in tails.items():
+        for final, q in _ice_outcomes(env, ice, w, solved).items():
+            outcomes[final] = outcomes.get(final, 0.0) + prob * q
+    if -1 in outcomes:
+        outcomes[origin] = outcomes.get(origin, 0.0) + outcomes.pop(-1)
+    return outcomes
+
+
+def _outcome_reward(env, proposed, final, has_battery):
+    """
+    Belohnung und done-Flag eines Schritts, der auf `final` endet (wie ExtendedGridEnv.step im Anfangszustand der Karte).
+    """
+    flags = env._flag_list[final]
+    reward = env.reward_step
+    done = False
+    if flags & TILE_PIT:
+        reward = env.reward_pit
+        done = True
+    if flags & TILE_STICKY:
+        reward += env.reward_sticky  # ausgesetzter Folgezug wird sofort verrechnet
+    if flags & TILE_TOLL:
+        reward += env.reward_toll
+    if env._flag_list[proposed] & TILE_TRAMPOLINE:
+        reward += env.reward_trampoline
+    if final == env.to_index(*env.goal_pos):
+        if not env.battery_required or has_battery or flags & TILE_BATTERY:
+            reward = env.reward_goal
+            done = True
+    return reward, done
+
+
+_LARGE_DIRS = {"up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1)}
+
+
+def _large_segment(env, pos, d, prob, out):
+    """
+    Deterministischer Teil von LargeGridEnv._propagate_effects ab `pos` (Abpraller bis zum nächsten Eisfeld); hängt
+    (Wahrscheinlichkeit, Eisfeld, Endfeld) an `out` an. Ein Abpraller-Kreislauf (in der Umgebung eine Endlosschleife)
+    endet am aktuellen Feld.
+    """
+    opposite = {"up": "down", "down": "up", "left": "right", "right": "left"}
+    goal, tile_map = env.goal_pos, env.tile_map
+    seen = set()
+    while True:
+        tile = tile_map.get(pos)
+        if pos == goal or tile == "pit":
+            break
+        if tile == "ice":
+            out.append((prob, pos, None))
+            return out
+        if tile == "bumper":
+            if (pos, d) in seen:
+                break
+            seen.add((pos, d))
+            d = opposite[d]
+            for _ in range(3):
+                pos = _large_move(env, pos, d)
+                if pos == goal or tile_map.get(pos) == "pit":
+                    break
+            continue
+        break
+    out.append((prob, None, env.to_index(*pos)))
+    return out
+
+
+def _large_move(env, pos, d):
+    r, c = pos
+    dr, dc = _LARGE_DIRS[d]
+    return min(max(r + dr, 0), env.rows - 1), min(max(c + dc, 0), env.cols - 1)
+
+
+def _large_outcomes(env, pos, direction, solved=None):
+    """
+    Alle möglichen Endfelder von LargeGridEnv._propagate_effects ab `pos` als dict Feld -> Wahrscheinlichkeit.
+    Eis hat kein Gedächtnis (50 % stehen bleiben, sonst je 12,5 % pro Richtung); die Endverteilungen ab allen
+    Eisfeldern werden daher einmal als absorbierende Kette gelöst und in `solved` für weitere Züge gemerkt.
+    """
+    solved = {} if solved is None else solved
+
+    def expand(ice):
+        out = [(0.5, None, env.to_index(*ice))]
+        for slip in ("up", "down", "left", "right"):
+            _large_segment(env, _large_move(env, ice, slip), slip, 0.125, out)
+        return out
+
+    outcomes = {}
+    for prob, ice, final in _large_segment(env, pos, direction, 1.0, []):
+        dist = {final: 1.0} if ice is None else solved.get(ice) or _solve_absorbing(ice, expand, solved)
+        for k, q in dist.items():
+            outcomes[k] = outcomes.get(k, 0.0) + prob * q
+    return outcomes
+
+
+def _compile_large_model(env):
+    """
+    TransitionModel für ein LargeGridEnv (Eis, Abpraller, Gruben, Ziel).
+    """
+    num_states, num_actions = env.rows * env.cols, 4
+    goal = env.to_index(*env.goal_pos)
+    indptr = np.zeros(num_states * num_actions + 1, dtype=np.int64)
+    indices, probs, rewards, dones = [], [], [], []
+    solved = {}  # Endverteilungen ab Eisfeldern, für alle Züge gemeinsam
+
+    for s in range(num_states):
+        pos = env.from_index(s)
+        absorbing = s == goal or env.tile_map.get(pos) == "pit"
+        for a in range(num_actions):
+            if absorbing:
+                outcomes = {s: 1.0}
+            else:
+                d = env.action_map[a]
+                outcomes = _large_outcomes(env, _large_move(env, pos, d), d, solved)
+            for final, p in sorted(outcomes.items()):
+                if absorbing:
+                    reward, done = 0.0, True
+                elif final == goal:
+                    reward, done = env.reward_goal, True
+                elif env.tile_map.get(env.from_index(final)) == "pit":
+                    reward, done = env.reward_pit, True
+                else:
+                    reward, done = env.reward_step, False
+                indices.append(final)
+                probs.append(p)
+                rewards.append(reward)
+                dones.append(done)
+            indptr[s * num_actions + a + 1] = len(indices)
+
+    return TransitionModel(num_states, num_actions, indptr,
+                           np.asarray(indices, dtype=np.int32),
+                           np.asarray(probs, dtype=np.float64),
+                           np.asarray(rewards, dtype=np.float64),
+                           np.asarray(dones, dtype=np.float64))
+
+
+def compile_model(env, wind=None, has_battery=False):
+    """
+    Übersetzt eine ExtendedGridEnv-Karte in ein TransitionModel über die Zustände to_index(r, c).
+    Für ein einfaches LargeGridEnv werden dessen Eis-/Abpraller-Regeln abgebildet (`wind` und `has_battery` entfallen).
+
+    - Eis wird mit seinen Rutschwahrscheinlichkeiten exakt abgebildet.
+    - `wind` (0..3) legt die Windrichtung fest, die reset() einmal pro Episode zieht; compile_models liefert alle vier.
+      `wind=None` mischt die vier Richtungen dagegen in jedem Schritt neu (je 25 %). Das ist *nicht* die Dynamik der
+      Umgebung, in der eine Richtung die ganze Episode über gilt, sondern nur eine Näherung.
+    - Dynamische Felder werden im Anfangszustand der Karte ausgewertet: Einsturzfelder sind intakt, Zeit-Juwelen
+      fließen als einmalige Boni nicht ein, und ob der Agent eine Batterie trägt, legt `has_battery` fest.
+    - Der durch Klebrigen Schlamm ausgesetzte Zug wird als sofortige Strafe verrechnet.
+    - Ziel und Gruben sind absorbierend (Belohnung 0, done), genau wie step() nach Episodenende.
+    """
+    if not isinstance(env, ExtendedGridEnv):
+        return _compile_large_model(env)
+
+    rows, cols = env.rows, env.cols
+    num_states, num_actions = rows * cols, 4
+    goal = env.to_index(*env.goal_pos)
+    goal_terminal = not env.battery_required or has_battery
+
+    indptr = np.zeros(num_states * num_actions + 1, dtype=np.int64)
+    indices, probs, rewards, dones = [], [], [], []
+    solved = {}  # Endverteilungen ab Eisfeldern, für alle Züge gemeinsam
+
+    for s in range(num_states):
+        flags = env._flag_list[s]
+        absorbing = flags & TILE_PIT or (s == goal and goal_terminal)
+        r, c = divmod(s, cols)
+        for a in range(num_actions):
+            if absorbing or flags & TILE_WALL:
+                indices.append(s)
+                probs.append(1.0)
+                rewards.append(0.0)
+                dones.append(bool(absorbing))
+            else:
+                dr, dc = DIR_DR[a], DIR_DC[a]
+                proposed = min(max(r + dr, 0), rows - 1) * cols + min(max(c + dc, 0), cols - 1)
+                for final, p in sorted(chain_outcomes(env, proposed, dr, dc, s, wind, solved).items()):
+                    reward, done = _outcome_reward(env, proposed, final, has_battery)
+                    indices.append(final)
+                    probs.append(p)
+                    rewards.append(reward)
+                    dones.append(done)
+            indptr[s * num_actions + a + 1] = len(indices)
+
+    return TransitionModel(num_states, num_actions, indptr,
+                           np.asarray(indices, dtype=np.int32),
+                           np.asarray(probs, dtype=np.float64),
+                           np.asarray(rewards, dtype=np.float64),
+                           np.asarray(dones, dtype=np.float64))
+
+
+def compile_models(env, has_battery=False):
+    """
+    Ein TransitionModel je Windrichtung, die reset() ziehen kann (alle gleich wahrscheinlich), als Liste in der
+    Reihenfolge 0..3. Ohne Windfelder (oder für ein LargeGridEnv) hängt nichts von der Richtung ab, dann enthält die
+    Liste nur ein Modell.
+    """
+    if not isinstance(env, ExtendedGridEnv) or not env.wind_positions:
+        return [compile_model(env, has_battery=has_battery)]
+    return [compile_model(env, wind=w, has_battery=has_battery) for w in range(4)]
@@ -0,0 +1,134 @@
+import numpy as np
+from .model import compile_models
+
+
+def value_iteration(
+        env,
+        gamma=0.95,                 # Diskontierungsfaktor / discount rate
+        theta=1e-6,                 # Abbruch, sobald sich V um weniger als theta ändert / convergence threshold
+        max_iterations=10000,
+        model=None                  # vorkompiliertes TransitionModel (sonst je Windrichtung kompiliert) / precompiled model
+):
+    """
+    Berechne die optimale Q-Tabelle per Wertiteration über das Übergangsmodell der Umgebung.
+    Gibt wie q_learning eine (rows*cols, 4) float32 Q-Tabelle zurück; ohne `model` siehe _env_models.
+    """
+    if model is None:
+        return _mean_q([value_iteration(env, gamma, theta, max_iterations, m) for m in _env_models(env)])
+
+    V = np.zeros(model.num_states, dtype=np.float64)
+    Q = model.backup(V, gamma)
+    for _ in range(max_iterations):
+        V_new = Q.max(axis=1)
+        delta = np.abs(V_new - V).max()
+        V = V_new
+        Q = model.backup(V, gamma)
+        if delta < theta:
+            break
+
+    return Q.astype(np.float32)
+
+
+def policy_iteration(
+        env,
+        gamma=0.95,                 # Diskontierungsfaktor / discount rate
+        theta=1e-6,                 # Genauigkeit der Policy-Bewertung / accuracy of policy evaluation
+        max_iterations=1000,
+        model=None                  # vorkompiliertes TransitionModel (sonst je Windrichtung kompiliert) / precompiled model
+):
+    """
+    Berechne die optimale Q-Tabelle per Policy-Iteration (iterative Bewertung + gierige Verbesserung).
+    Gibt wie q_learning eine (rows*cols, 4) float32 Q-Tabelle zurück; ohne `model` siehe _env_models.
+    """
+    if model is None:
+        return _mean_q([policy_iteration(env, gamma, theta, max_iterations, m) for m in _env_models(env)])
+
+    S, A = model.num_states, model.num_actions
+    policy = np.zeros(S, dtype=np.int64)
+    V = np.zeros(S, dtype=np.float64)
+    entry_state = model._row_ids // A
+    entry_action = model._row_ids % A
+
+    for _ in range(max_iterations):
+        # Policy-Bewertung: nur die Einträge der gewählten Aktionen behalten
+        chosen = entry_action == policy[entry_state]
+        rows = entry_state[chosen]
+        nxt = model.indices[chosen]
+        p = model.probs[chosen]
+        r = np.bincount(rows, weights=p * model.rewards[chosen], minlength=S)
+        p_cont = p * (1.0 - model.dones[chosen])
+        for _ in range(max_iterations):
+            V_new = r + gamma * np.bincount(rows, weights=p_cont * V[nxt], minlength=S)
+            delta = np.abs(V_new - V).max()
+            V = V_new
+            if delta < theta:
+                break
+
+        # Policy-Verbesserung
+        Q = model.backup(V, gamma)
+        new_policy = Q.argmax(axis=1)
+        # nur wechseln, wenn die neue Aktion echt besser ist (verhindert Pendeln bei Gleichstand)
+        keep = Q[np.arange(S), policy] >= Q[np.arange(S), new_policy] - theta
+        new_policy[keep] = policy[keep]
+        if np.array_equal(new_policy, policy):
+            break
+        policy = new_policy
+
+    return model.backup(V, gamma).astype(np.float32)
+
+
+def _env_models(env):
+    """
+    Modelle für die Planung ohne vorgegebenes `model`: eines je Windrichtung, die reset() ziehen kann (compile_models).
+    Geplant wird je Richtung, zurück kommt der Mittelwert der Q-Tabellen, also der erwartete Wert über die gezogene
+    Richtung für einen Agenten, der sie kennt. Die gierige Policy auf dem Mittelwert sieht nur die Position.
+    """
+    if getattr(env, "battery_required", False):
+        raise ValueError("Karten mit battery_required werden ohne `model` nicht unterstützt: ob das Ziel die Episode "
+                         "beendet, hängt davon ab, ob die Batterie schon aufgesammelt wurde. "
+                         "compile_model(env, has_battery=...) explizit als `model` übergeben.")
+    return compile_models(env)
+
+
+def _mean_q(tables):
+    return np.mean(tables, axis=0, dtype=np.float64).astype(np.float32)
+
+
+def fitted_q_iteration(
+        env,
+        dataset,                    # Übergänge: dict mit Spalten state/action/reward/next_state/done oder TransitionRecorder
+        gamma=0.95,                 # Diskontierungsfaktor / discount rate
+        alpha=None,                 # Schrittweite je Iteration (None = volle Ersetzung) / step size per sweep (None = full backup)
+        theta=1e-6,                 # Abbruch, sobald sich Q um weniger als theta ändert / convergence threshold
+        max_iterations=1000,
+        Q=None                      # Start-Q-Tabelle / initial Q table
+):
+    """
+    Offline-Training aus aufgezeichneten Übergängen: wendet wiederholt eine vektorisierte Q-Backup über den
+    gesamten Datensatz an, Q(s, a) ← Mittel über alle (s, a)-Übergänge von r + gamma · max Q(s') (bei done ohne s').
+    (s, a)-Paare ohne Daten behalten ihren Startwert. Gibt wie q_learning eine (rows*cols, 4) float32 Q-Tabelle zurück.
+    """
+    if hasattr(dataset, 'columns'):
+        dataset = dataset.columns()
+
+    S, A = env.rows * env.cols, 4
+    keys = np.asarray(dataset['state'], dtype=np.int64) * A + np.asarray(dataset['action'], dtype=np.int64)
+    next_state = np.asarray(dataset['next_state'], dtype=np.int64)
+    cont = 1.0 - np.asarray(dataset['done'], dtype=np.float64)
+
+    counts = np.bincount(keys, minlength=S * A)
+    seen = np.flatnonzero(counts)
+    reward_sum = np.bincount(keys, weights=np.asarray(dataset['reward'], dtype=np.float64), minlength=S * A)[seen]
+    counts = counts[seen]
+
+    q = np.zeros(S * A, dtype=np.float64) if Q is None else np.array(Q, dtype=np.float64).reshape(S * A)
+    for _ in range(max_iterations):
+        V = q.reshape(S, A).max(axis=1)
+        target = (reward_sum + gamma * np.bincount(keys, weights=cont * V[next_state], minlength=S * A)[seen]) / counts
+        new = target if alpha is None else q[seen] + alpha * (target - q[seen])
+        delta = np.abs(new - q[seen]).max() if seen.size else 0.0
+        q[seen] = new
+        if delta < theta:
+            break
+
+    return q.reshape(S, A).astype(np.float32)
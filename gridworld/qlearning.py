@@ -1,5 +1,9 @@
 import numpy as np
-
+from .envs import ExtendedGridEnv
+from .vec_env import VecExtendedGridEnv
+from .checkpoint import open_checkpoint, save_checkpoint
+from .qstore import DenseQStore, LazyQTable, make_q_store
+from ._tiles import (TILE_PIT, TILE_STICKY, TILE_TRAMPOLINE, TILE_COLLAPSE, TILE_TOLL, TILE_BATTERY, TILE_GEM)
 
 def q_learning(
         env,
@@ -12,37 +16,140 @@ def q_learning(
         epsilon_min=0.01,
         max_steps=100,              # Begrenzung der Schritte pro Episode, um endloses Umherwandern zu verhindern / limit on steps per episode to prevent infinite wandering
         record_interval=20,         # Intervall für die Speicherung von Trainingsepisoden / interval for storing training episodes
-        report_interval=20          # Intervall für die Meldung der Episodenbelohnung / interval for reporting episode reward
+        report_interval=20,         # Intervall für die Meldung der Episodenbelohnung / interval for reporting episode reward
+        fast=False,                 # schneller Trainingsmodus für ExtendedGridEnv / fast training mode for ExtendedGridEnv
+        Q=None,                     # vorhandene Q-Tabelle, mit der weitertrainiert wird / existing Q table to resume from
+        start_episode=0,            # Nummer der ersten Episode beim Fortsetzen / index of the first episode when resuming
+        checkpoint=None,            # Verzeichnis für memory-mapped Q + Checkpoints / directory for memory-mapped Q + checkpoints
+        checkpoint_interval=100,    # Intervall (Episoden) zwischen Checkpoints / episodes between checkpoints
+        resume=False,               # Lauf aus dem Checkpoint exakt fortsetzen / continue the run from its checkpoint
+        recorder=None,              # TransitionRecorder für alle Übergänge / TransitionRecorder for every transition
+        episode_log=None,           # EpisodeLog: jede Episode als (Zufallszustand, Aktionen) / every episode as (RNG state, actions)
+        encoder=None,               # StateEncoder für den erweiterten Zustand / StateEncoder for the augmented state
+        backend=None,               # Q-Backend: "dense", "float16" oder "sparse" / Q backend
+        shaping=None                # Potential für Reward Shaping / potential for reward shaping
 ):
     """
     Trainiere einen tabellarischen Q-Learning-Agenten in der gegebenen Umgebung.
+    Zum Fortsetzen eines Trainings Q, das aktuelle epsilon (siehe decay_epsilon) und start_episode übergeben;
+    Episodennummern und ε-Abklingen laufen dann ab start_episode weiter.
+    Mit `checkpoint` liegt Q als np.memmap im Verzeichnis und alle checkpoint_interval Episoden werden eine Kopie
+    von Q, Episodennummer, epsilon, Zufallszustände, Belohnungsverlauf und Laufbahnen gespeichert; resume=True setzt
+    einen abgebrochenen Lauf (mit denselben Argumenten aufgerufen) exakt an dieser Stelle fort.
+    Ein `recorder` (TransitionRecorder) protokolliert jeden Übergang unabhängig von record_interval.
+    Ein `episode_log` (EpisodeLog) speichert jede Episode nur als Zustand von env.rng plus Aktionsfolge und kann sie
+    später neu simulieren; mit record_interval=None werden dann keine Positionslisten mehr gespeichert.
+    Mit `encoder` (StateEncoder) lernt der Agent auf dem vollständigen dynamischen Zustand statt nur auf der Position;
+    Q ist dann standardmäßig eine LazyQTable (Zeilen nur für besuchte Zustände), und ein recorder protokolliert deren
+    Zeilennummern. `backend` wählt die Q-Darstellung (siehe make_q_store); ohne backend und encoder bleibt Q ein
+    float32-ndarray. Alternativ kann als Q ein vorhandenes Backend (DenseQStore/LazyQTable) übergeben werden.
+    fast=True unterstützt neben dem ndarray nur das float32-Backend "dense", checkpoint nur das ndarray.
+    `shaping` ist ein Potential Φ pro Feld, Form (rows*cols,) oder (2, rows*cols) mit Zeile 0/1 ohne/mit Batterie,
+    z. B. analyze_layout(env).potential(). Die Q-Updates verwenden dann r + γΦ(s') - Φ(s) (Φ = 0 am Episodenende);
+    rewards_history und recorder enthalten weiterhin die unveränderten Belohnungen.
     """
-    num_states = env.rows * env.cols
-    num_actions = 4  # up/down/left/right
-
-    # Q‑Tabelle initialisieren (Anzahl_Zustände × Anzahl_Aktionen)
-    Q = np.zeros((num_states, num_actions), dtype=np.float32)
+    end_episode = start_episode + num_episodes
 
     # Listen zur Speicherung der Trainingsdaten initialisieren
     stored_trajectories = {}  # key=Episode, value=Liste der gesehenen Zustände
     rewards_history = []
 
-    for episode in range(num_episodes):
+    # Explorations-Zufallsstrom: Kind-Strom des Generators der Umgebung (reproduzierbar über deren Seed)
+    rng = env.rng.spawn()
+    potential = _shaping_potential(env, shaping)
+
+    store = None
+    if isinstance(Q, (DenseQStore, LazyQTable)):
+        store = Q
+    elif backend is not None or encoder is not None:
+        if Q is not None:
+            raise ValueError("Mit backend/encoder muss Q ein Q-Backend (oder None) sein.")
+        num_states = encoder.size if encoder is not None else env.rows * env.cols
+        store = make_q_store(backend or "sparse", num_states, encoder=encoder)
+    if store is not None:
+        if encoder is None:
+            encoder = store.encoder
+        store.encoder = encoder
+        if checkpoint is not None:
+            raise ValueError("checkpoint wird nur mit dem ndarray-Q (ohne backend/encoder) unterstützt.")
+        if fast and (encoder is not None or store.backend != "dense"):
+            raise ValueError("fast=True unterstützt nur das Backend \"dense\" ohne encoder.")
+        Q = store.values
+
+    save = None
+    if checkpoint is not None:
+        Q_init = Q
+        Q, state = open_checkpoint(checkpoint, (env.rows * env.cols, 4), resume)
+        if state is None:
+            Q[:] = _initial_q(env, Q_init)
+        else:
+            start_episode, epsilon = state['episode'], state['epsilon']
+            rewards_history.extend(state['rewards_history'])
+            stored_trajectories.update(state['stored_trajectories'])
+            rng.set_state(state['random_state']['trainer'])
+            env.rng.set_state(state['random_state']['env'])
+
+        def save(next_episode, epsilon):
+            save_checkpoint(checkpoint, Q, {
+                'episode': next_episode,
+                'epsilon': epsilon,
+                'random_state': {'trainer': rng.get_state(), 'env': env.rng.get_state()},
+                'rewards_history': rewards_history,
+                'stored_trajectories': stored_trajectories,
+            })
+    elif resume:
+        raise ValueError("resume=True benötigt ein checkpoint-Verzeichnis.")
+    elif store is None:
+        Q = _initial_q(env, Q)
+
+    if fast:
+        Q, stored_trajectories, rewards_history = _q_learning_fast(
+            env, end_episode - start_episode, alpha, gamma, epsilon, epsilon_decay_factor, epsilon_decay_interval,
+            epsilon_min, max_steps, record_interval, Q, start_episode, stored_trajectories, rewards_history, save,
+            checkpoint_interval, recorder, episode_log, rng, potential)
+        return (Q if store is None else store), stored_trajectories, rewards_history
+
+    num_actions = 4  # up/down/left/right
+    cols = env.cols
+
+    for episode in range(start_episode, end_episode):
+        if episode_log is not None:
+            rng_state = env.rng.get_state()
+            actions = bytearray()
         state = env.reset()
+        if store is not None:
+            state = store.row(encoder.encode(env) if encoder is not None else state)
+            Q = store.values
         episode_reward = 0.0
         trajectory = [env.agent_pos]
+        if potential is not None:
+            phi = potential[0][env.agent_pos[0] * cols + env.agent_pos[1]]
 
         for t in range(max_steps):
             # Epsilon-greedy Aktions-Auswahl
-            if np.random.rand() < epsilon:
-                action = np.random.randint(num_actions)
+            if rng.random() < epsilon:
+                action = rng.integers(num_actions)
             else:
                 action = np.argmax(Q[state])
 
             next_state, reward, done = env.step(action)
+            if store is not None:
+                next_state = store.row(encoder.encode(env) if encoder is not None else next_state)
+                Q = store.values
 
             episode_reward += reward
             trajectory.append(env.agent_pos)
+            if recorder is not None:
+                recorder.append(episode, t, state, action, reward, next_state, done)
+            if episode_log is not None:
+                actions.append(action)
+
+            # Potential-basiertes Reward Shaping (nur für das Update)
+            if potential is not None:
+                r, c = env.agent_pos
+                phi_next = 0.0 if done else potential[env.has_battery][r * cols + c]
+                reward += gamma * phi_next - phi
+                phi = phi_next
 
             # Q-learning update
             best_next_q = np.max(Q[next_state])
@@ -54,6 +161,8 @@ def q_learning(
                 break
 
         rewards_history.append(episode_reward)
+        if episode_log is not None:
+            episode_log.add(episode, rng_state, actions)
 
         # ε-annealing
         if (epsilon_decay_factor is not None and (episode + 1) % epsilon_decay_interval == 0):
@@ -61,7 +170,7 @@ def q_learning(
 
         # Ende der Episode
         # Speichere die Laufbahn alle 'record_interval' Episoden
-        if episode % record_interval == 0:
+        if record_interval is not None and episode % record_interval == 0:
             stored_trajectories[episode] = trajectory[:]
 
         # Dokumentiere Belohnungs-Fortschritt
@@ -69,4 +178,466 @@ def q_learning(
         #    avg_r = np.mean(rewards_history[-report_interval:])
         #    print(f"Episode {episode}, Avg reward (last {report_interval} ep.): {avg_r:.2f}")
 
-    return Q, stored_trajectories, rewards_history
\ No newline at end of file
+        if save is not None and (episode + 1) % checkpoint_interval == 0:
+            save(episode + 1, epsilon)
+
+    if save is not None:
+        save(end_episode, epsilon)
+    if recorder is not None:
+        recorder.flush()
+
+    return (Q if store is None else store), stored_trajectories, rewards_history
+
+
+def _shaping_potential(env, shaping):
+    """
+    Potential als zwei Python-Listen (ohne / mit Batterie) für schnellen skalaren Zugriff.
+    """
+    if shaping is None:
+        return None
+    if not isinstance(env, ExtendedGridEnv):
+        raise ValueError("shaping wird nur für ExtendedGridEnv unterstützt.")
+    potential = np.asarray(shaping, dtype=np.float64)
+    num_cells = env.rows * env.cols
+    if potential.shape == (num_cells,):
+        potential = np.stack([potential, potential])
+    if potential.shape != (2, num_cells):
+        raise ValueError(f"shaping hat die Form {potential.shape}, erwartet wird ({num_cells},) oder (2, {num_cells}).")
+    return potential.tolist()
+
+
+def _initial_q(env, Q):
+    """
+    Q-Tabelle initialisieren (Anzahl_Zustände × Anzahl_Aktionen) bzw. die übergebene Tabelle als float32 übernehmen.
+    """
+    shape = (env.rows * env.cols, 4)
+    if Q is None:
+        return np.zeros(shape, dtype=np.float32)
+    Q = np.array(Q, dtype=np.float32)
+    if Q.shape != shape:
+        raise ValueError(f"Q hat die Form {Q.shape}, erwartet wird {shape}.")
+    return Q
+
+
+def decay_epsilon(epsilon, num_episodes, epsilon_decay_factor=None, epsilon_decay_interval=1, epsilon_min=0.01,
+                  start_episode=0):
+    """
+    Gibt epsilon nach num_episodes Episoden (ab start_episode) mit demselben Abklingplan wie q_learning zurück.
+    """
+    if epsilon_decay_factor is None:
+        return epsilon
+    for episode in range(start_episode, start_episode + num_episodes):
+        if (episode + 1) % epsilon_decay_interval == 0:
+            epsilon = max(epsilon_min, epsilon * epsilon_decay_factor)
+    return epsilon
+
+
+def _q_learning_fast(env, num_episodes, alpha, gamma, epsilon, epsilon_decay_factor, epsilon_decay_interval,
+                     epsilon_min, max_steps, record_interval, Q, start_episode, stored_trajectories, rewards_history,
+                     save, checkpoint_interval, recorder, episode_log, rng, potential=None):
+    """
+    Schneller Trainingsmodus von q_learning für ExtendedGridEnv.
+    Explorations-Zufallszahlen werden blockweise gezogen, die Q-Tabelle wird über einen flachen float32-memoryview
+    gelesen und geschrieben, und deterministische Übergänge kommen aus einer vorberechneten Tabelle pro Karte.
+    Nur Ketten über Eis werden zur Laufzeit von der Umgebung aufgelöst (mit demselben Zufallsstrom wie env.step).
+    """
+    if not isinstance(env, ExtendedGridEnv):
+        raise ValueError("fast=True wird nur für ExtendedGridEnv unterstützt.")
+
+    num_actions = 4
+
+    q = memoryview(Q).cast("B").cast("f")  # flache Sicht: q[s * 4 + a], schreibt mit float32-Rundung zurück
+    end_episode = start_episode + num_episodes
+
+    # ───────── Karte in lokale Variablen / Tabellen übernehmen ─────────
+    cols = env.cols
+    proposed_table, tables = env._transition_table()
+    start = env.to_index(*env.start_pos)
+    goal = env.to_index(*env.goal_pos)
+    flag_list = env._flag_list
+    collapse_slot, battery_slot, gem_slot = env._collapse_slot_list, env._battery_slot_list, env._gem_slot_list
+    moves = [env.action_map[a] for a in range(num_actions)]
+    resolve_chain = env._resolve_chain
+    reward_step, reward_pit, reward_goal = env.reward_step, env.reward_pit, env.reward_goal
+    reward_sticky, reward_toll, reward_trampoline = env.reward_sticky, env.reward_toll, env.reward_trampoline
+    reward_jewel_pos, reward_jewel_neg, jewel_steps = env.reward_jewel_pos, env.reward_jewel_neg, env.jewel_steps
+    battery_required = env.battery_required
+    record_transition = recorder.append if recorder is not None else None
+
+    # ───────── Zufallszahlen blockweise: je Schritt eine für die Exploration, eine für die Zufallsaktion ─────────
+    block = rng.block_size - rng.block_size % 2
+    uniforms = rng.uniform_list(block)
+    k = 0
+    log_actions = episode_log is not None
+    env_rng = env.rng
+
+    for episode in range(start_episode, end_episode):
+        if log_actions:
+            rng_state = env_rng.get_state()
+            actions = bytearray()
+        # entspricht env.reset(): Windrichtung aus dem Zufallsstrom der Umgebung ziehen
+        env.wind_dir_idx = env_rng.integers(0, 4)
+        state = start
+        table = tables[env.wind_dir_idx]
+        has_battery = False
+        battery_mask, gem_mask, collapsed_mask = env._battery_full, env._gem_full, 0
+        skip_turns = step_count = 0
+        done = False
+        episode_reward = 0.0
+        if potential is not None:
+            phi = potential[0][state]
+        record = record_interval is not None and episode % record_interval == 0
+        if record:
+            trajectory = [env.start_pos]
+
+        for t in range(max_steps):
+            if k == block:
+                uniforms = rng.uniform_list(block)
+                k = 0
+
+            # Epsilon-greedy Aktions-Auswahl (bei Gleichstand die erste Aktion, wie np.argmax)
+            base = state * 4
+            if uniforms[k] < epsilon:
+                action = int(uniforms[k + 1] * 4)
+            else:
+                action, best = 0, q[base]
+                if q[base + 1] > best:
+                    action, best = 1, q[base + 1]
+                if q[base + 2] > best:
+                    action, best = 2, q[base + 2]
+                if q[base + 3] > best:
+                    action = 3
+            k += 2
+
+            # ───────── Schritt (entspricht ExtendedGridEnv.step) ─────────
+            step_count += 1
+            if skip_turns > 0:
+                skip_turns -= 1
+                next_state, reward = state, reward_sticky
+            else:
+                i = base + action
+                final = table[i]
+                proposed = proposed_table[i]
+                if final is None:
+                    dr, dc = moves[action]
+                    final = resolve_chain(proposed, dr, dc, state)
+                flags = flag_list[final]
+                if flags & TILE_STICKY:
+                    skip_turns = 1
+
+                reward = reward_step
+                if flags & TILE_COLLAPSE:
+                    bit = 1 << collapse_slot[final]
+                    collapsed = collapsed_mask & bit
+                else:
+                    bit = collapsed = 0
+                if flags & TILE_PIT or collapsed:
+                    reward = reward_pit
+                    done = True
+                elif bit:
+                    collapsed_mask |= bit
+                if flags & TILE_TOLL:
+                    reward += reward_toll
+                if flag_list[proposed] & TILE_TRAMPOLINE:
+                    reward += reward_trampoline
+                if flags & TILE_BATTERY:
+                    bit = 1 << battery_slot[final]
+                    if battery_mask & bit:
+                        has_battery = True
+                        battery_mask &= ~bit
+                if flags & TILE_GEM:
+                    bit = 1 << gem_slot[final]
+                    if gem_mask & bit:
+                        reward += reward_jewel_pos if step_count < jewel_steps else reward_jewel_neg
+                        gem_mask &= ~bit
+                if final == goal and (not battery_required or has_battery):
+                    reward = reward_goal
+                    done = True
+                next_state = final
+
+            episode_reward += reward
+            if record:
+                trajectory.append((next_state // cols, next_state % cols))
+            if record_transition is not None:
+                record_transition(episode, t, state, action, reward, next_state, done)
+            if log_actions:
+                actions.append(action)
+
+            # Potential-basiertes Reward Shaping (nur für das Update)
+            if potential is not None:
+                phi_next = 0.0 if done else potential[has_battery][next_state]
+                reward += gamma * phi_next - phi
+                phi = phi_next
+
+            # Q-learning update
+            nb = next_state * 4
+            best_next_q = max(q[nb], q[nb + 1], q[nb + 2], q[nb + 3])
+            i = base + action
+            q[i] += alpha * (reward + gamma * best_next_q - q[i])
+
+            state = next_state
+
+            if done:
+                break
+
+        rewards_history.append(episode_reward)
+        if log_actions:
+            episode_log.add(episode, rng_state, actions)
+
+        # ε-annealing
+        if (epsilon_decay_factor is not None and (episode + 1) % epsilon_decay_interval == 0):
+            epsilon = max(epsilon_min, epsilon * epsilon_decay_factor)
+
+        if record:
+            stored_trajectories[episode] = trajectory
+
+        if save is not None and (episode + 1) % checkpoint_interval == 0:
+            save(episode + 1, epsilon)
+            k = block  # nächsten Block aus dem gespeicherten Zustand ziehen, wie beim Fortsetzen
+
+    # Zustand der Umgebung auf das Ende der letzten Episode setzen
+    if num_episodes > 0:
+        env.agent_pos = (state // cols, state % cols)
+        env.visited = {env.start_pos}
+        env.has_battery, env.skip_turns, env.step_count, env.done = has_battery, skip_turns, step_count, done
+        env._battery_mask, env._gem_mask, env._collapsed_mask = battery_mask, gem_mask, collapsed_mask
+
+    if save is not None:
+        save(end_episode, epsilon)
+    if recorder is not None:
+        recorder.flush()
+
+    return Q, stored_trajectories, rewards_history
+
+
+def q_learning_batched(
+        vec_env,
+        num_episodes=200,
+        alpha=0.1,                  # Lernrate / learning rate
+        gamma=0.95,                 # Diskontierungsfaktor / discount rate
+        epsilon=0.1,                # Explorationsrate / exploration rate (epsilon-greedy strategy)
+        epsilon_decay_factor=None,
+        epsilon_decay_interval=1,
+        epsilon_min=0.01,
+        max_steps=100,              # Begrenzung der Schritte pro Episode / limit on steps per episode
+        record_interval=20,         # Intervall für die Speicherung von Trainingsepisoden / interval for storing training episodes
+        recorder=None               # TransitionRecorder für alle Übergänge / TransitionRecorder for every transition
+):
+    """
+    Trainiere eine gemeinsame Q-Tabelle mit N epsilon-greedy Akteuren auf einer VecExtendedGridEnv.
+    Die Episoden laufen in Runden zu je N Episoden; die N Übergänge eines Schritts werden in einem
+    vektorisierten Update angewendet. Mehrfach vorkommende (s, a)-Paare werden dabei so verrechnet,
+    als wären ihre Updates nacheinander (mit den Zielwerten vom Beginn des Schritts) ausgeführt worden.
+    Gibt wie q_learning (Q, stored_trajectories, rewards_history) zurück, Episoden nummeriert als Runde * N + Akteur.
+    Für eine VecExtendedGridEnv über mehrere Karten gibt es q_learning_multi.
+    """
+    if vec_env.num_maps != 1:
+        raise ValueError(f"q_learning_batched trainiert eine einzelne Karte, die VecExtendedGridEnv enthält "
+                         f"{vec_env.num_maps}; für mehrere Karten q_learning_multi verwenden.")
+    num_envs = vec_env.num_envs
+    num_states = vec_env.num_states
+    num_actions = 4
+    cols = vec_env.cols
+
+    Q = np.zeros((num_states, num_actions), dtype=np.float32)
+    q = Q.reshape(-1)
+    rng = vec_env.rng.spawn()  # Explorations-Zufallsstrom
+
+    stored_trajectories = {}
+    rewards_history = []
+
+    for first in range(0, num_episodes, num_envs):
+        n = min(num_envs, num_episodes - first)
+        pos = vec_env.reset()
+        # überzählige Akteure der letzten Runde gelten als fertig und werden von step() übersprungen
+        active = np.arange(num_envs) < n
+        vec_env.done[~active] = True
+        episode_reward = np.zeros(num_envs, dtype=np.float64)
+
+        recorded = [e for e in range(first, first + n) if record_interval is not None and e % record_interval == 0]
+        if recorded:
+            path = [pos.copy()]
+            ended = np.full(num_envs, max_steps, dtype=np.int64)
+
+        for t in range(max_steps):
+            idx = np.flatnonzero(active)
+            if idx.size == 0:
+                break
+
+            # Epsilon-greedy Aktions-Auswahl für alle Akteure
+            actions = Q[pos].argmax(axis=1)
+            explore = rng.random(num_envs) < epsilon
+            actions[explore] = rng.integers(0, num_actions, size=int(explore.sum()))
+
+            state = pos
+            pos, rewards, dones = vec_env.step(actions)
+            episode_reward[idx] += rewards[idx]
+
+            if recorder is not None:
+                recorder.extend(first + idx, t, state[idx], actions[idx], rewards[idx], pos[idx], dones[idx])
+
+            # Zielwerte mit der Q-Tabelle vom Beginn des Schritts
+            keys = state[idx] * num_actions + actions[idx]
+            targets = rewards[idx] + gamma * Q[pos[idx]].max(axis=1)
+
+            _grouped_update(q, keys, targets, alpha)
+
+            if recorded:
+                path.append(pos.copy())
+                ended[idx[dones[idx]]] = t + 1
+            active[idx[dones[idx]]] = False
+
+        rewards_history.extend(episode_reward[:n].tolist())
+
+        # ε-annealing (pro abgeschlossener Episode wie in q_learning)
+        if epsilon_decay_factor is not None:
+            for episode in range(first, first + n):
+                if (episode + 1) % epsilon_decay_interval == 0:
+                    epsilon = max(epsilon_min, epsilon * epsilon_decay_factor)
+
+        if recorded:
+            path = np.stack(path)
+            for episode in recorded:
+                i = episode - first
+                cells = path[:ended[i] + 1, i]
+                stored_trajectories[episode] = [(int(s) // cols, int(s) % cols) for s in cells]
+
+    if recorder is not None:
+        recorder.flush()
+
+    return Q, stored_trajectories, rewards_history
+
+
+def _grouped_update(q, keys, targets, alpha):
+    """
+    Wendet die Updates q[key] ← q[key] + α (Ziel - q[key]) auf die flache Q-Tabelle an. Mehrfach vorkommende keys
+    werden nach (s, a) gruppiert; k Updates nacheinander ergeben Q ← (1-α)^k · Q + Σ_j α (1-α)^(k-1-j) · Ziel_j.
+    """
+    order = np.argsort(keys, kind="stable")
+    keys, targets = keys[order], targets[order]
+    uniq, start, counts = np.unique(keys, return_index=True, return_counts=True)
+    group = np.repeat(np.arange(uniq.size), counts)
+    rank = np.arange(keys.size) - start[group]
+    weights = alpha * (1.0 - alpha) ** (counts[group] - 1 - rank)
+    q[uniq] = (1.0 - alpha) ** counts * q[uniq] + np.bincount(group, weights=weights * targets)
+
+
+def q_learning_multi(
+        envs,
+        num_episodes=200,
+        alpha=0.1,                  # Lernrate / learning rate
+        gamma=0.95,                 # Diskontierungsfaktor / discount rate
+        epsilon=0.1,                # Explorationsrate / exploration rate (epsilon-greedy strategy)
+        epsilon_decay_factor=None,
+        epsilon_decay_interval=1,
+        epsilon_min=0.01,
+        max_steps=100,              # Begrenzung der Schritte pro Episode / limit on steps per episode
+        record_interval=20,         # Intervall für die Speicherung von Trainingsepisoden / interval for storing training episodes
+        actors_per_map=1,           # Akteure pro Karte / actors per map
+        rng_seed=None
+):
+    """
+    Trainiere mit denselben Hyperparametern je einen Q-Learning-Agenten auf jeder Karte aus `envs` (Liste von
+    ExtendedGridEnv, auch unterschiedlich groß). Alle Akteure machen ihre Schritte gemeinsam in einer
+    VecExtendedGridEnv, die Q-Tabellen liegen in einem Tensor der Form (num_maps, max(rows*cols), 4) und werden pro
+    Schritt gemeinsam aktualisiert. Ein Akteur beginnt nach dem Ende seiner Episode sofort die nächste Episode seiner
+    Karte, bis jede Karte num_episodes Episoden gespielt hat; ε wird pro Karte nach deren Episoden abgesenkt.
+    Gibt pro Karte eine Liste zurück: (Q-Tabellen als Sichten (rows*cols, 4) in den Tensor, stored_trajectories,
+    rewards_history), jeweils wie bei q_learning.
+    """
+    vec_env = VecExtendedGridEnv(envs, len(envs) * actors_per_map, rng_seed=rng_seed)
+    num_maps, num_states, num_actions = vec_env.num_maps, vec_env.num_states, 4
+    num_envs = vec_env.num_envs
+    map_id = vec_env.map_id
+    base = map_id * num_states  # Zeilenversatz der Karte im flachen Tensor
+
+    Q = np.zeros((num_maps, num_states, num_actions), dtype=np.float32)
+    q = Q.reshape(-1)
+    q2 = Q.reshape(-1, num_actions)
+    rng = vec_env.rng.spawn()  # Explorations-Zufallsstrom
+
+    stored_trajectories = [{} for _ in range(num_maps)]
+    rewards = np.zeros((num_maps, num_episodes), dtype=np.float64)
+    eps = np.full(num_maps, float(epsilon))
+    finished = np.zeros(num_maps, dtype=np.int64)  # abgeschlossene Episoden pro Karte
+
+    # Akteur k einer Karte beginnt mit Episode k, weitere Episoden werden beim Neustart vergeben
+    episode = np.arange(num_envs) // num_maps
+    active = episode < num_episodes
+    next_episode = np.full(num_maps, min(actors_per_map, num_episodes), dtype=np.int64)
+    pos = vec_env.reset()
+    vec_env.done[~active] = True
+    t = np.zeros(num_envs, dtype=np.int64)
+    episode_reward = np.zeros(num_envs, dtype=np.float64)
+    paths = {}  # Akteur → Laufbahn (Feldindizes) der aufgezeichneten Episode
+
+    def start_recording(i):
+        if record_interval is not None and episode[i] % record_interval == 0:
+            paths[i] = [int(pos[i])]
+
+    for i in np.flatnonzero(active):
+        start_recording(i)
+
+    while True:
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+
+        # Epsilon-greedy Aktions-Auswahl für alle Akteure
+        rows = base + pos
+        actions = q2[rows].argmax(axis=1)
+        explore = rng.random(num_envs) < eps[map_id]
+        actions[explore] = rng.integers(0, num_actions, size=int(explore.sum()))
+
+        pos, step_rewards, dones = vec_env.step(actions)
+        episode_reward[idx] += step_rewards[idx]
+        t[idx] += 1
+
+        # Zielwerte mit den Q-Tabellen vom Beginn des Schritts
+        keys = rows[idx] * num_actions + actions[idx]
+        targets = step_rewards[idx] + gamma * q2[base[idx] + pos[idx]].max(axis=1)
+        if actors_per_map == 1:
+            q[keys] += alpha * (targets - q[keys])  # ein Akteur pro Karte: keine doppelten (s, a)
+        else:
+            _grouped_update(q, keys, targets, alpha)
+
+        for i, path in paths.items():
+            path.append(int(pos[i]))
+
+        ended = idx[dones[idx] | (t[idx] >= max_steps)]
+        if ended.size == 0:
+            continue
+
+        # beendete Episoden verbuchen und den Akteuren die nächste Episode ihrer Karte geben
+        for i in ended.tolist():
+            m = map_id[i]
+            rewards[m, episode[i]] = episode_reward[i]
+            if i in paths:
+                cols = vec_env.envs[m].cols
+                stored_trajectories[m][int(episode[i])] = [divmod(s, cols) for s in paths.pop(i)]
+
+            # ε-annealing (pro abgeschlossener Episode der Karte wie in q_learning)
+            finished[m] += 1
+            if epsilon_decay_factor is not None and finished[m] % epsilon_decay_interval == 0:
+                eps[m] = max(epsilon_min, eps[m] * epsilon_decay_factor)
+
+            if next_episode[m] < num_episodes:
+                episode[i] = next_episode[m]
+                next_episode[m] += 1
+            else:
+                active[i] = False
+
+        restart = ended[active[ended]]
+        if restart.size:
+            mask = np.zeros(num_envs, dtype=bool)
+            mask[restart] = True
+            pos = vec_env.reset(mask)
+            t[restart] = 0
+            episode_reward[restart] = 0.0
+            for i in restart.tolist():
+                start_recording(i)
+        vec_env.done[~active] = True
+
+    Qs = [Q[m, :env.rows * env.cols] for m, env in enumerate(vec_env.envs)]
+    rewards_history = [rewards[m].tolist() for m in range(num_maps)]
+    return Qs, stored_trajectories, rewards_history
@@ -0,0 +1,238 @@
+import sys
+
+import numpy as np
+
+# Namen der Q-Backends für make_q_store / q_learning(backend=...)
+Q_BACKENDS = ("dense", "float16", "sparse")
+
+
+class StateEncoder:
+    """
+    Bildet den vollständigen dynamischen Zustand einer ExtendedGridEnv per Mixed-Radix-Packing auf eine Ganzzahl ab:
+    Position (rows*cols) · Batterie (2) · verbleibende Edelsteine (2^g) · eingestürzte Felder (2^c) · Aussetzen (2)
+    · Windrichtung (4). Faktoren, die auf der Karte keine Rolle spielen (z. B. Wind ohne Wind-Felder), entfallen.
+    """
+    def __init__(self, env, battery=True, gems=True, collapse=True, skip=True, wind=True):
+        self.num_cells = env.rows * env.cols
+        self.cols = env.cols
+        self.battery = battery and len(env._battery_cells) > 0
+        self.gem_bits = len(env._gem_cells) if gems else 0
+        self.collapse_bits = len(env._collapse_cells) if collapse else 0
+        self.skip = skip and len(env.sticky_positions) > 0
+        self.wind = wind and len(env.wind_positions) > 0
+
+        self.size = (self.num_cells * (2 if self.battery else 1) * (1 << self.gem_bits) * (1 << self.collapse_bits)
+                     * (2 if self.skip else 1) * (4 if self.wind else 1))
+
+    def encode(self, env):
+        """
+        Code des aktuellen Zustands der Umgebung.
+        """
+        x = env.wind_dir_idx if self.wind else 0
+        if self.skip:
+            x = 2 * x + (1 if env.skip_turns > 0 else 0)
+        x = (x << self.collapse_bits) | (env._collapsed_mask if self.collapse_bits else 0)
+        x = (x << self.gem_bits) | (env._gem_mask if self.gem_bits else 0)
+        if self.battery:
+            x = 2 * x + env.has_battery
+        r, c = env.agent_pos
+        return x * self.num_cells + r * self.cols + c
+
+    def decode(self, code):
+        """
+        Zerlegt einen Code wieder in seine Bestandteile (als Dictionary).
+        """
+        code, pos = divmod(code, self.num_cells)
+        has_battery = False
+        if self.battery:
+            code, has_battery = divmod(code, 2)
+        gem_mask = code & ((1 << self.gem_bits) - 1)
+        code >>= self.gem_bits
+        collapsed_mask = code & ((1 << self.collapse_bits) - 1)
+        code >>= self.collapse_bits
+        skip_turns = 0
+        if self.skip:
+            code, skip_turns = divmod(code, 2)
+        return {
+            'agent_pos': divmod(pos, self.cols),
+            'has_battery': bool(has_battery),
+            'gem_mask': gem_mask,
+            'collapsed_mask': collapsed_mask,
+            'skip_turns': skip_turns,
+            'wind_dir_idx': code if self.wind else None,
+        }
+
+    def position(self, code):
+        """
+        Feldindex (r * cols + c) eines Codes.
+        """
+        return code % self.num_cells
+
+
+class DenseQStore:
+    """
+    Dichte Q-Tabelle (num_states × num_actions) mit wählbarem dtype: float32 (wie bisher) oder float16 (halber
+    Speicher, ca. 3 signifikante Stellen). Zeilennummer = Zustand bzw. Code des Encoders.
+    """
+    def __init__(self, num_states, num_actions=4, dtype=np.float32, encoder=None):
+        self.num_actions = num_actions
+        self.encoder = encoder
+        self.values = np.zeros((num_states, num_actions), dtype=dtype)
+        self.backend = "float16" if self.values.dtype == np.float16 else "dense"
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, code):
+        return 0 <= code < len(self.values)
+
+    def row(self, code):
+        return code
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def memory_usage(self):
+        return _memory_usage(self.backend, len(self.values), len(self.values), self.values.nbytes, 0)
+
+    def position_table(self, num_cells, reduce="max"):
+        """
+        Projiziert die Tabelle auf eine (num_cells, num_actions)-Tabelle pro Feld (siehe LazyQTable.position_table).
+        """
+        values = self.values.astype(np.float32).reshape(-1, num_cells, self.num_actions)
+        return values.max(axis=0) if reduce == "max" else values.mean(axis=0)
+
+
+class LazyQTable:
+    """
+    Q-Tabelle, deren Zeilen erst beim ersten Besuch eines Zustands angelegt werden (Code → Zeile per Dictionary,
+    Werte in einem wachsenden float32-Array). Speicherbedarf wächst mit den tatsächlich besuchten Zuständen.
+    """
+    backend = "sparse"
+
+    def __init__(self, num_actions=4, capacity=1024, encoder=None):
+        self.num_actions = num_actions
+        self.encoder = encoder
+        self._rows = {}
+        self._codes = []
+        self.values = np.zeros((capacity, num_actions), dtype=np.float32)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __contains__(self, code):
+        return code in self._rows
+
+    def row(self, code):
+        """
+        Zeilennummer des Zustands `code`; legt bei Bedarf eine neue (mit Nullen gefüllte) Zeile an.
+        Achtung: beim Wachsen wird `values` neu allokiert.
+        """
+        row = self._rows.get(code)
+        if row is None:
+            row = len(self._codes)
+            if row == len(self.values):
+                grown = np.zeros((2 * len(self.values), self.num_actions), dtype=np.float32)
+                grown[:row] = self.values
+                self.values = grown
+            self._rows[code] = row
+            self._codes.append(code)
+        return row
+
+    def __getitem__(self, code):
+        """
+        Q-Werte des Zustands `code` (Nullen für noch nie besuchte Zustände, ohne eine Zeile anzulegen).
+        """
+        row = self._rows.get(code)
+        if row is None:
+            return np.zeros(self.num_actions, dtype=np.float32)
+        return self.values[row]
+
+    def codes(self):
+        return list(self._codes)
+
+    @property
+    def nbytes(self):
+        return self.memory_usage()['total_bytes']
+
+    def memory_usage(self):
+        # Index: Dictionary plus Code-Liste (Ganzzahlen bis 2^30 sind in CPython 28 Bytes groß)
+        index_bytes = sys.getsizeof(self._rows) + sys.getsizeof(self._codes) + 28 * len(self._codes)
+        return _memory_usage(self.backend, len(self._codes), len(self.values), self.values.nbytes, index_bytes)
+
+    def position_table(self, num_cells, reduce="max"):
+        """
+        Projiziert die Tabelle auf eine (num_cells, num_actions)-Tabelle pro Feld (Maximum oder Mittel über alle
+        besuchten Zusatzzustände), z. B. für show_q_heatmap. Nie besuchte Felder bleiben 0.
+        """
+        n = len(self._codes)
+        pos = np.array(self._codes, dtype=np.int64) % num_cells
+        values = self.values[:n].astype(np.float64)
+        out = np.zeros((num_cells, self.num_actions), dtype=np.float64)
+        if reduce == "max":
+            out.fill(-np.inf)
+            np.maximum.at(out, pos, values)
+            out[np.isinf(out)] = 0.0
+        else:
+            np.add.at(out, pos, values)
+            counts = np.bincount(pos, minlength=num_cells)
+            out[counts > 0] /= counts[counts > 0, None]
+        return out.astype(np.float32)
+
+
+# ──────────────────────────────────────────────────────────────── #
+# Hilfsfunktionen für beliebige Q-Darstellungen (ndarray, DenseQStore, LazyQTable)
+
+def _memory_usage(backend, rows, capacity, values_bytes, index_bytes):
+    return {'backend': backend, 'rows': rows, 'capacity': capacity, 'values_bytes': values_bytes,
+            'index_bytes': index_bytes, 'total_bytes': values_bytes + index_bytes}
+
+
+def make_q_store(backend, num_states, num_actions=4, encoder=None):
+    """
+    Erzeugt ein leeres Q-Backend: "dense" (float32), "float16" oder "sparse" (LazyQTable).
+    """
+    if backend == "dense":
+        return DenseQStore(num_states, num_actions, np.float32, encoder)
+    if backend == "float16":
+        return DenseQStore(num_states, num_actions, np.float16, encoder)
+    if backend == "sparse":
+        return LazyQTable(num_actions, encoder=encoder)
+    raise ValueError(f"Unbekanntes Q-Backend {backend!r}, erlaubt sind {Q_BACKENDS}.")
+
+
+def q_memory_usage(Q):
+    """
+    Speicherbedarf einer Q-Darstellung als Dictionary (backend, rows, capacity, values_bytes, index_bytes,
+    total_bytes); ein ndarray wird wie das dichte Backend gezählt.
+    """
+    if isinstance(Q, np.ndarray):
+        return _memory_usage("ndarray", len(Q), len(Q), Q.nbytes, 0)
+    return Q.memory_usage()
+
+
+def position_q_table(Q, env, reduce="max"):
+    """
+    Q-Werte pro Feld als (rows*cols, 4)-float32-Tabelle, unabhängig vom Backend (z. B. für show_q_heatmap).
+    """
+    num_cells = env.rows * env.cols
+    if isinstance(Q, np.ndarray):
+        values = np.asarray(Q, dtype=np.float32)
+        if len(values) == num_cells:
+            return values
+        values = values.reshape(-1, num_cells, values.shape[-1])
+        return values.max(axis=0) if reduce == "max" else values.mean(axis=0)
+    return Q.position_table(num_cells, reduce)
+
+
+def state_q_values(Q, env, state):
+    """
+    Q-Werte des aktuellen Zustands von `env` (`state` wie von reset/step zurückgegeben); Backends mit Encoder
+    verwenden den kodierten erweiterten Zustand.
+    """
+    encoder = getattr(Q, 'encoder', None)
+    return Q[encoder.encode(env) if encoder is not None else state]
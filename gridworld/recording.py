@@ -0,0 +1,207 @@
+import glob
+import os
+from collections.abc import Mapping
+
+import numpy as np
+
+# Spalten des Übergangsprotokolls (Name, dtype)
+TRANSITION_COLUMNS = (
+    ("episode", np.int32),
+    ("t", np.int32),
+    ("state", np.int32),
+    ("action", np.int32),
+    ("reward", np.float32),
+    ("next_state", np.int32),
+    ("done", np.bool_),
+)
+
+# memoryview-Formate der Spalten-dtypes
+_FORMATS = {np.int32: "i", np.float32: "f", np.bool_: "?"}
+
+
+class TransitionRecorder:
+    """
+    Spaltenweises Protokoll aller Übergänge (episode, t, state, action, reward, next_state, done) eines Trainings.
+    Die Übergänge werden in einen vorab allokierten Block (chunk_size Zeilen, int32/float32/bool) geschrieben;
+    ein voller Block wird als .npy-Shards (eine Datei pro Spalte) nach `directory` geschrieben und wiederverwendet,
+    der Speicherbedarf bleibt also konstant. Ohne `directory` werden volle Blöcke im Speicher behalten.
+    """
+    def __init__(self, directory=None, chunk_size=1 << 16):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self._buffers = {name: np.empty(chunk_size, dtype=dtype) for name, dtype in TRANSITION_COLUMNS}
+        # flache memoryviews für schnelle skalare Schreibzugriffe aus der Trainingsschleife
+        self._views = {name: memoryview(self._buffers[name]).cast("B").cast(_FORMATS[dtype])
+                       for name, dtype in TRANSITION_COLUMNS}
+        self._episode, self._t, self._state, self._action, self._reward, self._next_state, self._done = (
+            self._views[name] for name, _ in TRANSITION_COLUMNS)
+        self._n = 0            # belegte Zeilen im aktuellen Block
+        self._chunks = []      # volle Blöcke (nur ohne directory)
+        self.num_shards = 0
+        self.num_flushed = 0   # Anzahl bereits geschriebener/abgelegter Übergänge
+
+    def __len__(self):
+        return self.num_flushed + self._n
+
+    # ──────────────────────────────────────────────────────────────── #
+    def append(self, episode, t, state, action, reward, next_state, done):
+        """
+        Hängt einen einzelnen Übergang an.
+        """
+        i = self._n
+        self._episode[i] = episode
+        self._t[i] = t
+        self._state[i] = state
+        self._action[i] = action
+        self._reward[i] = reward
+        self._next_state[i] = next_state
+        self._done[i] = done
+        self._n = i + 1
+        if self._n == self.chunk_size:
+            self._flush_chunk()
+
+    def extend(self, episode, t, state, action, reward, next_state, done):
+        """
+        Hängt einen Stapel von Übergängen an (Arrays bzw. Skalare gleicher Länge, z. B. aus q_learning_batched).
+        """
+        columns = np.broadcast_arrays(episode, t, state, action, reward, next_state, done)
+        total = columns[0].size
+        pos = 0
+        while pos < total:
+            take = min(total - pos, self.chunk_size - self._n)
+            for (name, _), values in zip(TRANSITION_COLUMNS, columns):
+                self._buffers[name][self._n:self._n + take] = values[pos:pos + take]
+            self._n += take
+            pos += take
+            if self._n == self.chunk_size:
+                self._flush_chunk()
+
+    # ──────────────────────────────────────────────────────────────── #
+    def _flush_chunk(self):
+        n = self._n
+        if n == 0:
+            return
+        if self.directory is None:
+            self._chunks.append({name: buf[:n].copy() for name, buf in self._buffers.items()})
+        else:
+            for name, buf in self._buffers.items():
+                np.save(os.path.join(self.directory, f"{name}_{self.num_shards:05d}.npy"), buf[:n])
+        self.num_shards += 1
+        self.num_flushed += n
+        self._n = 0
+
+    def flush(self):
+        """
+        Schreibt den angefangenen Block als (kürzeren) Shard weg.
+        """
+        self._flush_chunk()
+
+    def columns(self, mmap_mode="r"):
+        """
+        Gibt das gesamte Protokoll als Dictionary Spaltenname → Array zurück (inklusive des angefangenen Blocks).
+        """
+        if self.directory is not None:
+            self.flush()
+            return load_transitions(self.directory, mmap_mode=mmap_mode)
+        parts = self._chunks + [{name: buf[:self._n] for name, buf in self._buffers.items()}]
+        return {name: np.concatenate([part[name] for part in parts]) for name, _ in TRANSITION_COLUMNS}
+
+
+def load_transitions(directory, mmap_mode="r"):
+    """
+    Liest ein mit TransitionRecorder geschriebenes Protokoll aus `directory`.
+    Bei nur einem Shard werden die Spalten ohne Kopie memory-mapped, sonst aneinandergehängt.
+    """
+    out = {}
+    for name, dtype in TRANSITION_COLUMNS:
+        shards = sorted(glob.glob(os.path.join(directory, f"{name}_*.npy")))
+        arrays = [np.load(path, mmap_mode=mmap_mode) for path in shards]
+        if not arrays:
+            out[name] = np.zeros(0, dtype=dtype)
+        elif len(arrays) == 1:
+            out[name] = arrays[0]
+        else:
+            out[name] = np.concatenate(arrays)
+    return out
+
+
+# ──────────────────────────────────────────────────────────────── #
+# Episoden als (Zufallszustand, Aktionsfolge) statt als Positionslisten
+
+def replay_episode(env, rng_state, actions):
+    """
+    Simuliert eine Episode aus dem Zustand von env.rng zu Episodenbeginn (vor reset()) und ihrer Aktionsfolge
+    erneut und gibt die Laufbahn als Liste von (r, c) zurück, wie sie q_learning in stored_trajectories ablegt.
+    Der Zufallszustand der Umgebung wird danach wiederhergestellt.
+    """
+    saved = env.rng.get_state()
+    env.rng.set_state(rng_state)
+    try:
+        env.reset()
+        trajectory = [env.agent_pos]
+        for action in actions:
+            env.step(action)
+            trajectory.append(env.agent_pos)
+    finally:
+        env.rng.set_state(saved)
+    return trajectory
+
+
+class EpisodeLog(Mapping):
+    """
+    Speichert jede Trainingsepisode als (Zustand von env.rng zu Episodenbeginn, Aktionsfolge mit 1 Byte pro Schritt)
+    und verhält sich wie das stored_trajectories-Dictionary: log[episode] simuliert die Laufbahn bei Bedarf neu.
+    Episoden aus demselben Block der BlockRNG teilen sich den Generator-Zustand, pro Episode bleibt nur die Blockposition.
+    """
+    def __init__(self, env):
+        self.env = env
+        self._states = {}
+        self._actions = {}
+
+    def add(self, episode, rng_state, actions):
+        """
+        Legt eine Episode ab (rng_state wie von env.rng.get_state(), actions als bytes/bytearray).
+        """
+        self._states[episode] = rng_state
+        self._actions[episode] = bytes(actions)
+
+    def rng_state(self, episode):
+        return self._states[episode]
+
+    def actions(self, episode):
+        return list(self._actions[episode])
+
+    def __getitem__(self, episode):
+        return replay_episode(self.env, self._states[episode], self._actions[episode])
+
+    def __iter__(self):
+        return iter(self._states)
+
+    def __len__(self):
+        return len(self._states)
+
+    def every(self, interval, offset=0):
+        """
+        Sicht auf jede `interval`-te Episode (wie record_interval), z. B. für show_training_videos.
+        """
+        return _EpisodeLogView(self, [ep for ep in self._states if (ep - offset) % interval == 0])
+
+
+class _EpisodeLogView(Mapping):
+    def __init__(self, log, episodes):
+        self.log = log
+        self._episodes = episodes
+
+    def __getitem__(self, episode):
+        if episode not in self._episodes:
+            raise KeyError(episode)
+        return self.log[episode]
+
+    def __iter__(self):
+        return iter(self._episodes)
+
+    def __len__(self):
+        return len(self._episodes)
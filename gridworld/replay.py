@@ -0,0 +1,187 @@
+import copy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from .envs import ExtendedGridEnv
+from .recording import EpisodeLog, replay_episode
+from ._render import SYMBOLS, _board_frame, _glyph_for, composite_frames
+from ._tiles import TILE_COLLAPSE, TILE_BATTERY, TILE_GEM
+
+
+class FrameLayout:
+    """
+    Unveränderliche, picklebare Beschreibung dessen, was beim Rendern einer Karte gezeichnet wird: Geometrie,
+    Symbole der Felder und für Felder mit Batterie, Edelstein oder einstürzendem Boden das Symbol je Zustand.
+    Frames entstehen rein aus (Layout, Feld des Agenten, Anzeige-Zustand); keine Umgebung wird dabei verändert.
+    Anzeige-Zustand = (collapsed_mask, battery_mask, gem_mask) wie in ExtendedGridEnv.
+    """
+    # maximale Anzahl zwischengespeicherter Hintergründe (danach wird der Cache geleert)
+    BOARD_CACHE_SIZE = 8
+
+    def __init__(self, env):
+        self.rows, self.cols = env.rows, env.cols
+        self.cell_size = env.cell_size
+        self.padding = env.FRAME_PADDING
+        self.agent_glyph = SYMBOLS["agent"]
+        extended = isinstance(env, ExtendedGridEnv)
+        # Zustand nach reset()
+        self.initial_state = (0, env._battery_full, env._gem_full) if extended else (0, 0, 0)
+
+        # pro Feld (zeilenweise) das Symbol oder für dynamische Felder (Bits, {(eingestürzt, Batterie, Edelstein): Symbol})
+        self._glyphs = []
+        self._effects = {}  # Feldindex → (Einsturz-Bit, Batterie-Bit, Edelstein-Bit) beim Betreten
+        for r in range(self.rows):
+            for c in range(self.cols):
+                index = r * self.cols + c
+                flags = int(env._tile_flags[index])
+                if not (extended and flags & (TILE_COLLAPSE | TILE_BATTERY | TILE_GEM)):
+                    self._glyphs.append(_glyph_for(env, r, c, self.initial_state if extended else None))
+                    continue
+                bits = (1 << env._collapse_slot_list[index] if flags & TILE_COLLAPSE else 0,
+                        1 << env._battery_slot_list[index] if flags & TILE_BATTERY else 0,
+                        1 << env._gem_slot_list[index] if flags & TILE_GEM else 0)
+                variants = {}
+                for key in np.ndindex(2, 2, 2):
+                    state = tuple(bit if on else 0 for bit, on in zip(bits, key))
+                    variants[tuple(map(bool, key))] = _glyph_for(env, r, c, state)
+                self._glyphs.append((bits, variants))
+                self._effects[index] = bits
+        self._boards = {}
+
+    @property
+    def frame_shape(self):
+        return (self.rows * self.cell_size + 2 * self.padding, self.cols * self.cell_size + 2 * self.padding, 3)
+
+    def next_state(self, state, index):
+        """
+        Anzeige-Zustand, nachdem der Agent das Feld `index` betreten hat (wie ExtendedGridEnv.render).
+        """
+        effect = self._effects.get(index)
+        if effect is None:
+            return state
+        collapse_bit, battery_bit, gem_bit = effect
+        collapsed_mask, battery_mask, gem_mask = state
+        return collapsed_mask | collapse_bit, battery_mask & ~battery_bit, gem_mask & ~gem_bit
+
+    def frame_states(self, trajectory, state=None):
+        """
+        Feldindizes und Anzeige-Zustand jedes Frames einer Laufbahn (Liste von (r, c) oder Array von Feldindizes),
+        ausgehend von `state` (Standard: Zustand nach reset()).
+        """
+        cells = np.asarray(trajectory, dtype=np.int64)
+        if cells.ndim == 2:
+            cells = cells[:, 0] * self.cols + cells[:, 1]
+        state = self.initial_state if state is None else state
+        states = []
+        for index in cells.tolist():
+            state = self.next_state(state, index)
+            states.append(state)
+        return cells, states
+
+    def board(self, state):
+        """
+        Hintergrund (RGBA-Array) im Anzeige-Zustand `state`.
+        """
+        board = self._boards.get(state)
+        if board is None:
+            symbols = {}
+            for index, glyph in enumerate(self._glyphs):
+                if isinstance(glyph, tuple):
+                    bits, variants = glyph
+                    glyph = variants[tuple(bool(s & b) for s, b in zip(state, bits))]
+                if glyph:
+                    symbols[divmod(index, self.cols)] = glyph
+            board = np.asarray(_board_frame(self.rows, self.cols, self.cell_size, self.padding, symbols))
+            if len(self._boards) >= self.BOARD_CACHE_SIZE:
+                self._boards.clear()
+            self._boards[state] = board
+        return board
+
+
+def render_frames(layout, cells, states, out=None):
+    """
+    Zeichnet Frame t mit dem Agenten auf Feld cells[t] vor dem Hintergrund im Anzeige-Zustand states[t] in einen
+    uint8-Puffer (T, H, W, 3). Verändert nichts außer `out`.
+    """
+    boards, board_ids, index_of = [], np.empty(len(cells), dtype=np.int64), {}
+    for t, state in enumerate(states):
+        b = index_of.get(state)
+        if b is None:
+            b = index_of[state] = len(boards)
+            boards.append(layout.board(state))
+        board_ids[t] = b
+    if not boards:
+        boards.append(layout.board(layout.initial_state))
+    cells = np.asarray(cells, dtype=np.int64)
+    return composite_frames(boards, board_ids, cells // layout.cols, cells % layout.cols, layout.cell_size,
+                            layout.padding, layout.agent_glyph, out)
+
+
+# ──────────────────────────────────────────────────────────────── #
+# Paralleles Rendern aller Episoden
+
+# (Layout, gemeinsamer Speicher, Frame-Puffer) in den Worker-Prozessen
+_shared = None
+
+
+def _init_worker(name, shape, layout):
+    global _shared
+    memory = shared_memory.SharedMemory(name=name)
+    _shared = (layout, memory, np.ndarray(shape, dtype=np.uint8, buffer=memory.buf))
+
+
+def _render_slice(start, cells, states):
+    """
+    Worker: rendert eine Episode direkt in ihren Abschnitt des gemeinsamen Puffers.
+    """
+    layout, _, frames = _shared
+    render_frames(layout, cells, states, out=frames[start:start + len(cells)])
+
+
+def _trajectory_items(trajectories):
+    """
+    (Episode, Laufbahn)-Paare. Ein EpisodeLog (oder eine Sicht darauf) wird auf einer flachen Kopie seiner Umgebung
+    mit eigenem Zufallsgenerator neu simuliert, damit die Umgebung selbst unverändert bleibt.
+    """
+    log = getattr(trajectories, "log", trajectories)
+    if not isinstance(log, EpisodeLog):
+        return list(trajectories.items())
+    env = copy.copy(log.env)
+    env.rng = copy.deepcopy(log.env.rng)
+    env.visited = set()
+    return [(ep, replay_episode(env, log.rng_state(ep), log.actions(ep))) for ep in trajectories]
+
+
+def render_episodes(env, trajectories, max_workers=None):
+    """
+    Rendert alle Laufbahnen (Dictionary Episode → Liste von (r, c), z. B. stored_trajectories oder ein EpisodeLog)
+    ab dem Zustand nach reset() und gibt ein Dictionary Episode → (T, H, W, 3)-Puffer zurück. Die Umgebung wird
+    nicht verändert. Standardmäßig wird im eigenen Prozess gerendert; mit max_workers > 1 werden die Episoden auf
+    einen Prozess-Pool ("spawn", auch in Jupyter und unter macOS/Windows sicher) verteilt, der direkt in einen
+    gemeinsamen Speicher schreibt. Jeder Worker importiert gridworld neu; der Start dauert daher einige Sekunden und
+    lohnt sich erst bei sehr vielen Frames. In Skripten muss der Aufruf dann unter `if __name__ == "__main__":` stehen.
+    """
+    layout = env if isinstance(env, FrameLayout) else FrameLayout(env)
+    jobs = [(ep,) + layout.frame_states(traj) for ep, traj in _trajectory_items(trajectories)]
+    workers = min(max_workers or 1, len(jobs))
+    if workers < 2:
+        return {ep: render_frames(layout, cells, states) for ep, cells, states in jobs}
+
+    starts = np.cumsum([0] + [len(cells) for _, cells, _ in jobs])
+    shape = (int(starts[-1]),) + layout.frame_shape
+    memory = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape))))
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(memory.name, shape, layout)) as pool:
+            futures = [pool.submit(_render_slice, int(start), cells, states)
+                       for start, (_, cells, states) in zip(starts, jobs)]
+            for future in futures:
+                future.result()
+        # aus dem gemeinsamen Speicher kopieren, bevor er freigegeben wird
+        frames = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf).copy()
+    finally:
+        memory.close()
+        memory.unlink()
+    return {ep: frames[start:stop] for (ep, _, _), start, stop in zip(jobs, starts[:-1], starts[1:])}
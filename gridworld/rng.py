@@ -0,0 +1,109 @@
+import numpy as np
+
+# Anzahl vorab gezogener Gleichverteilungen pro Block
+RNG_BLOCK_SIZE = 1 << 12
+
+
+class BlockRNG:
+    """
+    Zufallsquelle einer Umgebung (bzw. eines Trainers): zieht Gleichverteilungen in [0, 1) blockweise aus einem
+    eigenen PCG64-Generator und gibt sie einzeln (random, integers, choice, shuffle) oder als Arrays (size=...) aus.
+    Der Zustand besteht aus dem Generator-Zustand zu Blockbeginn und der Position im Block; get_state/set_state
+    sind daher billig. spawn() liefert unabhängige, reproduzierbare Kind-Ströme (z. B. für den Trainer oder Worker).
+    """
+    def __init__(self, seed=None, block_size=RNG_BLOCK_SIZE):
+        self.seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.block_size = block_size
+        self._gen = np.random.Generator(np.random.PCG64(self.seed_seq))
+        self._refill()
+
+    def _refill(self):
+        self._block_state = self._gen.bit_generator.state
+        self._array = self._gen.random(self.block_size)
+        self._list = self._array.tolist()
+        self._pos = 0
+
+    # ──────────────────────────────────────────────────────────────── #
+    # einzelne Ziehungen
+    def random(self, size=None):
+        """
+        Gleichverteilung in [0, 1); mit `size` als float64-Array.
+        """
+        if size is not None:
+            return self._take(size)
+        if self._pos == self.block_size:
+            self._refill()
+        u = self._list[self._pos]
+        self._pos += 1
+        return u
+
+    def integers(self, low, high=None, size=None):
+        """
+        Ganzzahlen in [low, high) (bzw. [0, low), wenn high fehlt); mit `size` als int64-Array.
+        """
+        if high is None:
+            low, high = 0, low
+        if size is not None:
+            return low + (self._take(size) * (high - low)).astype(np.int64)
+        if self._pos == self.block_size:
+            self._refill()
+        u = self._list[self._pos]
+        self._pos += 1
+        return low + int(u * (high - low))
+
+    def choice(self, seq):
+        return seq[self.integers(len(seq))]
+
+    def shuffle(self, items):
+        """
+        Mischt eine Liste an Ort und Stelle (Fisher-Yates).
+        """
+        for i in range(len(items) - 1, 0, -1):
+            j = self.integers(i + 1)
+            items[i], items[j] = items[j], items[i]
+
+    def _take(self, size):
+        n = int(np.prod(size))
+        parts = []
+        while n > 0:
+            if self._pos == self.block_size:
+                self._refill()
+            k = min(n, self.block_size - self._pos)
+            parts.append(self._array[self._pos:self._pos + k])
+            self._pos += k
+            n -= k
+        if len(parts) == 1:
+            return parts[0].reshape(size).copy()
+        return (np.concatenate(parts) if parts else np.zeros(0)).reshape(size)
+
+    def uniform_list(self, n):
+        """
+        Die nächsten n Gleichverteilungen als Python-Liste (für schnelle Schleifen, die selbst indizieren).
+        """
+        if self._pos + n <= self.block_size:
+            out = self._list[self._pos:self._pos + n]
+            self._pos += n
+            return out
+        return self._take(n).tolist()
+
+    # ──────────────────────────────────────────────────────────────── #
+    # Zustand
+    def get_state(self):
+        """
+        Aktueller Zustand als (Generator-Zustand zu Blockbeginn, Position im Block).
+        Episoden im selben Block teilen sich dasselbe Zustands-Dictionary.
+        """
+        return self._block_state, self._pos
+
+    def set_state(self, state):
+        block_state, pos = state
+        if block_state is not self._block_state:
+            self._gen.bit_generator.state = block_state
+            self._refill()
+        self._pos = pos
+
+    def spawn(self):
+        """
+        Neuer, unabhängiger Kind-Strom; wiederholte Aufrufe liefern verschiedene, aber reproduzierbare Ströme.
+        """
+        return BlockRNG(self.seed_seq.spawn(1)[0], self.block_size)
@@ -0,0 +1,282 @@
+import inspect
+import itertools
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from .envs import ExtendedGridEnv
+from .qlearning import q_learning, decay_epsilon
+
+
+class LayoutSpec:
+    """
+    Picklebare Beschreibung einer ExtendedGridEnv-Karte: Konstruktor-Argumente plus Startfeld.
+    Wird statt der Widget-Zustände an Worker-Prozesse geschickt; build() erzeugt daraus eine frische Umgebung.
+    """
+    def __init__(self, env_kwargs, start_pos=(0, 0)):
+        self.env_kwargs = dict(env_kwargs)
+        self.env_kwargs.pop('rng_seed', None)
+        self.start_pos = tuple(start_pos)
+
+    @classmethod
+    def from_env_params(cls, env_params):
+        """
+        Erzeugt die Spezifikation aus dem env_params-Dictionary des Trainings-Labors.
+        """
+        params = dict(env_params)
+        start_pos = params.pop('start_pos', None) or (0, 0)
+        params.pop('rng_seed', None)
+
+        # Als Ziel wird das zuletzt vom Benutzer gewählte „Goal“-Feld verwendet
+        goal_positions = params.pop('goal_positions', [])
+        if len(goal_positions) == 0:
+            # Falls kein Ziel gewählt wurde → Zelle unten rechts als Standard
+            params['goal_position'] = (params['rows'] - 1, params['cols'] - 1)
+        else:
+            params['goal_position'] = goal_positions[-1]
+        return cls(params, start_pos)
+
+    def build(self, rng_seed=None):
+        """
+        Baut die Umgebung mit dem gegebenen Seed.
+        """
+        env = ExtendedGridEnv(**self.env_kwargs, rng_seed=rng_seed)
+        env.start_pos = self.start_pos
+        env.agent_pos = self.start_pos
+        env.visited = {self.start_pos}
+        return env
+
+    def __repr__(self):
+        return f"LayoutSpec({self.env_kwargs['rows']}x{self.env_kwargs['cols']}, start={self.start_pos})"
+
+
+def parameter_grid(**axes):
+    """
+    Kartesisches Produkt von q_learning-Parametern, z. B. parameter_grid(alpha=[0.1, 0.2], epsilon=[0.1, 0.3]).
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[n] for n in names))]
+
+
+def _run_config(spec, config_id, params, seed):
+    """
+    Worker: trainiert eine Konfiguration mit einem Seed und gibt das Ergebnis-Dictionary zurück.
+    """
+    env = spec.build(rng_seed=seed)
+    start = time.perf_counter()
+    Q, _, rewards_history = q_learning(env, **params)
+    wall_time = time.perf_counter() - start
+    return {
+        'config_id': config_id,
+        'params': params,
+        'seed': seed,
+        'Q': Q,
+        'rewards': np.asarray(rewards_history, dtype=np.float32),
+        'wall_time': wall_time,
+    }
+
+
+def run_sweep(spec, configs, seeds=(0,), max_workers=None, fast=True):
+    """
+    Trainiert jede Konfiguration aus `configs` (Liste von q_learning-Parametern) mit jedem Seed aus `seeds`
+    parallel in einem ProcessPoolExecutor (standardmäßig alle Kerne).
+    Liefert die Ergebnisse als Generator in der Reihenfolge, in der sie fertig werden; jedes Ergebnis enthält
+    config_id, params, seed, Q, rewards (Belohnungsverlauf) und wall_time.
+    """
+    jobs = []
+    for config_id, params in enumerate(configs):
+        params = dict(params)
+        params.setdefault('fast', fast)
+        params.setdefault('record_interval', None)  # keine Laufbahnen zurückschicken
+        jobs.extend((config_id, params, seed) for seed in seeds)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_run_config, spec, config_id, params, seed) for config_id, params, seed in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def sweep_table(results, tail=0.1):
+    """
+    Fasst Sweep-Ergebnisse pro Konfiguration zusammen: mittlere Belohnung der letzten `tail`-Episoden
+    (Mittel und Streuung über die Seeds), mittlere Laufzeit und Anzahl Seeds.
+    Gibt eine nach der Belohnung absteigend sortierte Liste von Zeilen-Dictionaries zurück.
+    """
+    grouped = {}
+    for result in results:
+        grouped.setdefault(result['config_id'], []).append(result)
+
+    rows = []
+    for config_id, runs in grouped.items():
+        finals = []
+        for run in runs:
+            rewards = run['rewards']
+            n = max(1, int(round(len(rewards) * tail)))
+            finals.append(float(np.mean(rewards[-n:])) if len(rewards) else float('nan'))
+        row = {'config_id': config_id}
+        row.update({k: v for k, v in runs[0]['params'].items() if k not in ('fast', 'record_interval')})
+        row['seeds'] = len(runs)
+        row['final_reward'] = float(np.mean(finals))
+        row['final_reward_std'] = float(np.std(finals))
+        row['wall_time'] = float(np.mean([run['wall_time'] for run in runs]))
+        rows.append(row)
+
+    rows.sort(key=lambda row: row['final_reward'], reverse=True)
+    return rows
+
+
+def format_sweep_table(rows):
+    """
+    Formatiert die Zeilen von sweep_table als Texttabelle.
+    """
+    if not rows:
+        return ""
+    columns = []
+    for row in rows:
+        columns.extend(k for k in row if k not in columns)
+
+    def fmt(value):
+        if isinstance(value, float):
+            return f"{value:.4g}"
+        return "" if value is None else str(value)
+
+    cells = [[fmt(row.get(c)) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(line[i]) for line in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths)),
+             "  ".join("-" * w for w in widths)]
+    lines.extend("  ".join(v.rjust(w) for v, w in zip(line, widths)) for line in cells)
+    return "\n".join(lines)
+
+
+# ──────────────────────────────────────────────────────────────── #
+# Adaptive Suche (Successive Halving / Hyperband)
+
+def sample_candidates(num, seed=None, alpha=(0.02, 0.5), gamma=(0.8, 0.99), epsilon=(0.05, 0.5),
+                      epsilon_decay_factor=(0.99, 1.0), **fixed):
+    """
+    Zieht `num` zufällige q_learning-Parameter, gleichverteilt in den gegebenen (min, max)-Bereichen.
+    Weitere Schlüsselwortargumente (z. B. max_steps) werden unverändert in jede Konfiguration übernommen.
+    """
+    rng = np.random.default_rng(seed)
+    ranges = {'alpha': alpha, 'gamma': gamma, 'epsilon': epsilon, 'epsilon_decay_factor': epsilon_decay_factor}
+    candidates = []
+    for _ in range(num):
+        params = {name: float(rng.uniform(lo, hi)) for name, (lo, hi) in ranges.items()}
+        params.update(fixed)
+        candidates.append(params)
+    return candidates
+
+
+# Voreinstellungen von q_learning für Parameter, die eine Kandidatin nicht setzt
+_Q_LEARNING_DEFAULTS = {name: p.default for name, p in inspect.signature(q_learning).parameters.items()
+                        if p.default is not inspect.Parameter.empty}
+
+
+def _train_segment(spec, params, seed, Q, start_episode, num_episodes):
+    """
+    Worker: setzt das Training einer Kandidatin ab start_episode mit ihrer Q-Tabelle fort.
+    """
+    env = spec.build(rng_seed=seed)
+    params = dict(params)
+    params.pop('num_episodes', None)
+    params.pop('record_interval', None)
+    decay = {k: params.get(k, _Q_LEARNING_DEFAULTS[k])
+             for k in ('epsilon', 'epsilon_decay_factor', 'epsilon_decay_interval', 'epsilon_min')}
+    params['epsilon'] = decay_epsilon(decay['epsilon'], start_episode, decay['epsilon_decay_factor'],
+                                      decay['epsilon_decay_interval'], decay['epsilon_min'])
+    start = time.perf_counter()
+    Q, _, rewards_history = q_learning(env, num_episodes=num_episodes, Q=Q, start_episode=start_episode,
+                                       record_interval=None, **params)
+    return Q, np.asarray(rewards_history, dtype=np.float32), time.perf_counter() - start
+
+
+def _halving(pool, spec, candidates, min_episodes, max_episodes, eta, score_window, seed, history, bracket,
+             finish=False):
+    """
+    Successive Halving über die Kandidatinnen-Zustände `candidates` mit einem gemeinsamen Prozess-Pool.
+    Mit `finish` wird eine vorzeitig allein verbliebene Kandidatin bis max_episodes weitertrainiert.
+    """
+    budget = min_episodes
+    rung = 0
+    while True:
+        futures = {}
+        for cand in candidates:
+            extra = budget - cand['episodes']
+            if extra > 0:
+                job_seed = seed + 7919 * cand['config_id'] + rung
+                futures[pool.submit(_train_segment, spec, cand['params'], job_seed, cand['Q'],
+                                    cand['episodes'], extra)] = cand
+        for future in as_completed(futures):
+            cand = futures[future]
+            Q, rewards, wall_time = future.result()
+            cand['Q'] = Q
+            cand['rewards'] = np.concatenate([cand['rewards'], rewards])
+            cand['episodes'] = budget
+            cand['wall_time'] += wall_time
+            cand['score'] = float(np.mean(cand['rewards'][-min(score_window, budget):]))
+
+        for cand in candidates:
+            history.append({'bracket': bracket, 'rung': rung, 'config_id': cand['config_id'],
+                            'episodes': cand['episodes'], 'score': cand['score']})
+
+        candidates = sorted(candidates, key=lambda c: c['score'], reverse=True)
+        if budget >= max_episodes or (len(candidates) == 1 and not finish):
+            return candidates[0]
+
+        # untere Fraktion verwerfen, Überlebende mit größerem Budget fortsetzen
+        candidates = candidates[:max(1, len(candidates) // eta)]
+        budget = min(max_episodes, budget * eta)
+        rung += 1
+
+
+def _candidate_states(candidates, first_id=0):
+    return [{'config_id': first_id + i, 'params': dict(params), 'Q': None, 'episodes': 0,
+             'rewards': np.zeros(0, dtype=np.float32), 'wall_time': 0.0, 'score': float('-inf')}
+            for i, params in enumerate(candidates)]
+
+
+def _search_result(best):
+    return {k: best[k] for k in ('config_id', 'params', 'Q', 'episodes', 'score', 'rewards', 'wall_time')}
+
+
+def successive_halving(spec, candidates, min_episodes=50, max_episodes=800, eta=3, score_window=50, seed=0,
+                       max_workers=None, fast=True):
+    """
+    Startet alle Kandidatinnen (Liste von q_learning-Parametern) mit min_episodes Episoden, bewertet sie über die
+    mittlere Belohnung der letzten score_window Episoden, behält das beste 1/eta und setzt die Überlebenden mit
+    ihrer bisherigen Q-Tabelle und dem eta-fachen Budget fort, bis eine übrig ist oder max_episodes erreicht sind.
+    Gibt (best, history) zurück: best enthält config_id, params, Q, episodes, score, rewards und wall_time,
+    history eine Zeile pro Kandidatin und Stufe.
+    """
+    candidates = [dict(c, fast=c.get('fast', fast)) for c in candidates]
+    history = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        best = _halving(pool, spec, _candidate_states(candidates), min_episodes, max_episodes, eta, score_window,
+                        seed, history, bracket=0)
+    return _search_result(best), history
+
+
+def hyperband(spec, max_episodes=810, eta=3, score_window=50, seed=0, max_workers=None, fast=True, **ranges):
+    """
+    Hyperband: mehrere Successive-Halving-Durchläufe („Brackets“) mit unterschiedlichem Verhältnis aus Anzahl
+    Kandidatinnen und Start-Budget. Kandidatinnen werden mit sample_candidates(**ranges) gezogen.
+    Die Siegerin jedes Brackets wird bis max_episodes trainiert, damit alle verglichenen Scores vom selben Budget
+    stammen. Gibt wie successive_halving (best, history) zurück; history enthält zusätzlich die Bracket-Nummer.
+    """
+    s_max = int(math.log(max_episodes) / math.log(eta) + 1e-9)
+    history = []
+    best = None
+    next_id = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for s in range(s_max, -1, -1):
+            num = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+            min_episodes = max(1, int(max_episodes * eta ** -s))
+            candidates = sample_candidates(num, seed=seed + s, **ranges)
+            candidates = [dict(c, fast=c.get('fast', fast)) for c in candidates]
+            winner = _halving(pool, spec, _candidate_states(candidates, next_id), min_episodes, max_episodes, eta,
+                              score_window, seed, history, bracket=s_max - s, finish=True)
+            next_id += num
+            if best is None or winner['score'] > best['score']:
+                best = winner
+    return _search_result(best), history
@@ -3,8 +3,13 @@ import ipywidgets as widgets
 from IPython.display import display
 from PIL import Image
 from contextlib import ExitStack
-from .envs import InteractiveGridEnv, ExtendedGridEnv
+from .envs import InteractiveGridEnv
 from .qlearning import q_learning
+from .sweep import LayoutSpec
+from .recording import EpisodeLog
+from .qstore import state_q_values
+from .analysis import analyze_layout
+from .replay import render_episodes
 from .vis import plot_q_learning_progress, show_q_heatmap, make_video_from_frames
 
 
@@ -520,51 +525,13 @@ def launch_training_lab():
         Führt dann das Training durch.
         """
 
-        # Als Ziel wird das erste vom Benutzer gewählte „Goal“-Feld verwendet
-        goal_positions = env_params['goal_positions']
-        if len(goal_positions) == 0:
-            # Falls kein Ziel gewählt wurde → Zelle unten rechts als Standard
-            goal_pos = (env_params['rows'], env_params['cols'])
-        else:
-            goal_pos = goal_positions[-1]
-
-        # Umgebung initialisieren
-        large_env = ExtendedGridEnv(
-            rows=env_params['rows'],
-            cols=env_params['cols'],
-            # tiles
-            ice_positions=env_params['ice_positions'],
-            bumper_positions=env_params['bumper_positions'],
-            pit_positions=env_params['pit_positions'],
-            wall_positions=env_params['wall_positions'],
-            sticky_positions=env_params['sticky_positions'],
-            conveyor_map=env_params['conveyor_map'],  # dict (row,col)->"U/D/L/R"
-            trampoline_positions=env_params['trampoline_positions'],
-            wind_positions=env_params['wind_positions'],
-            portal_pairs=env_params['portal_pairs'],  # list[((r1,c1),(r2,c2))]
-            collapse_positions=env_params['collapse_positions'],
-            toll_positions=env_params['toll_positions'],
-            battery_positions=env_params['battery_positions'],
-            gem_positions=env_params['gem_positions'],
-            # rewards
-            reward_goal=env_params['reward_goal'],
-            reward_pit=env_params['reward_pit'],
-            reward_step=env_params['reward_step'],
-            reward_wall=env_params['reward_wall'],
-            reward_sticky=env_params['reward_sticky'],
-            reward_trampoline=env_params['reward_trampoline'],
-            reward_toll=env_params['reward_toll'],
-            reward_jewel_pos=env_params['reward_jewel_pos'],
-            reward_jewel_neg=env_params['reward_jewel_neg'],
-            jewel_steps=env_params['jewel_steps'],
-            battery_required=env_params['battery_required'],
-            goal_position=goal_pos,
-            rng_seed=env_params['rng_seed'],
-        )
+        # Umgebung aus einer picklebaren Kartenbeschreibung initialisieren (wie in den Sweep-Workern)
+        layout = LayoutSpec.from_env_params(env_params)
+        large_env = layout.build(rng_seed=env_params['rng_seed'])
 
-        large_env.start_pos = env_params['start_pos']
-        large_env.agent_pos = env_params['start_pos']
-        large_env.visited = {env_params['start_pos']}
+        # Karte vorab prüfen, damit kein ganzer Lauf auf einer unlösbaren Karte verschwendet wird
+        for problem in analyze_layout(large_env).problems:
+            print(f"⚠️ Achtung: {problem} Der Agent kann das Ziel so nie erreichen.")
 
         if agent_params['epsilon_decay']:
             decay_factor = agent_params['epsilon_decay_factor']
@@ -575,8 +542,9 @@ def launch_training_lab():
             decay_interval = 1
             epsilon_min = 0.01
 
-        # Tabellarisches Q-Learning trainieren
-        Q, stored_trajectories, rewards_history = q_learning(
+        # Tabellarisches Q-Learning trainieren; Episoden nur als (Zufallszustand, Aktionen) speichern
+        episode_log = EpisodeLog(large_env)
+        Q, _, rewards_history = q_learning(
             large_env,
             num_episodes=agent_params['num_episodes'],
             alpha=agent_params['alpha'],
@@ -586,8 +554,10 @@ def launch_training_lab():
             epsilon_decay_interval=decay_interval,
             epsilon_min=epsilon_min,
             max_steps=agent_params['max_steps'],
-            record_interval=agent_params['record_interval'],
-            report_interval=agent_params['report_interval']
+            record_interval=None,
+            report_interval=agent_params['report_interval'],
+            fast=True,
+            episode_log=episode_log
         )
 
         # Belohnungsfortschritt-Diagramm plotten
@@ -599,7 +569,7 @@ def launch_training_lab():
         # Referenzen für spätere Wiedergabe sichern
         training_data['env'] = large_env
         training_data['Q'] = Q
-        training_data['trajectories'] = stored_trajectories
+        training_data['trajectories'] = episode_log.every(agent_params['record_interval'])
         training_data['rewards_history'] = rewards_history
 
     @output1.capture(clear_output=True)
@@ -746,11 +716,7 @@ def launch_training_lab():
             print("Keine gespeicherten Trainingsdaten gefunden. Bitte erst trainieren.")
             return
 
-        episodes = {}
-        for ep, traj in trajectories.items():
-            env.reset()
-            ep_frames = [env.render(pos) for pos in traj]
-            episodes[ep] = ep_frames
+        episodes = render_episodes(env, trajectories)
 
         im = Image.fromarray(episodes[0][0])
         im.save("grid.png")
@@ -775,11 +741,12 @@ def launch_training_lab():
         state = env.reset()
         trajectory = [env.agent_pos]
         max_steps = max_steps_widget.value
+        rng = env.rng.spawn()  # eigener Strom für den Agenten, Eis und Wind bleiben unabhängig davon
         for _ in range(max_steps):
             # tie-breaking so the agent doesn’t always pick action 0
-            q_row = agent[state]
+            q_row = state_q_values(agent, env, state)
             best = np.flatnonzero(q_row == q_row.max())
-            action = int(np.random.choice(best))
+            action = int(rng.choice(best))
 
             #action = np.argmax(agent[state])
             next_state, _, done = env.step(action)
@@ -790,7 +757,7 @@ def launch_training_lab():
                 break
 
         env.reset()
-        test_ep_frames = [env.render(pos) for pos in trajectory]
+        test_ep_frames = env.render_trajectory(trajectory)
 
         print(f"=== Test Episode ===")
         test_video = make_video_from_frames(test_ep_frames, fps=fps_widget.value)
@@ -0,0 +1,315 @@
+import numpy as np
+from .rng import BlockRNG
+from .analysis import _chain_table
+from ._tiles import (TILE_WALL, TILE_PIT, TILE_ICE, TILE_BUMPER, TILE_STICKY, TILE_TRAMPOLINE, TILE_WIND,
+                     TILE_TOLL, DIR_DR, DIR_DC)
+
+# Bewegungsvektoren je Aktion (0=oben, 1=unten, 2=links, 3=rechts), gleiche Reihenfolge wie ExtendedGridEnv.DIRS
+_ACTION_DR = np.array(DIR_DR, dtype=np.int64)
+_ACTION_DC = np.array(DIR_DC, dtype=np.int64)
+
+
+class VecExtendedGridEnv:
+    """
+    Hält N Kopien einer ExtendedGridEnv-Karte und führt reset()/step(actions) für alle gleichzeitig auf NumPy-Arrays aus.
+    Die Feldregeln entsprechen ExtendedGridEnv.check_proposed_pos bzw. ExtendedGridEnv.step.
+    Statt einer Karte kann eine Liste von Karten (auch unterschiedlicher Größe) übergeben werden; Umgebung i spielt
+    dann Karte i % num_maps (map_id). Zustände bleiben die Feldindizes der jeweiligen Karte (< rows*cols der Karte).
+    """
+    def __init__(self, env, num_envs=None, rng_seed=None):
+        envs = list(env) if isinstance(env, (list, tuple)) else [env]
+        self.envs = envs
+        self.env = envs[0]
+        self.num_maps = len(envs)
+        self.num_envs = len(envs) if num_envs is None else num_envs
+        self.rows = self.env.rows
+        self.cols = self.env.cols
+        # Zustände pro Karte im gemeinsamen (aufgefüllten) Feldraster
+        self.num_states = max(e.rows * e.cols for e in envs)
+        self.map_id = np.arange(self.num_envs) % self.num_maps
+
+        # ───────── statische Karten aus den Feldrastern, aneinandergehängt (Karte m ab m * num_states) ─────────
+        S = self.num_states
+        flags = self._stack([e._tile_flags for e in envs], 0)
+        self.wall = (flags & TILE_WALL) != 0
+        self.pit = (flags & TILE_PIT) != 0
+        self.ice = (flags & TILE_ICE) != 0
+        self.bumper = (flags & TILE_BUMPER) != 0
+        self.sticky = (flags & TILE_STICKY) != 0
+        self.trampoline = (flags & TILE_TRAMPOLINE) != 0
+        self.wind = (flags & TILE_WIND) != 0
+        self.toll = (flags & TILE_TOLL) != 0
+        self.conveyor_dir = self._stack([e._conveyor_dir for e in envs], -1)
+        # Portalziele als Index im gemeinsamen Raster
+        self.portal_dest = self._stack([np.where(e._portal_dest >= 0, e._portal_dest + m * S, -1)
+                                        for m, e in enumerate(envs)], -1)
+        self.forcing = self._stack([e._forcing for e in envs], False)
+
+        self.collapse_slot = self._stack([e._collapse_slot for e in envs], -1)
+        self.battery_slot = self._stack([e._battery_slot for e in envs], -1)
+        self.gem_slot = self._stack([e._gem_slot for e in envs], -1)
+        self.num_collapse = max(len(e._collapse_cells) for e in envs)
+        self.num_batteries = max(len(e._battery_cells) for e in envs)
+        self.num_gems = max(len(e._gem_cells) for e in envs)
+
+        # Endfelder aller Züge (Feld * 4 + Aktion) pro Windrichtung; nur Ketten über Eis werden in step() abgelaufen
+        tables = [_chain_table(e) for e in envs]
+        num_winds = max(len(ends) for _, ends, _, _ in tables)
+        self._ends = np.zeros((num_winds, self.num_maps * S * 4), dtype=np.int32)
+        self._slippery = np.zeros((num_winds, self.num_maps * S * 4), dtype=bool)
+        for m, (_, ends, _, slippery) in enumerate(tables):
+            block = slice(m * S * 4, m * S * 4 + ends.shape[1])
+            self._ends[:, block] = ends + m * S  # ohne Wind-Felder gilt die eine Zeile für alle Richtungen
+            self._slippery[:, block] = slippery
+
+        # ───────── Geometrie, Start/Ziel und Belohnungen pro Umgebung ─────────
+        per_map = lambda values, dtype=np.float64: np.array(values, dtype=dtype)[self.map_id]
+        self._rows = per_map([e.rows for e in envs], np.int64)
+        self._cols = per_map([e.cols for e in envs], np.int64)
+        self._offset = self.map_id * S
+        self.sync()
+        self._battery_required = per_map([e.battery_required for e in envs], bool)
+        self._jewel_steps = per_map([e.jewel_steps for e in envs], np.int64)
+        self._reward = {name: per_map([getattr(e, name) for e in envs])
+                        for name in ("reward_step", "reward_pit", "reward_goal", "reward_sticky", "reward_toll",
+                                     "reward_trampoline", "reward_jewel_pos", "reward_jewel_neg")}
+
+        self.rng = BlockRNG(rng_seed)
+
+        # ───────── dynamischer Zustand, eine Zeile pro Umgebung ─────────
+        n = self.num_envs
+        self.pos = np.zeros(n, dtype=np.int64)
+        self.has_battery = np.zeros(n, dtype=bool)
+        self.battery_left = np.ones((n, self.num_batteries), dtype=bool)
+        self.gem_left = np.ones((n, self.num_gems), dtype=bool)
+        self.collapsed = np.zeros((n, self.num_collapse), dtype=bool)
+        self.skip_turns = np.zeros(n, dtype=np.int64)
+        self.step_count = np.zeros(n, dtype=np.int64)
+        self.wind_dir_idx = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+
+    # ──────────────────────────────────────────────────────────────── #
+    # Hilfsfunktionen
+    def _stack(self, arrays, fill):
+        """
+        Hängt die flachen Felder-Arrays aller Karten (je auf num_states aufgefüllt) aneinander.
+        """
+        out = np.full((self.num_maps, self.num_states), fill, dtype=np.asarray(arrays[0]).dtype)
+        for m, values in enumerate(arrays):
+            out[m, :len(values)] = values
+        return out.reshape(-1).astype(np.int64) if out.dtype.kind == "i" else out.reshape(-1)
+
+    @property
+    def agent_rows(self):
+        return self.pos // self._cols
+
+    @property
+    def agent_cols(self):
+        return self.pos % self._cols
+
+    def _lookup(self, table, slots, idx, cells):
+        """
+        Liest für Umgebungen `idx` den Eintrag von `table` am Objekt auf Feld `cells` (False, falls dort keins liegt).
+        `cells` sind Indizes im gemeinsamen Raster.
+        """
+        slot = slots[cells]
+        hit = slot >= 0
+        out = np.zeros(idx.size, dtype=bool)
+        out[hit] = table[idx[hit], slot[hit]]
+        return out
+
+    def sync(self):
+        """
+        Übernimmt Start- und Zielfeld erneut aus den Karten, z. B. nachdem start_pos oder goal_pos geändert wurden.
+        Für geänderte Felder muss eine neue VecExtendedGridEnv angelegt werden.
+        """
+        self._start = np.array([e.to_index(*e.start_pos) for e in self.envs], dtype=np.int64)[self.map_id]
+        self._goal = np.array([e.to_index(*e.goal_pos) for e in self.envs], dtype=np.int64)[self.map_id]
+
+    # ──────────────────────────────────────────────────────────────── #
+    def reset(self, mask=None):
+        """
+        Setzt alle (oder nur die in `mask` markierten) Umgebungen zurück und gibt die Zustandsindizes zurück.
+        """
+        idx = np.arange(self.num_envs) if mask is None else np.flatnonzero(mask)
+        self.pos[idx] = self._start[idx]
+        self.has_battery[idx] = False
+        self.battery_left[idx] = True
+        self.gem_left[idx] = True
+        self.collapsed[idx] = False
+        self.skip_turns[idx] = 0
+        self.step_count[idx] = 0
+        self.wind_dir_idx[idx] = self.rng.integers(0, 4, size=idx.size)
+        self.done[idx] = False
+        return self.pos.copy()
+
+    # ──────────────────────────────────────────────────────────────── #
+    def _resolve_chains(self, idx, proposed, dr, dc):
+        """
+        Vektorisierte Variante von ExtendedGridEnv.check_proposed_pos für die Umgebungen `idx`.
+        Arbeitet auf Indizes im gemeinsamen Raster (Feld + Kartenversatz).
+        """
+        offset = self._offset[idx]
+        rows, cols = self._rows[idx], self._cols[idx]
+        origin = self.pos[idx] + offset
+        cur = proposed + offset
+        final = np.empty_like(cur)
+        active = np.ones(idx.size, dtype=bool)
+        history = []  # pro Kettenglied besuchte Felder (Schleifenerkennung)
+
+        while active.any():
+            a = np.flatnonzero(active)
+            p = cur[a]
+
+            # 1. Felder, die die Bewegung sofort abbrechen
+            is_wall = self.wall[p]
+            is_portal = ~is_wall & (self.portal_dest[p] >= 0)
+            is_plain = ~is_wall & ~is_portal & ~self.forcing[p]
+            final[a[is_wall]] = origin[a[is_wall]]
+            final[a[is_portal]] = self.portal_dest[p[is_portal]]
+            final[a[is_plain]] = p[is_plain]
+            going = ~(is_wall | is_portal | is_plain)
+
+            # 2. Schleifen erkennen
+            seen = np.zeros(a.size, dtype=bool)
+            for h in history:
+                seen |= h[a] == p
+            stop = going & seen
+            final[a[stop]] = p[stop]
+            going &= ~seen
+
+            step_hist = np.full(idx.size, -1, dtype=np.int64)
+            step_hist[a[going]] = p[going]
+            history.append(step_hist)
+
+            # 3. genau *eine* Bewegungsregel anwenden (Priorität wie in check_proposed_pos)
+            on_ice = going & self.ice[p]
+            if on_ice.any():
+                slip = self.rng.random(on_ice.sum()) < 0.5
+                ice_idx = np.flatnonzero(on_ice)
+                no_slip = ice_idx[~slip]
+                final[a[no_slip]] = p[no_slip]
+                going[no_slip] = False
+                slip_idx = ice_idx[slip]
+                slip_action = self.rng.integers(0, 4, size=slip_idx.size)
+                dr[a[slip_idx]] = _ACTION_DR[slip_action]
+                dc[a[slip_idx]] = _ACTION_DC[slip_action]
+            rest = going & ~self.ice[p]
+
+            on_bumper = rest & self.bumper[p]
+            dr[a[on_bumper]] *= -3
+            dc[a[on_bumper]] *= -3
+            rest &= ~on_bumper
+
+            conv = self.conveyor_dir[p]
+            on_conveyor = rest & (conv >= 0)
+            dr[a[on_conveyor]] = _ACTION_DR[conv[on_conveyor]]
+            dc[a[on_conveyor]] = _ACTION_DC[conv[on_conveyor]]
+            rest &= ~on_conveyor
+
+            on_trampoline = rest & self.trampoline[p]
+            dr[a[on_trampoline]] *= 2
+            dc[a[on_trampoline]] *= 2
+            rest &= ~on_trampoline
+
+            on_wind = rest & self.wind[p]
+            wind = self.wind_dir_idx[idx[a[on_wind]]]
+            dr[a[on_wind]] = _ACTION_DR[wind]
+            dc[a[on_wind]] = _ACTION_DC[wind]
+
+            # 4. Bewegung (mit Randbegrenzung)
+            moving = a[going]
+            local = cur[moving] - offset[moving]
+            m_cols = cols[moving]
+            r = np.clip(local // m_cols + dr[moving], 0, rows[moving] - 1)
+            c = np.clip(local % m_cols + dc[moving], 0, m_cols - 1)
+            cur[moving] = r * m_cols + c + offset[moving]
+
+            active[:] = False
+            active[moving] = True
+
+        return final
+
+    # ──────────────────────────────────────────────────────────────── #
+    def step(self, actions):
+        """
+        Führt für jede Umgebung die Aktion aus `actions` (Form (N,)) aus.
+        Gibt (Zustände, Belohnungen, done-Flags) als Arrays der Form (N,) zurück.
+        """
+        rw = self._reward
+        actions = np.asarray(actions, dtype=np.int64)
+        n = self.num_envs
+        rewards = np.zeros(n, dtype=np.float64)
+        dones = self.done.copy()
+
+        self.step_count += 1
+
+        # Klebriger Schlamm: Zug aussetzen (hat Vorrang vor dem done-Flag, wie in ExtendedGridEnv.step)
+        skipping = self.skip_turns > 0
+        self.skip_turns[skipping] -= 1
+        rewards[skipping] = rw["reward_sticky"][skipping]
+        dones[skipping] = False
+
+        idx = np.flatnonzero(~skipping & ~self.done)
+        if idx.size == 0:
+            return self.pos.copy(), rewards, dones
+
+        # Hauptbewegungsschritt
+        act = actions[idx]
+        dr = _ACTION_DR[act]
+        dc = _ACTION_DC[act]
+        cols = self._cols[idx]
+        r = np.clip(self.pos[idx] // cols + dr, 0, self._rows[idx] - 1)
+        c = np.clip(self.pos[idx] % cols + dc, 0, cols - 1)
+        proposed = r * cols + c
+        # Endfelder aus der Tabelle (im gemeinsamen Raster), Ketten über Eis mit Zufall ablaufen
+        key = (self.pos[idx] + self._offset[idx]) * 4 + act
+        wind = self.wind_dir_idx[idx] if len(self._ends) > 1 else 0
+        final = self._ends[wind, key].astype(np.int64)
+        slip = np.flatnonzero(self._slippery[wind, key])
+        if slip.size:
+            final[slip] = self._resolve_chains(idx[slip], proposed[slip], dr[slip], dc[slip])
+        proposed = proposed + self._offset[idx]
+
+        self.skip_turns[idx[self.sticky[final]]] = 1
+        self.pos[idx] = final - self._offset[idx]
+
+        reward = rw["reward_step"][idx].copy()
+        done = np.zeros(idx.size, dtype=bool)
+
+        # Grube / Einstürzender Boden
+        collapsed = self._lookup(self.collapsed, self.collapse_slot, idx, final)
+        fall = self.pit[final] | collapsed
+        reward[fall] = rw["reward_pit"][idx[fall]]
+        done[fall] = True
+        now_collapsing = ~fall & (self.collapse_slot[final] >= 0)
+        self.collapsed[idx[now_collapsing], self.collapse_slot[final[now_collapsing]]] = True
+
+        # Maut-Tor und Trampolin-Bonus
+        toll = self.toll[final]
+        reward[toll] += rw["reward_toll"][idx[toll]]
+        trampoline = self.trampoline[proposed]
+        reward[trampoline] += rw["reward_trampoline"][idx[trampoline]]
+
+        # Batterie wird aufgesammelt
+        battery = self._lookup(self.battery_left, self.battery_slot, idx, final)
+        self.has_battery[idx[battery]] = True
+        self.battery_left[idx[battery], self.battery_slot[final[battery]]] = False
+
+        # Zeit-abhängiges Juwel
+        gem = self._lookup(self.gem_left, self.gem_slot, idx, final)
+        early = self.step_count[idx] < self._jewel_steps[idx]
+        reward[gem & early] += rw["reward_jewel_pos"][idx[gem & early]]
+        reward[gem & ~early] += rw["reward_jewel_neg"][idx[gem & ~early]]
+        self.gem_left[idx[gem], self.gem_slot[final[gem]]] = False
+
+        # Ziel
+        at_goal = self.pos[idx] == self._goal[idx]
+        at_goal &= ~self._battery_required[idx] | self.has_battery[idx]
+        reward[at_goal] = rw["reward_goal"][idx[at_goal]]
+        done[at_goal] = True
+
+        rewards[idx] = reward
+        dones[idx] = done
+        self.done[idx] = done
+        return self.pos.copy(), rewards, dones
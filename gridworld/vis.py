@@ -2,9 +2,11 @@ import numpy as np
 import plotly.graph_objs as go
 import matplotlib.pyplot as plt
 import ipywidgets as widgets
-import os, tempfile, time
+import os, tempfile
 from moviepy import ImageSequenceClip
 from IPython.display import display, clear_output, Video
+from .qstore import position_q_table, state_q_values
+from .replay import render_episodes
 
 
 def plot_q_learning_progress(rewards, interval=50, rolling_window=50):
@@ -54,7 +56,9 @@ def show_q_heatmap(Q, env):
     """
     Visualisiert (1) den höchsten Q-Wert pro Zustand als Farbfeld
     und (2) die aktuell bevorzugte Aktion als Richtungspfeil.
+    Q darf ein ndarray oder ein beliebiges Q-Backend sein (Zusatzzustände werden per Maximum zusammengefasst).
     """
+    Q = position_q_table(Q, env)
     qs = Q.max(axis=1).reshape(env.rows, env.cols)  # Matrix mit dem höchsten Q-Wert pro Zustand
     policy = Q.argmax(axis=1).reshape(env.rows, env.cols)  # Matrix mit dem Index der besten Aktion pro Zustand
 
@@ -75,8 +79,11 @@ def show_q_heatmap(Q, env):
 
 def make_video_from_frames(frames, filename=None, fps=25):
     """
-    Diese Funktion nimmt eine Liste von Frames und macht daraus ein Video, das im Browser angezeigt werden kann.
+    Diese Funktion nimmt eine Liste von Frames (oder einen (T, H, W, 3)-Puffer aus env.render_trajectory) und macht
+    daraus ein Video, das im Browser angezeigt werden kann.
     """
+    if isinstance(frames, np.ndarray):
+        frames = list(frames)  # Sichten in den Puffer, keine Kopien
     clip = ImageSequenceClip(frames, fps=fps)
 
     use_tmpfile = filename is None
@@ -102,12 +109,7 @@ def make_video_from_frames(frames, filename=None, fps=25):
 
 def show_training_videos(trajectories, env, fps=2):
     # Schritte jeder gespeicherten Episode als Frames speichern
-    episodes = {}
-    for ep, traj in trajectories.items():
-        env.reset()
-        ep_frames = [env.render(pos) for pos in traj]
-        episodes[ep] = ep_frames
-        time.sleep(0.1)
+    episodes = render_episodes(env, trajectories)
 
     # Videos aus den Frames erstellen und darstellen
     training_output = widgets.Output(layout={'border': '1px solid black', 'height': '800px', 'overflow': 'scroll'})
@@ -126,14 +128,14 @@ def show_test_video(Q, env, fps=2):
     trajectory = [env.agent_pos]
     done = False
     while not done:
-        action = np.argmax(Q[state])
+        action = np.argmax(state_q_values(Q, env, state))
         next_state, _, done = env.step(action)
         trajectory.append(env.agent_pos)
         state = next_state
 
     # Schritte der Test-Episode als Frames speichern
     env.reset()
-    test_ep_frames = [env.render(pos) for pos in trajectory]
+    test_ep_frames = env.render_trajectory(trajectory)
 
     # Test-Video aus Frames erstellen und darstellen
     test_output = widgets.Output(layout={'border': '1px solid black', 'height': '800px', 'overflow': 'scroll'})
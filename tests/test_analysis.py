@@ -0,0 +1,75 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from gridworld import ExtendedGridEnv, analyze_layout
+
+
+def _step_distances(env):
+    """
+    Schritte bis zum Ziel per Breitensuche über die tatsächlichen env.step()-Übergänge (nur deterministische Karten).
+    """
+    n = env.rows * env.cols
+    goal = env.to_index(*env.goal_pos)
+    predecessors = [[] for _ in range(n)]
+    for s in range(n):
+        pos = env.from_index(s)
+        if s == goal or pos in env.pit_positions or pos in env.wall_positions:
+            continue
+        for a in range(4):
+            env.agent_pos, env.done, env.skip_turns = pos, False, 0
+            final, _, _ = env.step(a)
+            predecessors[final].append(s)
+    distance = np.full(n, np.inf)
+    distance[goal] = 0
+    queue = deque([goal])
+    while queue:
+        s = queue.popleft()
+        for p in predecessors[s]:
+            if distance[p] == np.inf:
+                distance[p] = distance[s] + 1
+                queue.append(p)
+    return distance
+
+
+# ──────────────────────────────────────────────────────────────── #
+def test_open_grid_is_manhattan():
+    env = ExtendedGridEnv(rows=4, cols=6, resolution=None)
+    result = analyze_layout(env)
+    r, c = np.divmod(np.arange(24), 6)
+    assert np.array_equal(result.distance, (3 - r) + (5 - c))
+    assert result.start_distance == 8 and result.goal_reachable
+
+
+def test_distances_match_step_bfs():
+    env = ExtendedGridEnv(rows=6, cols=6, wall_positions=[(1, 1), (1, 2), (1, 3), (3, 2)], pit_positions=[(4, 4)],
+                          conveyor_map={(2, 0): "D", (3, 0): "D"}, trampoline_positions=[(5, 1)],
+                          bumper_positions=[(2, 4)], portal_pairs=[((0, 5), (4, 1))], resolution=None, rng_seed=0)
+    env.reset()
+    result = analyze_layout(env)
+    expected = _step_distances(env)
+    open_cells = [s for s in range(36) if env.from_index(s) not in env.wall_positions]
+    assert np.array_equal(result.distance[open_cells], expected[open_cells])
+    assert np.isinf(result.distance[env.to_index(4, 4)])
+
+
+def test_battery_detour():
+    env = ExtendedGridEnv(rows=4, cols=4, battery_positions=[(3, 0)], battery_required=True, goal_position=(0, 3),
+                          resolution=None)
+    result = analyze_layout(env)
+    # Start (0, 0) → Batterie (3, 0) → Ziel (0, 3)
+    assert result.start_distance == 3 + 6
+    assert result.distance_grid(with_battery=True)[0, 0] == 3
+    assert result.distance_grid()[3, 0] == 6
+
+
+def test_unreachable_goal_is_reported():
+    env = ExtendedGridEnv(rows=3, cols=3, wall_positions=[(1, 2), (2, 1)], resolution=None)
+    result = analyze_layout(env)
+    assert not result.goal_reachable and result.problems
+    assert np.isinf(result.start_distance)
+    potential = result.potential()
+    assert potential.shape == (2, 9)
+    # unerreichbare Felder bekommen das Potential der größten endlichen Distanz + 1
+    assert potential[0, 0] == pytest.approx(-0.1 * 1.0)
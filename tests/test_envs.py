@@ -0,0 +1,42 @@
+from gridworld import ExtendedGridEnv
+
+
+def _env(seed=2):
+    return ExtendedGridEnv(rows=5, cols=5, ice_positions=[(1, 1), (1, 2)], wind_positions=[(2, 3)],
+                           sticky_positions=[(0, 2)], collapse_positions=[(0, 1)], gem_positions=[(1, 0)],
+                           battery_positions=[(2, 0)], toll_positions=[(3, 2)], battery_required=True,
+                           resolution=None, rng_seed=seed)
+
+
+def _run(env, actions):
+    return [env.step(a) for a in actions]
+
+
+# ──────────────────────────────────────────────────────────────── #
+def test_snapshot_restore_round_trip():
+    env = _env()
+    env.reset()
+    # Batterie und Edelstein aufsammeln, Einsturzfeld betreten, auf Schlamm und Eis
+    _run(env, [1, 1, 0, 0, 3, 3, 3])
+    snap = env.snapshot()
+    assert snap.has_battery and snap.gem_mask == 0 and snap.collapsed_mask
+    state = env.to_index(*env.agent_pos)
+    actions = [1, 3, 1, 0, 2, 1, 3, 3, 1, 1, 3, 0]
+    expected = _run(env, actions)
+
+    assert env.restore(snap) == state
+    assert _run(env, actions) == expected
+
+
+def test_restore_into_another_instance():
+    env = _env()
+    env.reset()
+    _run(env, [1, 1, 3])
+    snap = env.snapshot()
+    actions = [3, 0, 3, 3, 1, 1, 1, 3]
+    expected = _run(env, actions)
+
+    other = _env(seed=99)
+    other.reset()
+    other.restore(snap)
+    assert _run(other, actions) == expected
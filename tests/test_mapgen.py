@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import gridworld.mapgen as mapgen
+from gridworld import generate_maps
+
+
+def test_generated_maps_are_solvable():
+    batch = generate_maps(50, 8, 9, seed=0, battery_required=True)
+    assert len(batch) == 50
+    assert mapgen._solvable(batch, True).all()
+
+
+def test_last_redraw_is_checked(monkeypatch):
+    calls = []
+
+    def solvable(batch, battery_required):
+        calls.append(len(batch))
+        return np.full(len(batch), len(calls) > 1)
+
+    monkeypatch.setattr(mapgen, "_solvable", solvable)
+    generate_maps(4, 5, 5, seed=0, max_attempts=1)
+    assert len(calls) == 2
+
+    calls.clear()
+    monkeypatch.setattr(mapgen, "_solvable", lambda batch, battery_required: np.zeros(len(batch), dtype=bool))
+    with pytest.raises(RuntimeError):
+        generate_maps(4, 5, 5, seed=0, max_attempts=1)
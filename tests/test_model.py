@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+import pytest
+
+from gridworld import ExtendedGridEnv, LargeGridEnv, compile_model, compile_models
+from gridworld._tiles import TILE_WALL, TILE_PIT, TILE_FORCING
+
+
+def _ice_patch(top, left, size):
+    return [(r, c) for r in range(top, top + size) for c in range(left, left + size)]
+
+
+def _model_row(model, s, a):
+    indices, probs, _, _ = model.row(s, a)
+    return dict(zip(indices.tolist(), probs.tolist()))
+
+
+def _rollouts(env, s, a, n, wind=None):
+    """
+    Häufigkeiten der Endfelder von `n` Schritten env.step(a) ab Feld `s`.
+    """
+    counts = {}
+    for _ in range(n):
+        env.agent_pos = env.from_index(s)
+        env.done = False
+        env.skip_turns = 0
+        if wind is not None:
+            env.wind_dir_idx = wind
+        final, _, _ = env.step(a)
+        counts[final] = counts.get(final, 0) + 1
+    return {k: v / n for k, v in counts.items()}
+
+
+def _assert_matches(model, env, pairs, n, wind=None):
+    for s, a in pairs:
+        expected = _model_row(model, s, a)
+        observed = _rollouts(env, s, a, n, wind)
+        assert sum(expected.values()) == pytest.approx(1.0)
+        for final in set(expected) | set(observed):
+            p = expected.get(final, 0.0)
+            # 5 Standardabweichungen plus Spielraum für die Näherung des Modells
+            assert abs(observed.get(final, 0.0) - p) <= 5 * np.sqrt(p * (1 - p) / n) + 2e-3, (s, a, final)
+
+
+def _chain_pairs(env):
+    """
+    Alle (Zustand, Aktion), deren Zug auf einem Feld mit erzwungener Bewegung landet.
+    """
+    pairs = []
+    for s in range(env.rows * env.cols):
+        r, c = env.from_index(s)
+        if env._cell_flags(s) & (TILE_WALL | TILE_PIT) or (r, c) == env.goal_pos:
+            continue
+        for a in range(4):
+            dr, dc = env.action_map[a]
+            p = env.to_index(min(max(r + dr, 0), env.rows - 1), min(max(c + dc, 0), env.cols - 1))
+            if env._cell_flags(p) & TILE_FORCING:
+                pairs.append((s, a))
+    return pairs
+
+
+# ──────────────────────────────────────────────────────────────── #
+def test_extended_model_matches_rollouts():
+    env = ExtendedGridEnv(rows=7, cols=7, ice_positions=_ice_patch(1, 1, 4), bumper_positions=[(5, 2)],
+                          pit_positions=[(0, 5)], conveyor_map={(5, 4): "L"}, wind_positions=[(2, 5)],
+                          trampoline_positions=[(6, 3)], resolution=None, rng_seed=0)
+    env.reset()
+    model = compile_model(env, wind=1)
+    _assert_matches(model, env, _chain_pairs(env), n=2000, wind=1)
+
+
+def test_per_wind_models_match_rollouts():
+    env = ExtendedGridEnv(rows=5, cols=5, wind_positions=[(2, 2)], ice_positions=[(2, 3)], pit_positions=[(0, 4)],
+                          resolution=None, rng_seed=0)
+    env.reset()
+    models = compile_models(env)
+    assert len(models) == 4
+    for w, model in enumerate(models):
+        _assert_matches(model, env, _chain_pairs(env), n=1000, wind=w)
+    # Die Mischung pro Schritt ist keines der Modelle, die die Umgebung tatsächlich abspielt
+    mixed = compile_model(env)
+    assert all(not np.array_equal(mixed.probs, m.probs) or not np.array_equal(mixed.indices, m.indices)
+               for m in models)
+
+
+def test_compile_models_without_wind():
+    env = ExtendedGridEnv(rows=4, cols=4, ice_positions=[(1, 1)], resolution=None)
+    models = compile_models(env)
+    assert len(models) == 1
+    assert np.array_equal(models[0].probs, compile_model(env).probs)
+
+
+def test_large_model_matches_rollouts():
+    env = LargeGridEnv(rows=6, cols=6, ice_positions=_ice_patch(1, 1, 3), bumper_positions=[(4, 2)],
+                       pit_positions=[(0, 4)], goal_position=(5, 5), resolution=None, rng_seed=0)
+    env.reset()
+    model = compile_model(env)
+    pairs = [(s, a) for s in range(36) for a in range(4)
+             if env.tile_map.get(env.from_index(s)) != "pit" and s != env.to_index(*env.goal_pos)]
+    _assert_matches(model, env, pairs, n=1000)
+
+
+@pytest.mark.parametrize("env_cls", ["extended", "large"])
+def test_compile_large_ice_patch_is_fast(env_cls):
+    if env_cls == "extended":
+        env = ExtendedGridEnv(rows=14, cols=14, ice_positions=_ice_patch(1, 1, 12), resolution=None)
+    else:
+        env = LargeGridEnv(rows=14, cols=14, ice_positions=_ice_patch(1, 1, 12), bumper_positions=[],
+                           pit_positions=[], goal_position=(13, 13), resolution=None)
+    start = time.perf_counter()
+    model = compile_model(env)
+    assert time.perf_counter() - start < 10.0
+    assert np.allclose(model._row_sum(model.probs), 1.0)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from gridworld import (ExtendedGridEnv, TransitionRecorder, compile_model, compile_models, fitted_q_iteration,
+                       load_transitions, policy_iteration, q_learning, value_iteration)
+
+GAMMA = 0.95
+
+
+def _wind_env():
+    return ExtendedGridEnv(rows=6, cols=6, wind_positions=[(4, 2)], ice_positions=[(2, 2), (2, 3)],
+                           pit_positions=[(3, 4)], resolution=None, rng_seed=0)
+
+
+def _discounted_returns(env, tables, episodes, max_steps=200):
+    """
+    Diskontierte Returns gieriger Episoden; Q-Tabelle je Episode nach der in reset() gezogenen Windrichtung.
+    """
+    returns = np.empty(episodes)
+    for i in range(episodes):
+        state = env.reset()
+        Q = tables[env.wind_dir_idx % len(tables)]
+        total, discount = 0.0, 1.0
+        for _ in range(max_steps):
+            state, reward, done = env.step(int(Q[state].argmax()))
+            total += discount * reward
+            discount *= GAMMA
+            if done:
+                break
+        returns[i] = total
+    return returns
+
+
+# ──────────────────────────────────────────────────────────────── #
+@pytest.mark.parametrize("solver", [value_iteration, policy_iteration])
+def test_default_plan_averages_per_wind_tables(solver):
+    env = _wind_env()
+    tables = [solver(env, gamma=GAMMA, model=m) for m in compile_models(env)]
+    assert np.allclose(solver(env, gamma=GAMMA), np.mean(tables, axis=0), atol=1e-5)
+
+
+def test_planned_value_matches_rollouts():
+    env = _wind_env()
+    tables = [value_iteration(env, gamma=GAMMA, model=m) for m in compile_models(env)]
+    start = env.to_index(*env.start_pos)
+    returns = _discounted_returns(env, tables, episodes=2000)
+    planned = value_iteration(env, gamma=GAMMA)[start].max()
+    assert np.mean([Q[start].max() for Q in tables]) == pytest.approx(planned, abs=1e-5)
+    assert abs(returns.mean() - planned) <= 5 * returns.std() / np.sqrt(len(returns)) + 1e-3
+
+
+@pytest.mark.parametrize("solver", [value_iteration, policy_iteration])
+def test_battery_maps_need_an_explicit_model(solver):
+    env = ExtendedGridEnv(rows=4, cols=4, battery_positions=[(1, 2)], battery_required=True, resolution=None)
+    with pytest.raises(ValueError, match="battery_required"):
+        solver(env)
+    Q = solver(env, model=compile_model(env, has_battery=True))
+    assert Q.shape == (16, 4)
+
+
+def _recorded_dataset(recorder):
+    """
+    Deterministische Karte, die ein stark explorierender Agent vollständig abdeckt.
+    """
+    env = ExtendedGridEnv(rows=4, cols=4, pit_positions=[(1, 2)], conveyor_map={(2, 1): "R"}, resolution=None,
+                          rng_seed=0)
+    q_learning(env, num_episodes=400, epsilon=1.0, max_steps=40, record_interval=None, recorder=recorder, fast=True)
+    return env
+
+
+@pytest.mark.parametrize("alpha", [None, 0.5])
+def test_fitted_q_iteration_matches_value_iteration(alpha):
+    recorder = TransitionRecorder(chunk_size=1000)
+    env = _recorded_dataset(recorder)
+    data = recorder.columns()
+    seen = np.zeros((16, 4), dtype=bool)
+    seen[data['state'], data['action']] = True
+
+    Q = fitted_q_iteration(env, recorder, gamma=GAMMA, alpha=alpha, theta=1e-9)
+    Q_model = value_iteration(env, gamma=GAMMA, theta=1e-9)
+    # alle Paare außerhalb von Ziel, Grube und Förderband (dort bleibt der Agent nie stehen) kommen vor
+    assert seen.sum() == 13 * 4
+    assert np.allclose(Q[seen], Q_model[seen], atol=1e-4)
+    assert not Q[~seen].any()
+
+
+def test_fitted_q_iteration_from_shards(tmp_path):
+    recorder = TransitionRecorder(directory=str(tmp_path), chunk_size=500)
+    env = _recorded_dataset(recorder)
+    assert recorder.num_shards > 1
+    Q_disk = fitted_q_iteration(env, load_transitions(str(tmp_path)), gamma=GAMMA)
+    assert np.array_equal(Q_disk, fitted_q_iteration(env, recorder, gamma=GAMMA))
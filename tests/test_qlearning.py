@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import gridworld.qlearning as qlearning
+from gridworld import ExtendedGridEnv, VecExtendedGridEnv, load_checkpoint, q_learning, q_learning_batched
+from gridworld.checkpoint import save_checkpoint
+
+
+def _env(**kwargs):
+    return ExtendedGridEnv(rows=4, cols=5, ice_positions=[(1, 1)], pit_positions=[(2, 3)], resolution=None,
+                           rng_seed=0, **kwargs)
+
+
+def test_batched_without_recording():
+    Q, trajectories, rewards = q_learning_batched(VecExtendedGridEnv(_env(), 4, rng_seed=1), num_episodes=10,
+                                                  max_steps=20, record_interval=None)
+    assert Q.shape == (20, 4)
+    assert trajectories == {}
+    assert len(rewards) == 10
+
+
+def test_batched_rejects_several_maps():
+    other = ExtendedGridEnv(rows=6, cols=6, resolution=None)
+    with pytest.raises(ValueError):
+        q_learning_batched(VecExtendedGridEnv([_env(), other], 4), num_episodes=4)
+
+
+class _Crash(Exception):
+    pass
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_resume_after_crash_matches_uninterrupted_run(tmp_path, monkeypatch, fast):
+    params = dict(num_episodes=120, alpha=0.3, epsilon=0.3, epsilon_decay_factor=0.99, max_steps=30,
+                  record_interval=25, checkpoint_interval=40, fast=fast)
+    Q_ref, trajectories_ref, rewards_ref = q_learning(_env(), checkpoint=str(tmp_path / "ref"), **params)
+    Q_ref = np.array(Q_ref)
+
+    # Absturz mitten im dritten Checkpoint-Intervall: q.npy enthält dann schon Updates nach Episode 80
+    saves = []
+
+    def crashing_save(path, Q, state):
+        if len(saves) == 2:
+            raise _Crash
+        saves.append(state['episode'])
+        save_checkpoint(path, Q, state)
+
+    monkeypatch.setattr(qlearning, "save_checkpoint", crashing_save)
+    with pytest.raises(_Crash):
+        q_learning(_env(), checkpoint=str(tmp_path / "run"), **params)
+    monkeypatch.undo()
+    assert saves == [40, 80]
+
+    _, state = load_checkpoint(str(tmp_path / "run"))
+    assert state['episode'] == 80
+
+    Q, trajectories, rewards = q_learning(_env(), checkpoint=str(tmp_path / "run"), resume=True, **params)
+    assert np.array_equal(np.asarray(Q), Q_ref)
+    assert rewards == rewards_ref
+    assert trajectories == trajectories_ref
+
+
+def _feature_env():
+    return ExtendedGridEnv(rows=6, cols=6, ice_positions=[(1, 1), (1, 2), (2, 1)], wind_positions=[(3, 3)],
+                           conveyor_map={(4, 1): "R"}, sticky_positions=[(0, 3)], trampoline_positions=[(2, 4)],
+                           toll_positions=[(4, 4)], collapse_positions=[(3, 1)], gem_positions=[(0, 5)],
+                           battery_positions=[(5, 0)], pit_positions=[(2, 3)], resolution=None, rng_seed=3)
+
+
+def test_fast_matches_standard_loop_without_exploration():
+    # ohne Exploration verbrauchen beide Wege env.rng identisch (Wind, Eis), nur die Rundung von Q darf abweichen
+    params = dict(num_episodes=300, epsilon=0.0, record_interval=50)
+    Q, trajectories, rewards = q_learning(_feature_env(), **params)
+    Q_fast, trajectories_fast, rewards_fast = q_learning(_feature_env(), fast=True, **params)
+    assert rewards_fast == rewards
+    assert trajectories_fast == trajectories
+    assert np.allclose(Q_fast, Q, atol=1e-5)
+
+
+def test_fast_is_reproducible_with_exploration():
+    params = dict(num_episodes=200, epsilon=0.3, epsilon_decay_factor=0.99, record_interval=50, fast=True)
+    Q, trajectories, rewards = q_learning(_feature_env(), **params)
+    Q_again, trajectories_again, rewards_again = q_learning(_feature_env(), **params)
+    assert np.array_equal(Q, Q_again)
+    assert trajectories == trajectories_again and rewards == rewards_again
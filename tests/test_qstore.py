@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from gridworld import (ExtendedGridEnv, DenseQStore, LazyQTable, StateEncoder, make_q_store, position_q_table,
+                       q_learning, q_memory_usage)
+
+
+def _env():
+    return ExtendedGridEnv(rows=5, cols=5, wind_positions=[(2, 3)], sticky_positions=[(0, 2)],
+                           collapse_positions=[(0, 1), (3, 3)], gem_positions=[(1, 0), (4, 1)],
+                           battery_positions=[(2, 0)], resolution=None, rng_seed=4)
+
+
+def _dynamic_state(env):
+    return {'agent_pos': env.agent_pos, 'has_battery': env.has_battery, 'gem_mask': env._gem_mask,
+            'collapsed_mask': env._collapsed_mask, 'skip_turns': min(env.skip_turns, 1),
+            'wind_dir_idx': env.wind_dir_idx}
+
+
+# ──────────────────────────────────────────────────────────────── #
+def test_encoder_round_trip_on_random_walks():
+    env = _env()
+    encoder = StateEncoder(env)
+    assert encoder.size == 25 * 2 * 4 * 4 * 2 * 4
+    rng = np.random.default_rng(0)
+    seen = {}
+    for _ in range(200):
+        env.reset()
+        for _ in range(30):
+            code = encoder.encode(env)
+            state = _dynamic_state(env)
+            assert 0 <= code < encoder.size
+            assert encoder.decode(code) == state
+            assert encoder.position(code) == env.to_index(*env.agent_pos)
+            # verschiedene Zustände bekommen verschiedene Codes
+            assert seen.setdefault(code, state) == state
+            _, _, done = env.step(int(rng.integers(4)))
+            if done:
+                break
+    assert len(seen) > 100
+
+
+def test_encoder_drops_unused_factors():
+    env = ExtendedGridEnv(rows=4, cols=4, ice_positions=[(1, 1)], resolution=None)
+    env.reset()
+    encoder = StateEncoder(env)
+    assert encoder.size == 16
+    assert encoder.encode(env) == env.to_index(*env.agent_pos)
+    only_battery = StateEncoder(_env(), gems=False, collapse=False, skip=False, wind=False)
+    assert only_battery.size == 25 * 2
+
+
+def _train(backend, encoder=True, **kwargs):
+    env = _env()
+    params = dict(num_episodes=150, alpha=0.3, epsilon=0.3, max_steps=40, record_interval=None)
+    Q, _, rewards = q_learning(env, encoder=StateEncoder(env) if encoder else None, backend=backend,
+                               **params, **kwargs)
+    return env, Q, rewards
+
+
+def test_lazy_table_matches_dense_store():
+    env, dense, rewards_dense = _train("dense")
+    _, lazy, rewards_lazy = _train("sparse")
+    assert isinstance(dense, DenseQStore) and isinstance(lazy, LazyQTable)
+    assert rewards_lazy == rewards_dense
+    codes = lazy.codes()
+    assert np.array_equal(lazy.values[:len(codes)], dense.values[codes])
+    # nie besuchte Zustände sind im dichten Speicher 0 und in der LazyQTable nicht angelegt
+    unvisited = np.setdiff1d(np.arange(len(dense)), codes)
+    assert not dense.values[unvisited].any()
+    assert not lazy[int(unvisited[0])].any() and int(unvisited[0]) not in lazy
+    positions = np.array(codes) % 25
+    expected = np.zeros((25, 4), dtype=np.float32)
+    for cell in set(positions.tolist()):
+        expected[cell] = dense.values[np.array(codes)[positions == cell]].max(axis=0)
+    assert np.array_equal(position_q_table(lazy, env), expected)
+    assert q_memory_usage(lazy)['total_bytes'] < q_memory_usage(dense)['total_bytes']
+
+
+def test_dense_store_without_encoder_matches_ndarray():
+    _, Q, rewards = _train(None, encoder=False)
+    _, store, rewards_store = _train("dense", encoder=False)
+    assert isinstance(Q, np.ndarray)
+    assert rewards_store == rewards
+    assert np.array_equal(store.values, Q)
+
+
+def test_float16_store_halves_memory():
+    # float16 rundet anders und wählt daher andere gierige Aktionen, verglichen wird nur Form und Speicher
+    _, dense, _ = _train("dense")
+    _, half, rewards = _train("float16")
+    assert half.values.dtype == np.float16 and half.values.shape == dense.values.shape
+    assert half.nbytes * 2 == dense.nbytes
+    assert len(rewards) == 150 and np.isfinite(half.values).all() and half.values.any()
+
+
+def test_lazy_table_grows():
+    table = make_q_store("sparse", num_states=1000)
+    rows = [table.row(code) for code in range(5000, 8000, 3)]
+    assert rows == list(range(1000))
+    assert len(table) == 1000 and len(table.values) >= 1000
+    with pytest.raises(ValueError):
+        make_q_store("bogus", 10)
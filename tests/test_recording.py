@@ -0,0 +1,37 @@
+import pytest
+
+from gridworld import EpisodeLog, ExtendedGridEnv, q_learning
+
+
+def _env():
+    return ExtendedGridEnv(rows=5, cols=5, ice_positions=[(1, 1), (1, 2), (2, 2)], wind_positions=[(3, 1)],
+                           collapse_positions=[(0, 3)], gem_positions=[(3, 3)], pit_positions=[(2, 4)],
+                           resolution=None, rng_seed=5)
+
+
+# ──────────────────────────────────────────────────────────────── #
+@pytest.mark.parametrize("fast", [False, True])
+def test_episode_log_replays_stored_trajectories(fast):
+    env = _env()
+    log = EpisodeLog(env)
+    _, trajectories, _ = q_learning(env, num_episodes=60, epsilon=0.3, max_steps=40, record_interval=1,
+                                    episode_log=log, fast=fast)
+    assert len(log) == len(trajectories) == 60
+
+    state = env.rng.get_state()
+    for episode, trajectory in trajectories.items():
+        assert log[episode] == trajectory
+    # das Neusimulieren lässt den Zufallsstrom der Umgebung unverändert
+    assert env.rng.get_state() == state
+
+
+def test_episode_log_every_matches_record_interval():
+    env = _env()
+    log = EpisodeLog(env)
+    _, trajectories, _ = q_learning(env, num_episodes=50, epsilon=0.3, max_steps=40, record_interval=20,
+                                    episode_log=log, fast=True)
+    view = log.every(20)
+    assert list(view) == list(trajectories) == [0, 20, 40]
+    assert all(view[episode] == trajectories[episode] for episode in view)
+    with pytest.raises(KeyError):
+        view[1]
@@ -0,0 +1,239 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageFont
+
+import gridworld._render as render
+from gridworld import (EpisodeLog, ExtendedGridEnv, LargeGridEnv, q_learning, render_episodes, sprite_cache_info,
+                       warm_up_rendering)
+from gridworld._render import SYMBOLS, SpriteCache, _emoji_frame, _glyph_for
+
+
+@pytest.fixture
+def sprites(tmp_path, monkeypatch):
+    """
+    Farbige Sprite-Dateien mit weichem Alpha-Rand für alle Symbole (ohne Emoji-Schrift zeichnet der Text-Fallback
+    hier nichts, die Frames wären sonst leer).
+    """
+    yy, xx = np.mgrid[:32, :32]
+    alpha = np.clip(255 * (14 - np.hypot(yy - 15.5, xx - 15.5)) / 4, 0, 255).astype(np.uint8)
+    for i, glyph in enumerate(g for g in SYMBOLS.values() if g):
+        rgba = np.empty((32, 32, 4), dtype=np.uint8)
+        rgba[:, :, :3] = ((37 * i) % 256, (91 * i + 40) % 256, (53 * i + 90) % 256)
+        rgba[:, :, 3] = alpha
+        Image.fromarray(rgba).save(tmp_path / f"{render._glyph_to_hex(glyph)}.png")
+    monkeypatch.setenv("GRIDWORLD_EMOJI_SPRITES", str(tmp_path))  # für Worker-Prozesse
+    monkeypatch.setattr(render, "SPRITE_DIR", tmp_path)
+    render._load_sprite_for_glyph.cache_clear()
+    render.SPRITE_CACHE.clear()
+    yield tmp_path
+    render._load_sprite_for_glyph.cache_clear()
+    render.SPRITE_CACHE.clear()
+
+
+def _env():
+    return ExtendedGridEnv(rows=4, cols=5, ice_positions=[(2, 2)], collapse_positions=[(0, 1)],
+                           battery_positions=[(1, 0)], gem_positions=[(0, 2)], conveyor_map={(3, 1): "R"},
+                           pit_positions=[(2, 4)], resolution=None, rng_seed=0)
+
+
+# Laufbahn über Einsturzfeld, Edelstein und Batterie
+PATH = [(0, 0), (0, 1), (0, 2), (1, 2), (1, 1), (1, 0), (2, 0), (2, 1), (3, 1), (3, 2), (3, 3), (3, 4)]
+
+
+def _uncached_frame(env, pos):
+    """
+    Frame ohne Hintergrund-Cache, wie render() vor dem Cache: alles pro Frame neu gezeichnet.
+    """
+    symbols = {(r, c): _glyph_for(env, r, c) for r in range(env.rows) for c in range(env.cols)}
+    symbols = {cell: glyph for cell, glyph in symbols.items() if glyph}
+    frame = _emoji_frame(env.rows, env.cols, env.cell_size, env.FRAME_PADDING, symbols, pos)
+    return np.asarray(frame)[:, :, :3]
+
+
+# ──────────────────────────────────────────────────────────────── #
+def test_cached_board_matches_uncached_frames(sprites):
+    env = _env()
+    env.reset()
+    frames = [env.render(pos) for pos in PATH[:3]]
+    assert not np.array_equal(frames[0], frames[1])
+    env.reset()
+    for pos in PATH:
+        assert np.array_equal(env.render(pos), _uncached_frame(env, pos)), pos
+    # Einsturzfeld, Edelstein und Batterie ändern je einmal den Hintergrund
+    assert len(env._board_cache) == 4
+
+
+def test_board_cache_is_bounded():
+    env = _env()
+    env.reset()
+    for i in range(env.BOARD_CACHE_SIZE + 3):
+        env.cell_size = 20 + i  # jede Zellgröße ist ein eigener Schlüssel
+        env.render((3, 3))
+        assert len(env._board_cache) <= env.BOARD_CACHE_SIZE
+
+
+def test_sprite_cache_evicts_least_recently_used(sprites):
+    cache = SpriteCache(maxsize=2)
+    robot, flag, ice = SYMBOLS["agent"], SYMBOLS["goal"], SYMBOLS["ice"]
+    first = cache.get(robot, 20)
+    cache.get(flag, 20)
+    assert cache.get(robot, 20) is first       # Treffer, robot wird zuletzt benutzt
+    cache.get(ice, 20)                         # verdrängt flag
+    assert cache.info() == {"hits": 1, "misses": 3, "size": 2, "maxsize": 2}
+    cache.get(flag, 20)
+    assert cache.info()["misses"] == 4
+    assert cache.get(robot, 21) is not first   # jede Größe ist ein eigener Eintrag
+
+
+def test_scaled_sprite_is_premultiplied(sprites):
+    sprite = SpriteCache().get(SYMBOLS["gem"], 22)
+    rgba = np.asarray(sprite.image, dtype=np.float32)
+    assert sprite.image.size == (22, 22) and sprite.premultiplied.shape == (22, 22, 4)
+    assert np.allclose(sprite.premultiplied[:, :, 3], rgba[:, :, 3] / 255)
+    assert np.allclose(sprite.premultiplied[:, :, :3], rgba[:, :, :3] * rgba[:, :, 3:] / 255)
+
+
+def test_missing_sprite_is_cached_as_none(sprites):
+    cache = SpriteCache()
+    assert cache.get("x", 20) is None
+    assert cache.get("x", 20) is None
+    assert cache.info()["hits"] == 1
+
+
+def test_rendering_reuses_scaled_sprites(sprites):
+    env = _env()
+    env.reset()
+    env.render(PATH[0])
+    misses = sprite_cache_info()["misses"]
+    for pos in PATH:
+        env.render(pos)
+    # neue Hintergründe und Agent-Positionen skalieren keine Sprites mehr
+    assert sprite_cache_info()["misses"] == misses
+
+
+@pytest.fixture
+def font_calls(monkeypatch):
+    """
+    Zählt, wie oft eine Schriftdatei geöffnet wird; beginnt mit leerem Schrift-Cache.
+    """
+    calls = []
+    truetype = ImageFont.truetype
+
+    def counting(path, size, *args, **kwargs):
+        calls.append((path, size))
+        return truetype(path, size, *args, **kwargs)
+
+    monkeypatch.setattr(render.ImageFont, "truetype", counting)
+    monkeypatch.delenv("GRIDWORLD_EMOJI_FONT", raising=False)
+    render._font_cache.clear()
+    render._bad_font_sizes.clear()
+    yield calls
+    render._font_cache.clear()
+    render._bad_font_sizes.clear()
+
+
+def test_font_resolution_is_memoized(font_calls):
+    font, _ = render._resolve_font(20)
+    assert render._resolve_font(20)[0] is font
+    assert len(font_calls) == 1
+    env = _env()
+    env.reset()
+    for pos in PATH:
+        env.render(pos)
+    assert int(env.cell_size * 0.8) == 20 and len(font_calls) == 1
+
+
+def test_font_cache_follows_environment_variable(font_calls, monkeypatch):
+    font, _ = render._resolve_font(20)
+    path = next((str(p) for p in render._font_candidates() if p and p.exists()), None)
+    if path is None:
+        pytest.skip("keine TrueType-Schrift vorhanden")
+    # neue Schrift-Variable: Cache verworfen, die genannte Schrift wird zuerst versucht
+    monkeypatch.setenv("GRIDWORLD_EMOJI_FONT", path)
+    assert render._resolve_font(20)[0] is not font
+    assert font_calls[-1] == (path, 20)
+
+
+def test_warm_up_fills_caches(sprites, font_calls):
+    warm_up_rendering(25, 40)
+    assert set(render._font_cache) == {20, 32}
+    misses = sprite_cache_info()["misses"]
+    assert misses == 2 * sum(1 for g in SYMBOLS.values() if g)
+    env = _env()
+    env.reset()
+    env.render(PATH[0])
+    assert len(font_calls) == 2 and sprite_cache_info()["misses"] == misses
+
+
+def _per_frame(env, trajectory):
+    env.reset()
+    return np.stack([env.render(pos) for pos in trajectory])
+
+
+@pytest.mark.parametrize("env_cls", ["extended", "large"])
+def test_render_trajectory_matches_render(sprites, env_cls):
+    if env_cls == "extended":
+        env = _env()
+    else:
+        env = LargeGridEnv(rows=4, cols=5, ice_positions=[(2, 2)], bumper_positions=[(1, 1)],
+                           pit_positions=[(2, 4)], resolution=None, rng_seed=0)
+    expected = _per_frame(env, PATH)
+    env.reset()
+    frames = env.render_trajectory(PATH)
+    assert frames.shape == expected.shape and frames.dtype == np.uint8
+    # Sprites werden per NumPy statt per Image.alpha_composite überblendet: Rundung ±1
+    assert np.abs(frames.astype(np.int16) - expected).max() <= 1
+    assert env.agent_pos == PATH[-1]
+
+
+def test_render_trajectory_into_buffer(sprites):
+    env = _env()
+    env.reset()
+    expected = env.render_trajectory(PATH)
+    out = np.zeros((len(PATH),) + expected.shape[1:], dtype=np.uint8)
+    env.reset()
+    cells = np.array([env.to_index(*pos) for pos in PATH])
+    assert env.render_trajectory(cells, out=out) is out
+    assert np.array_equal(out, expected)
+    assert env.render_trajectory([]).shape == (0,) + expected.shape[1:]
+
+
+def _episodes(env):
+    log = EpisodeLog(env)
+    _, trajectories, _ = q_learning(env, num_episodes=12, epsilon=0.5, max_steps=25, record_interval=3,
+                                    episode_log=log)
+    return trajectories, log
+
+
+def _reference(env, trajectories):
+    out = {}
+    for episode, trajectory in trajectories.items():
+        env.reset()
+        out[episode] = env.render_trajectory(trajectory)
+    return out
+
+
+def _env_state(env):
+    return (env.agent_pos, set(env.visited), env._collapsed_mask, env._battery_mask, env._gem_mask,
+            env.rng.get_state())
+
+
+@pytest.mark.parametrize("source", ["dict", "log"])
+def test_render_episodes_matches_render_trajectory(sprites, source):
+    env = _env()
+    trajectories, log = _episodes(env)
+    before = _env_state(env)
+    frames = render_episodes(env, log.every(3) if source == "log" else trajectories)
+    # die Umgebung bleibt unverändert, auch beim Neusimulieren aus dem EpisodeLog
+    assert _env_state(env) == before
+    expected = _reference(env, trajectories)
+    assert list(frames) == list(expected)
+    assert all(np.array_equal(frames[ep], expected[ep]) for ep in expected)
+
+
+def test_render_episodes_process_pool(sprites):
+    env = _env()
+    trajectories, _ = _episodes(env)
+    frames = render_episodes(env, trajectories, max_workers=2)
+    expected = _reference(env, trajectories)
+    assert all(np.array_equal(frames[ep], expected[ep]) for ep in expected)
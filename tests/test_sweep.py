@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import gridworld.sweep as sweep
+from gridworld import LayoutSpec, run_sweep, successive_halving, hyperband
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """
+    Führt die Worker im eigenen Prozess aus und merkt sich, was q_learning aufgezeichnet hat.
+    """
+    recorded = []
+    q_learning = sweep.q_learning
+
+    def spy(env, **params):
+        Q, trajectories, rewards = q_learning(env, **params)
+        recorded.append((params.get('record_interval'), trajectories))
+        return Q, trajectories, rewards
+
+    monkeypatch.setattr(sweep, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(sweep, "q_learning", spy)
+    return recorded
+
+
+SPEC = LayoutSpec(dict(rows=4, cols=4, pit_positions=[(1, 2)], resolution=None))
+
+
+def test_run_sweep_records_no_trajectories(calls):
+    results = list(run_sweep(SPEC, [{'num_episodes': 20, 'alpha': 0.2}], seeds=(0, 1), max_workers=2))
+    assert len(results) == 2
+    assert calls and all(interval is None and trajectories == {} for interval, trajectories in calls)
+
+
+def test_successive_halving_records_no_trajectories(calls):
+    candidates = [{'alpha': 0.1, 'epsilon': 0.2}, {'alpha': 0.3, 'epsilon': 0.1}, {'alpha': 0.5, 'epsilon': 0.3}]
+    best, history = successive_halving(SPEC, candidates, min_episodes=10, max_episodes=30, eta=3, score_window=5,
+                                       max_workers=2)
+    assert best['episodes'] == 30
+    assert calls and all(interval is None and trajectories == {} for interval, trajectories in calls)
+
+
+def test_successive_halving_uses_q_learning_defaults(calls):
+    candidates = [{'alpha': a} for a in (0.1, 0.2, 0.3)] + [{'alpha': 0.4, 'epsilon_decay_factor': 0.9}]
+    best, _ = successive_halving(SPEC, candidates, min_episodes=5, max_episodes=10, eta=2, max_workers=2)
+    assert best['episodes'] == 10 and 'epsilon' not in best['params']
+
+
+def test_hyperband_compares_winners_at_full_budget(calls):
+    # eta=3, max_episodes=20: das erste Bracket endet mit einer Kandidatin schon bei 18 Episoden
+    best, history = hyperband(SPEC, max_episodes=20, eta=3, score_window=5, max_workers=2)
+    assert best['episodes'] == 20
+    for bracket in {row['bracket'] for row in history}:
+        last = max((row for row in history if row['bracket'] == bracket), key=lambda row: row['rung'])
+        assert last['episodes'] == 20
@@ -0,0 +1,45 @@
+import numpy as np
+
+from gridworld import ExtendedGridEnv, VecExtendedGridEnv
+
+
+def _env():
+    return ExtendedGridEnv(rows=5, cols=6, wall_positions=[(1, 2)], pit_positions=[(3, 3)],
+                           conveyor_map={(2, 1): "R"}, trampoline_positions=[(0, 4)], bumper_positions=[(4, 1)],
+                           wind_positions=[(2, 4)], sticky_positions=[(3, 0)], resolution=None, rng_seed=0)
+
+
+def test_steps_match_single_env():
+    num_envs = 8
+    vec = VecExtendedGridEnv(_env(), num_envs, rng_seed=1)
+    vec.reset()
+    envs = []
+    for i in range(num_envs):
+        env = _env()
+        env.reset()
+        env.wind_dir_idx = int(vec.wind_dir_idx[i])
+        envs.append(env)
+
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        actions = rng.integers(0, 4, num_envs)
+        states, rewards, dones = vec.step(actions)
+        for i, env in enumerate(envs):
+            s, r, d = env.step(int(actions[i]))
+            assert (s, d) == (states[i], dones[i])
+            assert r == np.float64(rewards[i])
+
+
+def test_sync_picks_up_moved_goal():
+    env = _env()
+    vec = VecExtendedGridEnv(env, 2)
+    vec.reset()
+    env.goal_pos = (0, 1)
+    _, _, dones = vec.step([3, 3])
+    assert not dones.any()
+
+    vec.sync()
+    vec.reset()
+    _, rewards, dones = vec.step([3, 3])
+    assert dones.all()
+    assert np.all(rewards == env.reward_goal)